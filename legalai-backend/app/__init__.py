@@ -9,6 +9,9 @@ from dotenv import load_dotenv
 from sqlalchemy.exc import OperationalError, ProgrammingError
 from flask_cors import CORS
 from .utils.logging_config import setup_logging
+from .utils.metrics import init_metrics
+from .utils.query_counter import init_query_counter
+from .utils.tracing import init_tracing
 from flask_swagger_ui import get_swaggerui_blueprint
 import os
 
@@ -48,6 +51,9 @@ def create_app():
     migrate.init_app(app, db)
     limiter.init_app(app)
     init_celery(app)
+    init_query_counter(app)
+    init_metrics(app)
+    init_tracing(app)
 
     SWAGGER_URL = "/docs"
     API_SPEC_URL = "/static/openapi.yaml"  
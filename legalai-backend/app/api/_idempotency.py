@@ -0,0 +1,132 @@
+"""
+Idempotency-Key support for expensive POST endpoints.
+
+Mobile clients retry /chat/ask on flaky networks. With an Idempotency-Key
+header, the first request claims the key in Redis and its JSON response is
+stored for IDEMPOTENCY_TTL_SECONDS. A retry with the same key then:
+- gets the stored response replayed (Idempotent-Replayed: true), or
+- waits briefly (IDEMPOTENCY_WAIT_SECONDS) for the in-progress original, or
+- gets 409 with Retry-After if the original is still running after that;
+  the wait holds a web worker, so it stays short and the client retries
+
+Keys are scoped per user and endpoint. Reusing a key with a different
+payload is rejected with 422. Failed requests release the key so the
+client can retry. Without Redis the header is ignored.
+"""
+import hashlib
+import json
+import time
+from functools import wraps
+
+from flask import current_app, g, jsonify, request
+
+from ..exceptions import AppError
+from ..utils.redis_client import get_redis
+
+HEADER = "Idempotency-Key"
+_POLL_SECONDS = 0.1
+
+
+def _fingerprint() -> str:
+    body = request.get_json(silent=True)
+    raw = json.dumps(
+        {"path": request.path, "safe": request.headers.get("X-Safe-Mode", "0"), "body": body},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _replay(entry: dict):
+    resp = jsonify(entry["body"])
+    resp.status_code = entry["status"]
+    resp.headers["Idempotent-Replayed"] = "true"
+    return resp
+
+
+def _in_progress():
+    message = "A request with this Idempotency-Key is still in progress"
+    resp = jsonify({"message": message, "error": message, "details": {"header": HEADER}})
+    resp.status_code = 409
+    resp.headers["Retry-After"] = str(int(current_app.config.get("IDEMPOTENCY_RETRY_AFTER_SECONDS", 2)))
+    return resp
+
+
+def _wait_for_result(r, key: str, fingerprint: str):
+    wait_s = float(current_app.config.get("IDEMPOTENCY_WAIT_SECONDS", 1))
+    give_up_at = time.monotonic() + wait_s
+    while True:
+        raw = r.get(key)
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        if entry["fp"] != fingerprint:
+            raise AppError(
+                "Idempotency-Key was already used with a different request",
+                code=422,
+                details={"header": HEADER},
+            )
+        if entry["state"] == "done":
+            return _replay(entry)
+        if time.monotonic() >= give_up_at:
+            return _in_progress()
+        time.sleep(_POLL_SECONDS)
+
+
+def _release(r, key: str) -> None:
+    try:
+        r.delete(key)
+    except Exception as e:
+        current_app.logger.warning("Failed to release idempotency key: %s", str(e))
+
+
+def idempotent(scope: str):
+    """
+    Must be applied inside require_auth (keys are scoped to g.user).
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            idem_key = (request.headers.get(HEADER) or "").strip()
+            r = get_redis() if idem_key else None
+            if r is None:
+                return fn(*args, **kwargs)
+            if len(idem_key) > 255:
+                raise AppError("Idempotency-Key too long (max 255 chars)", code=400)
+
+            key = f"idem:{scope}:{g.user.id}:{hashlib.sha256(idem_key.encode('utf-8')).hexdigest()}"
+            fingerprint = _fingerprint()
+            ttl = int(current_app.config.get("IDEMPOTENCY_TTL_SECONDS", 86400))
+            lock_ttl = int(current_app.config.get("IDEMPOTENCY_LOCK_SECONDS", 60))
+
+            try:
+                claimed = r.set(key, json.dumps({"state": "pending", "fp": fingerprint}), nx=True, ex=lock_ttl)
+                while not claimed:
+                    replay = _wait_for_result(r, key, fingerprint)
+                    if replay is not None:
+                        return replay
+                    # Original failed and released the key; take it over.
+                    claimed = r.set(key, json.dumps({"state": "pending", "fp": fingerprint}), nx=True, ex=lock_ttl)
+            except AppError:
+                raise
+            except Exception as e:
+                current_app.logger.warning("Idempotency store unavailable, processing %s normally: %s", scope, str(e))
+                return fn(*args, **kwargs)
+
+            try:
+                resp = current_app.make_response(fn(*args, **kwargs))
+            except Exception:
+                _release(r, key)
+                raise
+
+            if resp.status_code < 500 and resp.is_json:
+                entry = {"state": "done", "fp": fingerprint, "status": resp.status_code, "body": resp.get_json()}
+                try:
+                    r.set(key, json.dumps(entry), ex=ttl)
+                except Exception as e:
+                    current_app.logger.warning("Failed to store idempotent response: %s", str(e))
+            else:
+                _release(r, key)
+            return resp
+        return wrapper
+    return decorator
@@ -17,6 +17,8 @@ from sqlalchemy.exc import IntegrityError
 from datetime import datetime
 from ._auth_guard import require_auth
 from ..models.rag import KnowledgeSource
+from ..services.rag_metrics_service import DECISION_COLUMNS, RAGMetricsService
+from ..services.single_flight import SingleFlight
 from ..services.storage_service import StorageService
 from ..tasks.ingestion_tasks import ingest_source
 from ..extensions import db
@@ -676,6 +678,7 @@ def retry_source(sid: int):
 def delete_source(sid):
     KnowledgeSource.query.filter_by(id=sid).delete()
     db.session.commit()
+    SingleFlight.bump_kb_version()
     return jsonify({"ok": True})
 
 @bp.get("/rag/metrics/summary")
@@ -685,22 +688,17 @@ def rag_metrics_summary():
     """
     Get high-level RAG performance summary.
     
-    Returns aggregated metrics for dashboard view.
+    Returns aggregated metrics for dashboard view. Completed hours come from
+    the rag_metrics_hourly rollup; only the remainder scans raw logs.
     """
-    from sqlalchemy import func
-    
     try:
         days = int(request.args.get("days", 7))
         days = max(1, min(days, 90)) 
     except ValueError:
         days = 7
     
-    from datetime import datetime, timedelta
-    cutoff = datetime.utcnow() - timedelta(days=days)
-    
-    q = RAGEvaluationLog.query.filter(RAGEvaluationLog.created_at >= cutoff)
-    
-    total_queries = q.count()
+    t = RAGMetricsService.totals(days)
+    total_queries = int(t["total_queries"])
     
     if total_queries == 0:
         return jsonify({
@@ -709,104 +707,38 @@ def rag_metrics_summary():
             "summary": "No data available for this period"
         })
     
-    decisions = (
-        db.session.query(
-            RAGEvaluationLog.decision,
-            func.count(RAGEvaluationLog.id).label("count")
-        )
-        .filter(RAGEvaluationLog.created_at >= cutoff)
-        .group_by(RAGEvaluationLog.decision)
-        .all()
-    )
-    
-    decision_stats = {d.decision: d.count for d in decisions}
-    
-    avg_total_time = (
-        db.session.query(func.avg(RAGEvaluationLog.total_time_ms))
-        .filter(RAGEvaluationLog.created_at >= cutoff)
-        .scalar() or 0
-    )
-    
-    avg_embedding_time = (
-        db.session.query(func.avg(RAGEvaluationLog.embedding_time_ms))
-        .filter(RAGEvaluationLog.created_at >= cutoff)
-        .scalar() or 0
-    )
-    
-    avg_llm_time = (
-        db.session.query(func.avg(RAGEvaluationLog.llm_time_ms))
-        .filter(
-            RAGEvaluationLog.created_at >= cutoff,
-            RAGEvaluationLog.llm_time_ms.isnot(None)
-        )
-        .scalar() or 0
-    )
-    
-    total_tokens_used = (
-        db.session.query(func.sum(RAGEvaluationLog.total_tokens))
-        .filter(
-            RAGEvaluationLog.created_at >= cutoff,
-            RAGEvaluationLog.total_tokens.isnot(None)
-        )
-        .scalar() or 0
-    )
-    
-    avg_tokens_per_query = (
-        db.session.query(func.avg(RAGEvaluationLog.total_tokens))
-        .filter(
-            RAGEvaluationLog.created_at >= cutoff,
-            RAGEvaluationLog.total_tokens.isnot(None)
-        )
-        .scalar() or 0
-    )
-    
-    in_domain_count = q.filter_by(in_domain=True).count()
-    fallback_count = q.filter_by(used_fallback=True).count()
-    error_count = q.filter_by(error_occurred=True).count()
-    
-    avg_distance = (
-        db.session.query(func.avg(RAGEvaluationLog.best_distance))
-        .filter(
-            RAGEvaluationLog.created_at >= cutoff,
-            RAGEvaluationLog.in_domain == True,
-            RAGEvaluationLog.best_distance.isnot(None)
-        )
-        .scalar() or 0
-    )
-    
-    avg_contexts = (
-        db.session.query(func.avg(RAGEvaluationLog.contexts_used))
-        .filter(RAGEvaluationLog.created_at >= cutoff)
-        .scalar() or 0
-    )
+    def avg(total, count):
+        return total / count if count else 0
     
     return jsonify({
         "period": f"Last {days} days",
         "totalQueries": total_queries,
         
         "decisions": {
-            "answer": decision_stats.get("ANSWER", 0),
-            "outOfDomain": decision_stats.get("OUT_OF_DOMAIN", 0),
-            "noHits": decision_stats.get("NO_HITS", 0),
+            "answerWithSources": int(t["answer_with_sources_count"]),
+            "answerNoSources": int(t["answer_no_sources_count"]),
+            "degraded": int(t["degraded_count"]),
+            "emergency": int(t["emergency_count"]),
+            "outOfDomain": int(t["refused_count"]),
         },
         
         "quality": {
-            "inDomainRate": round(in_domain_count / total_queries * 100, 2),
-            "fallbackRate": round(fallback_count / total_queries * 100, 2),
-            "errorRate": round(error_count / total_queries * 100, 2),
-            "avgDistance": round(avg_distance, 4),
-            "avgContextsUsed": round(avg_contexts, 2),
+            "inDomainRate": round(t["in_domain_count"] / total_queries * 100, 2),
+            "fallbackRate": round(t["fallback_count"] / total_queries * 100, 2),
+            "errorRate": round(t["error_count"] / total_queries * 100, 2),
+            "avgDistance": round(avg(t["best_distance_sum"], t["best_distance_count"]), 4),
+            "avgContextsUsed": round(t["contexts_used_sum"] / total_queries, 2),
         },
         
         "performance": {
-            "avgTotalTimeMs": round(avg_total_time, 0),
-            "avgEmbeddingTimeMs": round(avg_embedding_time, 0),
-            "avgLlmTimeMs": round(avg_llm_time, 0),
+            "avgTotalTimeMs": round(t["total_time_ms_sum"] / total_queries, 0),
+            "avgEmbeddingTimeMs": round(t["embedding_time_ms_sum"] / total_queries, 0),
+            "avgLlmTimeMs": round(avg(t["llm_time_ms_sum"], t["llm_time_ms_count"]), 0),
         },
         
         "tokens": {
-            "totalUsed": int(total_tokens_used),
-            "avgPerQuery": round(avg_tokens_per_query, 0),
+            "totalUsed": int(t["total_tokens_sum"]),
+            "avgPerQuery": round(avg(t["total_tokens_sum"], t["total_tokens_count"]), 0),
         },
     })
 
@@ -821,7 +753,8 @@ def rag_metrics_queries():
     Query params:
     - page: page number (default 1)
     - perPage: items per page (default 20, max 100)
-    - decision: filter by decision type (ANSWER|OUT_OF_DOMAIN|NO_HITS)
+    - decision: filter by decision type
+      (ANSWER_WITH_SOURCES|ANSWER_NO_SOURCES|DEGRADED|EMERGENCY|REFUSE_OUT_OF_DOMAIN)
     - inDomain: filter by in_domain (true|false)
     - minTime: filter by minimum total_time_ms
     - days: time range in days (default 7)
@@ -839,7 +772,7 @@ def rag_metrics_queries():
     q = RAGEvaluationLog.query.filter(RAGEvaluationLog.created_at >= cutoff)
     
     decision = request.args.get("decision")
-    if decision in {"ANSWER", "OUT_OF_DOMAIN", "NO_HITS"}:
+    if decision in DECISION_COLUMNS:
         q = q.filter_by(decision=decision)
     
     in_domain = request.args.get("inDomain")
@@ -943,12 +876,14 @@ def rag_metrics_query_detail(query_id: int):
             "embeddingTimeMs": log.embedding_time_ms,
             "llmTimeMs": log.llm_time_ms,
             "totalTimeMs": log.total_time_ms,
+            "stages": log.stage_timings or {},
         },
         
         "tokens": {
             "prompt": log.prompt_tokens,
             "completion": log.completion_tokens,
             "total": log.total_tokens,
+            "cached": log.cached_tokens,
         },
         
         "models": {
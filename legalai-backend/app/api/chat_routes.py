@@ -1,11 +1,17 @@
 from flask import Blueprint, request, jsonify, g, current_app
-from werkzeug.exceptions import BadRequest, Forbidden, NotFound
+from werkzeug.exceptions import BadRequest, Forbidden, NotFound, ServiceUnavailable
+from sqlalchemy import tuple_
 from ._auth_guard import require_auth, safe_mode_on
-from ..services.rag_service import RAGService
-from ..services.llm_service import LLMService
+from ._idempotency import idempotent
+from ..services.chat_history_cache import ChatHistoryCache
+from ..services.chat_jobs import ChatJobService, TERMINAL
+from ..services.chat_pipeline import AskContext, ChatPipeline
+from ..services.conversation_memory_service import ConversationMemoryService
+from ..tasks.chat_tasks import run_chat_job
+from ..utils.deadline import start_request_deadline
+from ..utils.pagination import decode_cursor, encode_cursor
 from ..models.chat import ChatMessage, ChatConversation
 from ..extensions import db
-from ..tasks.evaluation_tasks import log_rag_evaluation_async
 import time
 
 bp = Blueprint("chat", __name__)
@@ -38,461 +44,129 @@ def _get_conversation_or_404(cid: int, user_id: int) -> ChatConversation:
         raise Forbidden("Not yours")
     return conv
 
-def _recent_conversation_messages(cid: int, limit: int = 10) -> list[dict]:
+def _start_ask(data: dict, started_at: float) -> AskContext:
     """
-    Return last N messages (chronological) from this conversation only.
-    This provides true 'resume chat' memory without leaking other chats.
+    Validate the ask payload and resolve (or create) the conversation.
+    Safe mode never touches conversations or memory.
     """
-    rows = (
-        ChatMessage.query
-        .filter_by(conversation_id=cid, user_id=g.user.id)
-        .order_by(ChatMessage.created_at.desc())
-        .limit(limit)
-        .all()
-    )
-    rows = list(reversed(rows))
-    return [{"role": r.role, "content": r.content} for r in rows]
-
-def _detect_emergency_fast(q: str) -> bool:
-    ql = (q or "").lower()
-    hints = [
-        "kill", "murder", "suicide", "self harm", "self-harm", "i will die",
-        "threaten to kill", "threat to kill", "he will kill me", "she will kill me",
-        "rape", "kidnap", "abduct",
-        "قتل", "خودکشی", "جان سے مار", "مار دوں گا", "مار دوں گی", "ماردے", "مر جاؤں",
-        "زیادتی", "اغوا"
-    ]
-    return any(h in ql for h in hints)
-
-@bp.post("/ask")
-@require_auth()
-def ask():
-    data = request.get_json() or {}
-    request_start_time = time.perf_counter()
-
     q = (data.get("question") or "").strip()
     if not q:
         raise BadRequest("Question required")
     if len(q) > 2000:
         raise BadRequest("Question too long")
 
-    language = (getattr(g.user, "language", None) or "en")
-    province = getattr(g.user, "province", None)
-    conv_id = data.get("conversationId")
-    memory_limit = current_app.config.get("CHAT_MEMORY_LIMIT", 10)
+    user_id = g.user.id
+    safe_mode = safe_mode_on()
+    conv_id = None if safe_mode else data.get("conversationId")
+    is_new_conversation = safe_mode or conv_id is None
+    memory = None
 
-    if safe_mode_on():
-        if _detect_emergency_fast(q):
-            route = {"category": "EMERGENCY", "confidence": 1.0, "topic": "emergency"}
-        else:
-            route = LLMService.classify_query(question=q, language=language)
-
-        category = route.get("category")
-        topic = route.get("topic") or "other"
-
-        current_app.logger.info(
-            "Chat classify: safe_mode=1 user_id=%s lang=%s category=%s topic=%s conf=%s",
-            getattr(g.user, "id", None),
-            language,
-            category,
-            topic,
-            route.get("confidence"),
-        )
-
-        if category == "GREETING_OR_APP_HELP":
-            msg = (
-                "Hello! I can help with legal awareness for women in Pakistan (workplace harassment, domestic violence, family matters, cyber harassment). "
-                "Please describe your situation and I will guide you."
-                if language != "ur"
-                else
-                "السلام علیکم! میں پاکستان میں خواتین کے لیے قانونی آگاہی میں مدد کر سکتی ہوں (کام کی جگہ ہراسانی، گھریلو تشدد، خاندانی معاملات، سائبر ہراسانی)۔ "
-                "براہِ کرم اپنا مسئلہ بتائیں، میں رہنمائی کروں گی۔"
-            )
-            return jsonify({"answer": msg, "conversationId": None, "contextsUsed": 0})
-
-        if category == "EMERGENCY":
-            emergency_msg = LLMService.emergency_response(language=language, province=province)
-            total_time_ms = int((time.perf_counter() - request_start_time) * 1000)
-            try:
-                log_rag_evaluation_async.delay(
-                    user_id=g.user.id,
-                    conversation_id=None,
-                    language=language,
-                    safe_mode=True,
-                    is_new_conversation=True,
-                    question=q,
-                    answer=emergency_msg,
-                    threshold=None,
-                    best_distance=None,
-                    contexts_found=0,
-                    contexts_used=0,
-                    in_domain=True,
-                    decision="EMERGENCY",
-                    chunk_ids=[],
-                    embedding_time_ms=0,
-                    llm_time_ms=0,
-                    total_time_ms=total_time_ms,
-                    embedding_model=current_app.config["EMBEDDING_MODEL"],
-                    embedding_dimension=current_app.config.get("EMBEDDING_DIMENSION"),
-                    chat_model=current_app.config.get("CHAT_MODEL"),
-                    prompt_messages=None,
-                    completion_text=emergency_msg,
-                )
-            except Exception as e:
-                current_app.logger.warning("Failed to queue evaluation task: %s", str(e))
-
-            return jsonify({"answer": emergency_msg, "conversationId": None, "contextsUsed": 0})
-
-        if category in {"OUT_OF_DOMAIN", "PROMPT_INJECTION_OR_MISUSE"}:
-            refusal = (
-                "I am an AI legal lawyer assistant. I can only help you with legal awareness. "
-                "I'm not able to process this query."
-                if language != "ur"
-                else
-                "میں ایک اے آئی لیگل اسسٹنٹ ہوں۔ میں صرف قانونی آگاہی میں مدد کر سکتی ہوں۔ میں اس سوال پر مدد نہیں کر سکتی۔"
-            )
-            total_time_ms = int((time.perf_counter() - request_start_time) * 1000)
+    if not safe_mode:
+        if conv_id is not None:
             try:
-                log_rag_evaluation_async.delay(
-                    user_id=g.user.id,
-                    conversation_id=None,
-                    language=language,
-                    safe_mode=True,
-                    is_new_conversation=True,
-                    question=q,
-                    answer=refusal,
-                    threshold=None,
-                    best_distance=None,
-                    contexts_found=0,
-                    contexts_used=0,
-                    in_domain=False,
-                    decision="REFUSE_OUT_OF_DOMAIN",
-                    chunk_ids=[],
-                    embedding_time_ms=0,
-                    llm_time_ms=0,
-                    total_time_ms=total_time_ms,
-                    embedding_model=current_app.config["EMBEDDING_MODEL"],
-                    embedding_dimension=current_app.config.get("EMBEDDING_DIMENSION"),
-                    chat_model=current_app.config.get("CHAT_MODEL"),
-                    prompt_messages=None,
-                    completion_text=refusal,
-                )
-            except Exception as e:
-                current_app.logger.warning("Failed to queue evaluation task: %s", str(e))
-
-            return jsonify({"answer": refusal, "conversationId": None, "contextsUsed": 0})
-
-        embedding_start = time.perf_counter()
-        emb = LLMService.embed(q)
-        embedding_time_ms = int((time.perf_counter() - embedding_start) * 1000)
-
-        hits = RAGService.search_similar_with_scores(emb, language=language)
-        chunk_ids = [h.get("chunk_id") for h in hits if h.get("chunk_id")]
-
-        threshold = RAGService.get_distance_threshold()
-        best_distance = hits[0]["distance"] if hits else None
-
-        has_verified_sources = bool(hits) and (best_distance is not None) and (best_distance <= threshold)
-        contexts = [h["chunk_text"] for h in hits] if has_verified_sources else []
-
-        llm_start = time.perf_counter()
-        answer, prompt_messages, _ = LLMService.chat_legal_awareness(
-            question=q,
-            contexts=contexts,
-            language=language,
-            province=province,
-            history=[],
-        )
-        llm_time_ms = int((time.perf_counter() - llm_start) * 1000)
-
-        total_time_ms = int((time.perf_counter() - request_start_time) * 1000)
-        decision = "ANSWER_WITH_SOURCES" if has_verified_sources else "ANSWER_NO_SOURCES"
-
-        try:
-            log_rag_evaluation_async.delay(
-                user_id=g.user.id,
-                conversation_id=None,
-                language=language,
-                safe_mode=True,
-                is_new_conversation=True,
-                question=q,
-                answer=answer,
-                threshold=threshold,
-                best_distance=best_distance,
-                contexts_found=len(hits),
-                contexts_used=len(contexts),
-                in_domain=True,
-                decision=decision,
-                chunk_ids=chunk_ids,
-                embedding_time_ms=embedding_time_ms,
-                llm_time_ms=llm_time_ms,
-                total_time_ms=total_time_ms,
-                embedding_model=current_app.config["EMBEDDING_MODEL"],
-                embedding_dimension=current_app.config.get("EMBEDDING_DIMENSION"),
-                chat_model=current_app.config.get("CHAT_MODEL"),
-                prompt_messages=prompt_messages,
-                completion_text=answer,
-            )
-        except Exception as e:
-            current_app.logger.warning("Failed to queue evaluation task: %s", str(e))
-
-        return jsonify({"answer": answer, "conversationId": None, "contextsUsed": len(contexts)})
-
-
-    is_new_conversation = conv_id is None
-
-    if conv_id is not None:
-        try:
-            conv_id = int(conv_id)
-        except (TypeError, ValueError):
-            raise BadRequest("conversationId must be an integer")
-        conv = _get_conversation_or_404(conv_id, g.user.id)
-    else:
-        conv = ChatConversation(
-            user_id=g.user.id,
-            title=_summarize_title(q),
+                conv_id = int(conv_id)
+            except (TypeError, ValueError):
+                raise BadRequest("conversationId must be an integer")
+            _get_conversation_or_404(conv_id, user_id)
+        else:
+            conv = ChatConversation(user_id=user_id, title=_summarize_title(q))
+            db.session.add(conv)
+            db.session.commit()
+            conv_id = conv.id
+        memory = (
+            {"summary": None, "messages": []}
+            if is_new_conversation
+            else ConversationMemoryService.load(conv_id, user_id)
         )
-        db.session.add(conv)
-        db.session.commit()
-        conv_id = conv.id
-
-    history = _recent_conversation_messages(conv_id, limit=memory_limit)
 
-    if _detect_emergency_fast(q):
-        route = {"category": "EMERGENCY", "confidence": 1.0, "topic": "emergency"}
-    else:
-        route = LLMService.classify_query(question=q, language=language)
-
-    category = route.get("category")
-    topic = route.get("topic") or "other"
-
-    current_app.logger.info(
-        "Chat classify: safe_mode=0 user_id=%s conv_id=%s lang=%s category=%s topic=%s conf=%s",
-        getattr(g.user, "id", None),
-        conv_id,
-        language,
-        category,
-        topic,
-        route.get("confidence"),
+    return AskContext(
+        user_id=user_id,
+        question=q,
+        language=(getattr(g.user, "language", None) or "en"),
+        province=getattr(g.user, "province", None),
+        safe_mode=safe_mode,
+        conversation_id=conv_id,
+        is_new_conversation=is_new_conversation,
+        memory=memory,
+        started_at=started_at,
     )
 
-    if category == "GREETING_OR_APP_HELP":
-        msg = (
-            "Hello! I can help with legal awareness for women in Pakistan (workplace harassment, domestic violence, family matters, cyber harassment). "
-            "Please describe your situation and I will guide you."
-            if language != "ur"
-            else
-            "السلام علیکم! میں پاکستان میں خواتین کے لیے قانونی آگاہی میں مدد کر سکتی ہوں (کام کی جگہ ہراسانی، گھریلو تشدد، خاندانی معاملات، سائبر ہراسانی)۔ "
-            "براہِ کرم اپنا مسئلہ بتائیں، میں رہنمائی کروں گی۔"
-        )
-
-        ChatMessage.add_and_trim(
-            user_id=g.user.id,
-            conversation_id=conv_id,
-            role="user",
-            content=q,
-            max_messages=100,
-            commit=False,
-        )
-        ChatMessage.add_and_trim(
-            user_id=g.user.id,
-            conversation_id=conv_id,
-            role="assistant",
-            content=msg,
-            max_messages=100,
-            commit=False,
-        )
-        db.session.commit()
-
-        return jsonify({"answer": msg, "conversationId": conv_id, "contextsUsed": 0})
-
-    if category == "EMERGENCY":
-        emergency_msg = LLMService.emergency_response(language=language, province=province)
-
-        ChatMessage.add_and_trim(
-            user_id=g.user.id,
-            conversation_id=conv_id,
-            role="user",
-            content=q,
-            max_messages=100,
-            commit=False,
-        )
-        ChatMessage.add_and_trim(
-            user_id=g.user.id,
-            conversation_id=conv_id,
-            role="assistant",
-            content=emergency_msg,
-            max_messages=100,
-            commit=False,
-        )
-        db.session.commit()
+@bp.post("/ask")
+@require_auth()
+@idempotent("chat-ask")
+def ask():
+    data = request.get_json() or {}
+    request_start_time = time.perf_counter()
+    start_request_deadline()
 
-        total_time_ms = int((time.perf_counter() - request_start_time) * 1000)
-        try:
-            log_rag_evaluation_async.delay(
-                user_id=g.user.id,
-                conversation_id=conv_id,
-                language=language,
-                safe_mode=False,
-                is_new_conversation=is_new_conversation,
-                question=q,
-                answer=emergency_msg,
-                threshold=None,
-                best_distance=None,
-                contexts_found=0,
-                contexts_used=0,
-                in_domain=True,
-                decision="EMERGENCY",
-                chunk_ids=[],
-                embedding_time_ms=0,
-                llm_time_ms=0,
-                total_time_ms=total_time_ms,
-                embedding_model=current_app.config["EMBEDDING_MODEL"],
-                embedding_dimension=current_app.config.get("EMBEDDING_DIMENSION"),
-                chat_model=current_app.config.get("CHAT_MODEL"),
-                prompt_messages=None,
-                completion_text=emergency_msg,
-            )
-        except Exception as e:
-            current_app.logger.warning("Failed to queue evaluation task: %s", str(e))
-
-        return jsonify({"answer": emergency_msg, "conversationId": conv_id, "contextsUsed": 0})
-
-    if category in {"OUT_OF_DOMAIN", "PROMPT_INJECTION_OR_MISUSE"}:
-        refusal = (
-            "I am an AI legal lawyer assistant. I can only help you with legal awareness. "
-            "I'm not able to process this query."
-            if language != "ur"
-            else
-            "میں ایک اے آئی لیگل اسسٹنٹ ہوں۔ میں صرف قانونی آگاہی میں مدد کر سکتی ہوں۔ میں اس سوال پر مدد نہیں کر سکتی۔"
-        )
+    ctx = ChatPipeline().run(_start_ask(data, request_start_time))
+    return jsonify(ctx.response())
 
-        ChatMessage.add_and_trim(
-            user_id=g.user.id,
-            conversation_id=conv_id,
-            role="user",
-            content=q,
-            max_messages=100,
-            commit=False,
-        )
-        ChatMessage.add_and_trim(
-            user_id=g.user.id,
-            conversation_id=conv_id,
-            role="assistant",
-            content=refusal,
-            max_messages=100,
-            commit=False,
-        )
-        db.session.commit()
+@bp.post("/jobs")
+@require_auth()
+@idempotent("chat-jobs")
+def create_chat_job():
+    """
+    Queue an ask on the "chat" Celery queue and return immediately.
+    Same payload as /ask plus optional "push": true to be notified on
+    completion; fetch the answer with GET /chat/jobs/<jobId>.
+    """
+    data = request.get_json() or {}
+    # Reserve the job first: without Redis this is a 503 before a new
+    # conversation is committed.
+    job_id = ChatJobService.create(g.user.id, push=bool(data.get("push")))
+    try:
+        ctx = _start_ask(data, time.perf_counter())
+    except Exception:
+        ChatJobService.discard(job_id)
+        raise
 
-        total_time_ms = int((time.perf_counter() - request_start_time) * 1000)
-        try:
-            log_rag_evaluation_async.delay(
-                user_id=g.user.id,
-                conversation_id=conv_id,
-                language=language,
-                safe_mode=False,
-                is_new_conversation=is_new_conversation,
-                question=q,
-                answer=refusal,
-                threshold=None,
-                best_distance=None,
-                contexts_found=0,
-                contexts_used=0,
-                in_domain=False,
-                decision="REFUSE_OUT_OF_DOMAIN",
-                chunk_ids=[],
-                embedding_time_ms=0,
-                llm_time_ms=0,
-                total_time_ms=total_time_ms,
-                embedding_model=current_app.config["EMBEDDING_MODEL"],
-                embedding_dimension=current_app.config.get("EMBEDDING_DIMENSION"),
-                chat_model=current_app.config.get("CHAT_MODEL"),
-                prompt_messages=None,
-                completion_text=refusal,
-            )
-        except Exception as e:
-            current_app.logger.warning("Failed to queue evaluation task: %s", str(e))
-
-        return jsonify({"answer": refusal, "conversationId": conv_id, "contextsUsed": 0})
-
-    embedding_start = time.perf_counter()
-    emb = LLMService.embed(q)
-    embedding_time_ms = int((time.perf_counter() - embedding_start) * 1000)
-
-    hits = RAGService.search_similar_with_scores(emb, language=language)
-    chunk_ids = [h.get("chunk_id") for h in hits if h.get("chunk_id")]
-
-    threshold = RAGService.get_distance_threshold()
-    best_distance = hits[0]["distance"] if hits else None
-
-    has_verified_sources = bool(hits) and (best_distance is not None) and (best_distance <= threshold)
-    contexts = [h["chunk_text"] for h in hits] if has_verified_sources else []
-    decision = "ANSWER_WITH_SOURCES" if has_verified_sources else "ANSWER_NO_SOURCES"
-
-    llm_start = time.perf_counter()
-    answer, prompt_messages, _ = LLMService.chat_legal_awareness(
-        question=q,
-        contexts=contexts,
-        language=language,
-        province=province,
-        history=history,
-    )
-    llm_time_ms = int((time.perf_counter() - llm_start) * 1000)
+    ChatJobService.queue(job_id, ctx)
+    try:
+        run_chat_job.delay(job_id)
+    except Exception as e:
+        current_app.logger.error("Chat job enqueue failed job_id=%s: %s", job_id, str(e))
+        ChatJobService.update(job_id, status="failed", error="Chat job could not be queued")
+        raise ServiceUnavailable("Chat queue unavailable, please retry")
+    return jsonify({"jobId": job_id, "status": "queued", "conversationId": ctx.conversation_id}), 202
 
-    ChatMessage.add_and_trim(
-        user_id=g.user.id,
-        conversation_id=conv_id,
-        role="user",
-        content=q,
-        max_messages=100,
-        commit=False,
-    )
-    ChatMessage.add_and_trim(
-        user_id=g.user.id,
-        conversation_id=conv_id,
-        role="assistant",
-        content=answer,
-        max_messages=100,
-        commit=False,
-    )
-    db.session.commit()
+@bp.get("/jobs/<job_id>")
+@require_auth()
+def get_chat_job(job_id: str):
+    """
+    Job status and, once done, the /ask response. ?wait=<seconds> holds the
+    request for up to CHAT_JOB_MAX_WAIT_SECONDS (2s by default) for the job
+    to finish. The wait occupies a web worker, so keep it short; clients
+    poll again or use push for long answers.
+    """
+    try:
+        wait_s = float(request.args.get("wait", 0))
+    except ValueError:
+        raise BadRequest("wait must be a number")
+    wait_s = min(max(wait_s, 0.0), float(current_app.config.get("CHAT_JOB_MAX_WAIT_SECONDS", 2)))
 
-    total_time_ms = int((time.perf_counter() - request_start_time) * 1000)
+    job = ChatJobService.get(job_id)
+    if job is None:
+        raise NotFound("Chat job not found")
+    if int(job["user_id"]) != g.user.id:
+        raise Forbidden("Not yours")
 
-    try:
-        log_rag_evaluation_async.delay(
-            user_id=g.user.id,
-            conversation_id=conv_id,
-            language=language,
-            safe_mode=False,
-            is_new_conversation=is_new_conversation,
-            question=q,
-            answer=answer,
-            threshold=threshold,
-            best_distance=best_distance,
-            contexts_found=len(hits),
-            contexts_used=len(contexts),
-            in_domain=True,
-            decision=decision,
-            chunk_ids=chunk_ids,
-            embedding_time_ms=embedding_time_ms,
-            llm_time_ms=llm_time_ms,
-            total_time_ms=total_time_ms,
-            embedding_model=current_app.config["EMBEDDING_MODEL"],
-            embedding_dimension=current_app.config.get("EMBEDDING_DIMENSION"),
-            chat_model=current_app.config.get("CHAT_MODEL"),
-            prompt_messages=prompt_messages,
-            completion_text=answer,
-        )
-    except Exception as e:
-        current_app.logger.warning("Failed to queue evaluation task: %s", str(e))
+    if wait_s and job["status"] not in TERMINAL:
+        db.session.close()
+        job = ChatJobService.wait(job_id, wait_s) or job
 
-    return jsonify({"answer": answer, "conversationId": conv_id, "contextsUsed": len(contexts)})
+    return jsonify(ChatJobService.public_view(job_id, job))
 
 @bp.get("/conversations")
 @require_auth()
 def list_conversations():
+    """
+    Most recently updated conversations first, in a single query: the
+    last-message snippet is denormalized onto ChatConversation.
+
+    Pass ?before=<nextCursor> for keyset pagination on (updated_at, id);
+    ?page= is still accepted for older clients and uses OFFSET.
+    """
     try:
         page = int(request.args.get("page", 1))
         limit = int(request.args.get("limit", 20))
@@ -505,19 +179,28 @@ def list_conversations():
     q = (
         ChatConversation.query
         .filter_by(user_id=g.user.id)
-        .order_by(ChatConversation.updated_at.desc())
+        .order_by(ChatConversation.updated_at.desc(), ChatConversation.id.desc())
     )
-    items = q.offset((page - 1) * limit).limit(limit).all()
+
+    before = request.args.get("before")
+    if before:
+        try:
+            before_ts, before_id = decode_cursor(before)
+        except ValueError:
+            raise BadRequest("before must be a cursor returned as nextCursor")
+        q = q.filter(tuple_(ChatConversation.updated_at, ChatConversation.id) < (before_ts, before_id))
+        page = 1
+    else:
+        q = q.offset((page - 1) * limit)
+
+    items = q.limit(limit + 1).all()
+    has_more = len(items) > limit
+    items = items[:limit]
+    next_cursor = encode_cursor(items[-1].updated_at, items[-1].id) if has_more else None
 
     result = []
     for c in items:
-        last_msg = (
-            ChatMessage.query
-            .filter_by(conversation_id=c.id, user_id=g.user.id)
-            .order_by(ChatMessage.created_at.desc())
-            .first()
-        )
-        last_snip = (last_msg.content[:120] + "…") if last_msg else ""
+        last_snip = (c.last_message_snippet + "…") if c.last_message_at else ""
         result.append({
             "id": c.id,
             "title": c.title,
@@ -526,11 +209,18 @@ def list_conversations():
             "lastMessageSnippet": last_snip,
         })
 
-    return jsonify({"page": page, "limit": limit, "items": result})
+    return jsonify({"page": page, "limit": limit, "nextCursor": next_cursor, "items": result})
 
 @bp.get("/conversations/<int:cid>/messages")
 @require_auth()
 def get_conversation_messages(cid: int):
+    """
+    Newest-first pages of a conversation, returned in chronological order.
+
+    Pass ?before=<nextCursor> to keyset-paginate backwards through history
+    (uses ix_chat_messages_conversation_created, cost independent of depth).
+    ?page= is still accepted for older clients and uses OFFSET.
+    """
     conv = _get_conversation_or_404(cid, g.user.id)
 
     try:
@@ -545,9 +235,27 @@ def get_conversation_messages(cid: int):
     q = (
         ChatMessage.query
         .filter_by(conversation_id=conv.id, user_id=g.user.id)
-        .order_by(ChatMessage.created_at.desc())
+        .order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+    )
+
+    before = request.args.get("before")
+    if before:
+        try:
+            before_ts, before_id = decode_cursor(before)
+        except ValueError:
+            raise BadRequest("before must be a cursor returned as nextCursor")
+        q = q.filter(tuple_(ChatMessage.created_at, ChatMessage.id) < (before_ts, before_id))
+        page = 1
+    else:
+        q = q.offset((page - 1) * limit)
+
+    msgs_desc = q.limit(limit + 1).all()
+    has_more = len(msgs_desc) > limit
+    msgs_desc = msgs_desc[:limit]
+    next_cursor = (
+        encode_cursor(msgs_desc[-1].created_at, msgs_desc[-1].id)
+        if has_more else None
     )
-    msgs_desc = q.offset((page - 1) * limit).limit(limit).all()
     msgs = list(reversed(msgs_desc))
 
     return jsonify({
@@ -555,6 +263,7 @@ def get_conversation_messages(cid: int):
         "title": conv.title,
         "page": page,
         "limit": limit,
+        "nextCursor": next_cursor,
         "items": [
             {
                 "id": m.id,
@@ -578,6 +287,7 @@ def rename_conversation(cid: int):
 
     conv.title = title
     db.session.commit()
+    ChatHistoryCache.invalidate(conv.id)
     return jsonify({"ok": True})
 
 @bp.delete("/conversations/<int:cid>")
@@ -588,5 +298,6 @@ def delete_conversation(cid: int):
     ChatMessage.query.filter_by(conversation_id=conv.id).delete()
     ChatConversation.query.filter_by(id=conv.id).delete()
     db.session.commit()
+    ChatHistoryCache.invalidate(conv.id)
 
     return jsonify({"ok": True})
\ No newline at end of file
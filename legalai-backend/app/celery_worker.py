@@ -5,8 +5,12 @@ This module creates the Flask app and binds Celery to it,
 ensuring all tasks run inside Flask application context.
 
 Usage:
-    celery -A app.celery_worker:celery worker --loglevel=info --pool=solo
+    celery -A app.celery_worker:celery worker -Q celery,chat --loglevel=info --pool=solo
     celery -A app.celery_worker:celery beat --loglevel=info
+
+Chat jobs (POST /chat/jobs) run on the "chat" queue; in production give them
+their own workers so they never wait behind ingestion:
+    celery -A app.celery_worker:celery worker -Q chat --loglevel=info --concurrency=8
 """
 
 from __future__ import annotations
@@ -47,6 +47,67 @@ class Config:
     CHAT_MODEL = os.getenv("CHAT_MODEL", "gpt-4o-mini")
     RAG_TOP_K = int(os.getenv("RAG_TOP_K", "5"))
 
+    # Above the Redis broker's 1h visibility timeout, so a job whose worker
+    # crashed still exists when its message is redelivered.
+    CHAT_JOB_TTL_SECONDS = int(os.getenv("CHAT_JOB_TTL_SECONDS", "7200"))
+    CHAT_JOB_TIMEOUT_SECONDS = float(os.getenv("CHAT_JOB_TIMEOUT_SECONDS", "60"))
+    CHAT_JOB_MAX_WAIT_SECONDS = float(os.getenv("CHAT_JOB_MAX_WAIT_SECONDS", "2"))
+    # A running job whose worker died is re-runnable after timeout + grace.
+    CHAT_JOB_LEASE_GRACE_SECONDS = float(os.getenv("CHAT_JOB_LEASE_GRACE_SECONDS", "30"))
+    CHAT_JOB_MAX_ATTEMPTS = int(os.getenv("CHAT_JOB_MAX_ATTEMPTS", "2"))
+
+    SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "True").lower() == "true"
+    SINGLE_FLIGHT_LOCK_SECONDS = float(os.getenv("SINGLE_FLIGHT_LOCK_SECONDS", "30"))
+    SINGLE_FLIGHT_RESULT_TTL_SECONDS = int(os.getenv("SINGLE_FLIGHT_RESULT_TTL_SECONDS", "5"))
+    SINGLE_FLIGHT_MAX_WAIT_SECONDS = float(os.getenv("SINGLE_FLIGHT_MAX_WAIT_SECONDS", "20"))
+
+    # Emergency fast-path lexicon; defaults to app/data/emergency_lexicon.json.
+    EMERGENCY_LEXICON_PATH = os.getenv("EMERGENCY_LEXICON_PATH", "")
+
+    RAG_EVAL_BUFFER_ENABLED = os.getenv("RAG_EVAL_BUFFER_ENABLED", "True").lower() == "true"
+    RAG_EVAL_BUFFER_STREAM = os.getenv("RAG_EVAL_BUFFER_STREAM", "rag:eval:buffer")
+    RAG_EVAL_BUFFER_MAXLEN = int(os.getenv("RAG_EVAL_BUFFER_MAXLEN", "100000"))
+    RAG_EVAL_BUFFER_BATCH_SIZE = int(os.getenv("RAG_EVAL_BUFFER_BATCH_SIZE", "500"))
+    RAG_EVAL_BUFFER_MAX_BATCHES = int(os.getenv("RAG_EVAL_BUFFER_MAX_BATCHES", "20"))
+    RAG_EVAL_BUFFER_FLUSH_SECONDS = float(os.getenv("RAG_EVAL_BUFFER_FLUSH_SECONDS", "10"))
+    RAG_EVAL_BUFFER_CLAIM_IDLE_SECONDS = int(os.getenv("RAG_EVAL_BUFFER_CLAIM_IDLE_SECONDS", "60"))
+    RAG_METRICS_ROLLUP_INTERVAL_SECONDS = float(os.getenv("RAG_METRICS_ROLLUP_INTERVAL_SECONDS", "300"))
+    # Completed hours re-aggregated on each refresh, for evaluations drained late.
+    RAG_METRICS_ROLLUP_LOOKBACK_HOURS = int(os.getenv("RAG_METRICS_ROLLUP_LOOKBACK_HOURS", "3"))
+    RAG_METRICS_MAX_DAYS = int(os.getenv("RAG_METRICS_MAX_DAYS", "90"))
+
+    CIRCUIT_WINDOW_SECONDS = float(os.getenv("CIRCUIT_WINDOW_SECONDS", "60"))
+    CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "10"))
+    CIRCUIT_ERROR_RATE = float(os.getenv("CIRCUIT_ERROR_RATE", "0.5"))
+    CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+    ADAPTIVE_TIMEOUT_MULTIPLIER = float(os.getenv("ADAPTIVE_TIMEOUT_MULTIPLIER", "2.0"))
+    ADAPTIVE_TIMEOUT_MIN_SECONDS = float(os.getenv("ADAPTIVE_TIMEOUT_MIN_SECONDS", "3"))
+
+    EMBED_BATCH_MODE = os.getenv("EMBED_BATCH_MODE", "off")
+    EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))
+    EMBED_BATCH_MAX = int(os.getenv("EMBED_BATCH_MAX", "32"))
+    EMBED_BATCH_WAIT_SECONDS = float(os.getenv("EMBED_BATCH_WAIT_SECONDS", "45"))
+    CHAT_REQUEST_TIMEOUT_SECONDS = float(os.getenv("CHAT_REQUEST_TIMEOUT_SECONDS", "25"))
+    CHAT_DEADLINE_RESERVE_SECONDS = float(os.getenv("CHAT_DEADLINE_RESERVE_SECONDS", "0.5"))
+    CHAT_DEADLINE_MIN_CALL_SECONDS = float(os.getenv("CHAT_DEADLINE_MIN_CALL_SECONDS", "1"))
+    CHAT_DEADLINE_MIN_CLASSIFY_SECONDS = float(os.getenv("CHAT_DEADLINE_MIN_CLASSIFY_SECONDS", "3"))
+    CHAT_DEADLINE_MIN_ANSWER_SECONDS = float(os.getenv("CHAT_DEADLINE_MIN_ANSWER_SECONDS", "5"))
+    LLM_RATE_LIMIT_RPM = float(os.getenv("LLM_RATE_LIMIT_RPM", "0"))
+    LLM_RATE_LIMIT_TPM = float(os.getenv("LLM_RATE_LIMIT_TPM", "0"))
+    LLM_RATE_LIMITS = os.getenv("LLM_RATE_LIMITS", "")
+    LLM_RATE_LIMIT_BATCH_RESERVE = float(os.getenv("LLM_RATE_LIMIT_BATCH_RESERVE", "0.3"))
+    LLM_RATE_LIMIT_MAX_WAIT_SECONDS = float(os.getenv("LLM_RATE_LIMIT_MAX_WAIT_SECONDS", "2"))
+    LLM_RATE_LIMIT_BATCH_MAX_WAIT_SECONDS = float(os.getenv("LLM_RATE_LIMIT_BATCH_MAX_WAIT_SECONDS", "300"))
+    LOCAL_LLM_EMBED_LATENCY_MS = float(os.getenv("LOCAL_LLM_EMBED_LATENCY_MS", "20"))
+    LOCAL_LLM_CHAT_LATENCY_MS = float(os.getenv("LOCAL_LLM_CHAT_LATENCY_MS", "300"))
+    LOCAL_LLM_TOKEN_LATENCY_MS = float(os.getenv("LOCAL_LLM_TOKEN_LATENCY_MS", "0"))
+    LOCAL_LLM_LATENCY_DISTRIBUTION = os.getenv("LOCAL_LLM_LATENCY_DISTRIBUTION", "fixed")
+    LOCAL_LLM_LATENCY_JITTER_MS = float(os.getenv("LOCAL_LLM_LATENCY_JITTER_MS", "0"))
+    LOCAL_LLM_SEED = os.getenv("LOCAL_LLM_SEED", "0")
+    LOCAL_LLM_CLASSIFY_CATEGORY = os.getenv("LOCAL_LLM_CLASSIFY_CATEGORY", "IN_DOMAIN_LEGAL")
+    LOCAL_LLM_COMPLETION_TOKENS = int(os.getenv("LOCAL_LLM_COMPLETION_TOKENS", "200"))
+    ANTHROPIC_PROMPT_CACHE = os.getenv("ANTHROPIC_PROMPT_CACHE", "True").lower() == "true"
+
     FCM_SERVER_KEY = os.getenv("FCM_SERVER_KEY")
     APNS_KEY_ID = os.getenv("APNS_KEY_ID")
     APNS_TEAM_ID = os.getenv("APNS_TEAM_ID")
@@ -59,8 +120,37 @@ class Config:
 
     RATELIMIT_STORAGE_URI = os.getenv("RATELIMIT_STORAGE_URI") or REDIS_URL
     RATELIMIT_DEFAULT = os.getenv("RATELIMIT_DEFAULT", "120 per minute")
+    RATELIMIT_ENABLED = os.getenv("RATELIMIT_ENABLED", "True").lower() == "true"
     RATELIMIT_HEADERS_ENABLED = True
+
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+    TRACING_ENABLED = os.getenv("TRACING_ENABLED", "False").lower() == "true"
+    TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "otlp")  # otlp | file | console | memory
+    TRACING_FILE_PATH = os.getenv("TRACING_FILE_PATH", "logs/traces.jsonl")
+    TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "legalai-backend")
+    TRACING_SAMPLE_RATIO = float(os.getenv("TRACING_SAMPLE_RATIO", "1.0"))
+    # Adds X-DB-Query-Count to every response (load testing / profiling only).
+    DB_QUERY_COUNT_HEADER = os.getenv("DB_QUERY_COUNT_HEADER", "False").lower() == "true"
+    # Per-request SQL profiler: Server-Timing header, budget and N+1 warnings.
+    # Off by default outside development: Server-Timing exposes DB timings.
+    SQL_PROFILER_ENABLED = os.getenv("SQL_PROFILER_ENABLED", str(DEBUG)).lower() == "true"
+    SQL_QUERY_BUDGET = int(os.getenv("SQL_QUERY_BUDGET", "30"))
+    SQL_TIME_BUDGET_MS = float(os.getenv("SQL_TIME_BUDGET_MS", "200"))
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
     CHAT_MEMORY_LIMIT = int(os.getenv("CHAT_MEMORY_LIMIT", "10"))
+    CHAT_HISTORY_MAX_MESSAGES = int(os.getenv("CHAT_HISTORY_MAX_MESSAGES", "100"))
+    CHAT_HISTORY_TRIM_SLACK = int(os.getenv("CHAT_HISTORY_TRIM_SLACK", "20"))
+    CHAT_HISTORY_CACHE_ENABLED = os.getenv("CHAT_HISTORY_CACHE_ENABLED", "True").lower() == "true"
+    IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+    IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+    IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "1"))
+    IDEMPOTENCY_RETRY_AFTER_SECONDS = int(os.getenv("IDEMPOTENCY_RETRY_AFTER_SECONDS", "2"))
+    CHAT_HISTORY_CACHE_TTL_SECONDS = int(os.getenv("CHAT_HISTORY_CACHE_TTL_SECONDS", "1800"))
+    CHAT_MEMORY_RAW_TURNS = int(os.getenv("CHAT_MEMORY_RAW_TURNS", "2"))
+    CHAT_MEMORY_SUMMARY_ENABLED = os.getenv("CHAT_MEMORY_SUMMARY_ENABLED", "True").lower() == "true"
+    CHAT_SUMMARY_MAX_TOKENS = int(os.getenv("CHAT_SUMMARY_MAX_TOKENS", "300"))
     
     EMBEDDING_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", "3072"))
     EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL", "text-embedding-3-large")
\ No newline at end of file
@@ -1,7 +1,17 @@
-from datetime import datetime
-from sqlalchemy import func
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert, update
 from ..extensions import db
 
+SNIPPET_LEN = 120
+
+# session.info key holding [(conversation_id, [{"id", "role", "content"}])]
+# for messages added in the current transaction; the chat history cache
+# consumes it once the session commits.
+APPENDED_MESSAGES_KEY = "chat_messages_appended"
+
+
+def _record_appended(conversation_id: int, messages: list[dict]) -> None:
+    db.session().info.setdefault(APPENDED_MESSAGES_KEY, []).append((conversation_id, messages))
 
 class ChatConversation(db.Model):
     __tablename__ = "chat_conversations"
@@ -14,6 +24,13 @@ class ChatConversation(db.Model):
         nullable=False,
     )
     title = db.Column(db.String(200), nullable=False, default="Chat")
+    summary = db.Column(db.Text)
+    summary_through_message_id = db.Column(db.BigInteger)
+    summary_updated_at = db.Column(db.DateTime)
+    message_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    # Denormalized from the newest ChatMessage so the conversation list is one query.
+    last_message_snippet = db.Column(db.String(SNIPPET_LEN))
+    last_message_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(
         db.DateTime,
@@ -30,6 +47,17 @@ class ChatConversation(db.Model):
         order_by="ChatMessage.created_at.asc()",
     )
 
+    __table_args__ = (
+        # Serves the conversation list:
+        # WHERE user_id = ? ORDER BY updated_at DESC, id DESC
+        db.Index(
+            "ix_chat_conversations_user_updated",
+            "user_id",
+            updated_at.desc(),
+            id.desc(),
+        ),
+    )
+
 
 class ChatMessage(db.Model):
     __tablename__ = "chat_messages"
@@ -49,8 +77,71 @@ class ChatMessage(db.Model):
     )
     role = db.Column(db.String(10), nullable=False) 
     content = db.Column(db.Text, nullable=False)
+    # Set on the answer of a POST /chat/jobs turn, so a job taken over after
+    # its lease expired cannot record the same turn twice.
+    job_id = db.Column(db.String(32), unique=True, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
+    __table_args__ = (
+        # Serves history pages, memory loads and trims:
+        # WHERE conversation_id = ? ORDER BY created_at DESC, id DESC
+        db.Index(
+            "ix_chat_messages_conversation_created",
+            "conversation_id",
+            created_at.desc(),
+            id.desc(),
+        ),
+    )
+
+    @staticmethod
+    def add_turn(
+        *,
+        user_id: int,
+        conversation_id: int,
+        question: str,
+        answer: str,
+        max_messages: int = 100,
+        trim_slack: int = 20,
+        commit: bool = False,
+        job_id: str | None = None,
+    ):
+        """
+        Append a user/assistant pair in one INSERT and bump the conversation's
+        message_count in one UPDATE. History is only trimmed back to
+        max_messages once it exceeds max_messages + trim_slack, so a typical
+        turn costs two statements.
+        commit=False lets caller commit once for atomicity.
+        job_id marks the answer; a second turn for the same job fails the
+        commit with IntegrityError.
+        """
+        now = datetime.utcnow()
+        ids = db.session.execute(
+            insert(ChatMessage).returning(ChatMessage.id, sort_by_parameter_order=True),
+            [
+                {"user_id": user_id, "conversation_id": conversation_id, "role": "user",
+                 "content": question, "job_id": None, "created_at": now},
+                {"user_id": user_id, "conversation_id": conversation_id, "role": "assistant",
+                 "content": answer, "job_id": job_id, "created_at": now + timedelta(microseconds=1)},
+            ],
+        ).scalars().all()
+        _record_appended(conversation_id, [
+            {"id": ids[0], "role": "user", "content": question},
+            {"id": ids[1], "role": "assistant", "content": answer},
+        ])
+        ChatMessage._after_append(
+            conversation_id, 2, answer, now + timedelta(microseconds=1), max_messages, trim_slack
+        )
+
+        if commit:
+            db.session.commit()
+
+    @staticmethod
+    def job_answer(job_id: str) -> str | None:
+        """The answer already recorded for a chat job, if any."""
+        return db.session.execute(
+            db.select(ChatMessage.content).where(ChatMessage.job_id == job_id)
+        ).scalar_one_or_none()
+
     @staticmethod
     def add_and_trim(
         *,
@@ -59,37 +150,80 @@ class ChatMessage(db.Model):
         role: str,
         content: str,
         max_messages: int = 100,
+        trim_slack: int = 20,
         commit: bool = False,
     ):
         """
-        Append message and keep only latest N per conversation.
+        Append a single message and keep roughly the latest N per conversation
+        (same amortized trimming as add_turn).
         commit=False lets caller commit once for atomicity.
         """
-        db.session.add(
-            ChatMessage(
-                user_id=user_id,
-                conversation_id=conversation_id,
-                role=role,
-                content=content,
-            )
+        msg = ChatMessage(
+            user_id=user_id,
+            conversation_id=conversation_id,
+            role=role,
+            content=content,
         )
+        db.session.add(msg)
         db.session.flush()
+        _record_appended(conversation_id, [
+            {"id": msg.id, "role": role, "content": content},
+        ])
+        ChatMessage._after_append(conversation_id, 1, content, msg.created_at, max_messages, trim_slack)
 
+        if commit:
+            db.session.commit()
+
+    @staticmethod
+    def _after_append(
+        conversation_id: int,
+        added: int,
+        last_content: str,
+        last_at: datetime,
+        max_messages: int,
+        trim_slack: int,
+    ) -> None:
+        count = db.session.execute(
+            update(ChatConversation)
+            .where(ChatConversation.id == conversation_id)
+            .values(
+                message_count=ChatConversation.message_count + added,
+                last_message_snippet=(last_content or "")[:SNIPPET_LEN],
+                last_message_at=last_at,
+                updated_at=datetime.utcnow(),
+            )
+            .returning(ChatConversation.message_count)
+        ).scalar()
+
+        if count is not None and count > max_messages + trim_slack:
+            ChatMessage.trim_conversation(conversation_id, max_messages)
+
+    @staticmethod
+    def trim_conversation(conversation_id: int, max_messages: int = 100) -> int:
+        """
+        Delete all but the latest max_messages of a conversation and resync
+        its message_count. Returns the number of deleted messages.
+        """
         subq = (
             ChatMessage.query
-            .filter_by(user_id=user_id, conversation_id=conversation_id)
-            .order_by(ChatMessage.created_at.desc())
+            .filter_by(conversation_id=conversation_id)
+            .order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
             .offset(max_messages)
             .with_entities(ChatMessage.id)
             .subquery()
         )
-        ChatMessage.query.filter(ChatMessage.id.in_(subq)).delete(
+        deleted = ChatMessage.query.filter(ChatMessage.id.in_(subq)).delete(
             synchronize_session=False
         )
 
+        remaining = (
+            ChatMessage.query
+            .filter_by(conversation_id=conversation_id)
+            .with_entities(func.count(ChatMessage.id))
+            .scalar()
+        )
         ChatConversation.query.filter_by(id=conversation_id).update(
-            {"updated_at": datetime.utcnow()}
+            {"message_count": remaining, "updated_at": ChatConversation.updated_at},
+            synchronize_session=False,
         )
-
-        if commit:
-            db.session.commit()
\ No newline at end of file
+        return deleted
@@ -1,5 +1,6 @@
 from datetime import datetime
-from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy import JSON
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from ..extensions import db
 
 
@@ -52,10 +53,12 @@ class RAGEvaluationLog(db.Model):
     embedding_time_ms = db.Column(db.Integer, nullable=False)
     llm_time_ms = db.Column(db.Integer)
     total_time_ms = db.Column(db.Integer, nullable=False)
+    stage_timings = db.Column(JSON().with_variant(JSONB, "postgresql"))
     
     prompt_tokens = db.Column(db.Integer)
     completion_tokens = db.Column(db.Integer)
     total_tokens = db.Column(db.Integer)
+    cached_tokens = db.Column(db.Integer)
     
     embedding_model = db.Column(db.String(100), nullable=False)
     embedding_dimension = db.Column(db.Integer)
@@ -69,4 +72,40 @@ class RAGEvaluationLog(db.Model):
     error_type = db.Column(db.String(100))
     error_message = db.Column(db.Text)
     
-    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
\ No newline at end of file
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+class RAGMetricsHourly(db.Model):
+    """
+    Hourly rollup of rag_evaluation_logs for the admin metrics summary.
+
+    One row per completed UTC hour that saw traffic, maintained by the
+    refresh_rag_metrics_rollup beat task (RAGMetricsService). Averages are
+    stored as sum + count pairs so any range of hours can be merged.
+    """
+
+    __tablename__ = "rag_metrics_hourly"
+
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+
+    total_queries = db.Column(db.Integer, nullable=False, default=0)
+    answer_with_sources_count = db.Column(db.Integer, nullable=False, default=0)
+    answer_no_sources_count = db.Column(db.Integer, nullable=False, default=0)
+    degraded_count = db.Column(db.Integer, nullable=False, default=0)
+    emergency_count = db.Column(db.Integer, nullable=False, default=0)
+    refused_count = db.Column(db.Integer, nullable=False, default=0)
+    in_domain_count = db.Column(db.Integer, nullable=False, default=0)
+    fallback_count = db.Column(db.Integer, nullable=False, default=0)
+    error_count = db.Column(db.Integer, nullable=False, default=0)
+
+    total_time_ms_sum = db.Column(db.BigInteger, nullable=False, default=0)
+    embedding_time_ms_sum = db.Column(db.BigInteger, nullable=False, default=0)
+    llm_time_ms_count = db.Column(db.Integer, nullable=False, default=0)
+    llm_time_ms_sum = db.Column(db.BigInteger, nullable=False, default=0)
+    total_tokens_count = db.Column(db.Integer, nullable=False, default=0)
+    total_tokens_sum = db.Column(db.BigInteger, nullable=False, default=0)
+    best_distance_count = db.Column(db.Integer, nullable=False, default=0)
+    best_distance_sum = db.Column(db.Float, nullable=False, default=0)
+    contexts_used_sum = db.Column(db.BigInteger, nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
\ No newline at end of file
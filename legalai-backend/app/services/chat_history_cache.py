@@ -0,0 +1,199 @@
+"""
+Write-through Redis cache of each conversation's recent message window.
+
+Users usually send several messages to the same conversation within minutes,
+so ConversationMemoryService.load reads the last CHAT_MEMORY_LIMIT messages
+from a Redis list (chat:history:<conversation_id>) instead of Postgres.
+
+- Filled from the DB on a cache miss
+- Appended with the messages ChatMessage.add_turn / add_and_trim record in
+  session.info, only after the session commits (a listener registered here)
+- Invalidated on conversation rename and delete
+- Expires after CHAT_HISTORY_CACHE_TTL_SECONDS without activity
+
+Every append and invalidate bumps a per-conversation generation
+(chat:history:gen:<conversation_id>), even when the window is not cached.
+A reader takes the generation before its DB query and fill() only writes if
+it is unchanged, so a turn committed between the read and the fill can never
+be hidden behind a stale window. Appends to a cached window skip messages at
+or below its last id, so a fill that already read a turn does not repeat it.
+
+Without REDIS_URL (or with CHAT_HISTORY_CACHE_ENABLED off) every call is a
+no-op and history is read from the DB as before.
+"""
+import json
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ..models.chat import APPENDED_MESSAGES_KEY
+from ..utils.metrics import count_cache
+from ..utils.redis_client import get_redis
+
+# KEYS: window, generation. ARGV: expected generation, window size, ttl,
+# messages (JSON). Writes only if nothing was appended since the reader
+# took the generation.
+_FILL_LUA = """
+local gen = redis.call('GET', KEYS[2]) or '0'
+if gen ~= ARGV[1] then
+  return 0
+end
+redis.call('DEL', KEYS[1])
+for i = 4, #ARGV do
+  redis.call('RPUSH', KEYS[1], ARGV[i])
+end
+redis.call('LTRIM', KEYS[1], -tonumber(ARGV[2]), -1)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+# KEYS: window, generation. ARGV: window size, ttl, messages (JSON, ascending
+# ids). Always bumps the generation; extends the window only if cached.
+_APPEND_LUA = """
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+local last = redis.call('LINDEX', KEYS[1], -1)
+if not last then
+  return 0
+end
+local last_id = tonumber(cjson.decode(last)['id']) or 0
+for i = 3, #ARGV do
+  if tonumber(cjson.decode(ARGV[i])['id']) > last_id then
+    redis.call('RPUSH', KEYS[1], ARGV[i])
+  end
+end
+redis.call('LTRIM', KEYS[1], -tonumber(ARGV[1]), -1)
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+
+class ChatHistoryCache:
+
+    @staticmethod
+    def _client():
+        if not current_app.config.get("CHAT_HISTORY_CACHE_ENABLED", True):
+            return None
+        return get_redis()
+
+    @staticmethod
+    def _key(conversation_id: int) -> str:
+        return f"chat:history:{conversation_id}"
+
+    @staticmethod
+    def _generation_key(conversation_id: int) -> str:
+        return f"chat:history:gen:{conversation_id}"
+
+    @staticmethod
+    def _window() -> int:
+        return max(1, int(current_app.config.get("CHAT_MEMORY_LIMIT", 10)))
+
+    @staticmethod
+    def _ttl() -> int:
+        return int(current_app.config.get("CHAT_HISTORY_CACHE_TTL_SECONDS", 1800))
+
+    @staticmethod
+    def get(conversation_id: int, limit: int) -> list[dict] | None:
+        """
+        Returns the last `limit` cached messages ({"id", "role", "content"},
+        chronological), or None on a miss.
+        """
+        r = ChatHistoryCache._client()
+        if r is None:
+            return None
+        try:
+            raw = r.lrange(ChatHistoryCache._key(conversation_id), -limit, -1)
+        except Exception as e:
+            current_app.logger.warning("Chat history cache read failed: %s", str(e))
+            return None
+        count_cache("chat_history", hit=bool(raw))
+        if not raw:
+            return None
+        return [json.loads(item) for item in raw]
+
+    @staticmethod
+    def generation(conversation_id: int) -> str | None:
+        """
+        Current generation of the conversation's window; take it before
+        reading the DB and pass it to fill(). None when caching is off.
+        """
+        r = ChatHistoryCache._client()
+        if r is None:
+            return None
+        try:
+            gen = r.get(ChatHistoryCache._generation_key(conversation_id))
+        except Exception as e:
+            current_app.logger.warning("Chat history cache read failed: %s", str(e))
+            return None
+        if isinstance(gen, bytes):
+            gen = gen.decode()
+        return gen or "0"
+
+    @staticmethod
+    def fill(conversation_id: int, messages: list[dict], generation: str | None) -> bool:
+        """
+        Replace the cached window with messages loaded from the DB, unless a
+        message was appended (or the window invalidated) since `generation`
+        was taken. Returns whether the window was written.
+        """
+        r = ChatHistoryCache._client()
+        if r is None or generation is None or not messages:
+            return False
+        try:
+            written = r.register_script(_FILL_LUA)(
+                keys=[ChatHistoryCache._key(conversation_id), ChatHistoryCache._generation_key(conversation_id)],
+                args=[generation, ChatHistoryCache._window(), ChatHistoryCache._ttl(),
+                      *[json.dumps(m) for m in messages]],
+            )
+        except Exception as e:
+            current_app.logger.warning("Chat history cache fill failed: %s", str(e))
+            return False
+        return bool(written)
+
+    @staticmethod
+    def append(conversation_id: int, messages: list[dict]) -> None:
+        """
+        Append committed messages to the cached window (a cold key stays
+        cold) and bump the generation so in-flight fills are discarded.
+        """
+        r = ChatHistoryCache._client()
+        if r is None or not messages:
+            return
+        try:
+            r.register_script(_APPEND_LUA)(
+                keys=[ChatHistoryCache._key(conversation_id), ChatHistoryCache._generation_key(conversation_id)],
+                args=[ChatHistoryCache._window(), ChatHistoryCache._ttl(),
+                      *[json.dumps(m) for m in sorted(messages, key=lambda m: m["id"])]],
+            )
+        except Exception as e:
+            current_app.logger.warning("Chat history cache append failed: %s", str(e))
+            ChatHistoryCache.invalidate(conversation_id)
+
+    @staticmethod
+    def invalidate(conversation_id: int) -> None:
+        r = ChatHistoryCache._client()
+        if r is None:
+            return
+        try:
+            pipe = r.pipeline(transaction=True)
+            pipe.delete(ChatHistoryCache._key(conversation_id))
+            pipe.incr(ChatHistoryCache._generation_key(conversation_id))
+            pipe.expire(ChatHistoryCache._generation_key(conversation_id), ChatHistoryCache._ttl())
+            pipe.execute()
+        except Exception as e:
+            current_app.logger.warning("Chat history cache invalidate failed: %s", str(e))
+
+
+@event.listens_for(Session, "after_commit")
+def _append_committed_messages(session):
+    appended = session.info.pop(APPENDED_MESSAGES_KEY, None)
+    if not appended or not has_app_context():
+        return
+    for conversation_id, messages in appended:
+        ChatHistoryCache.append(conversation_id, messages)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_appended_messages(session):
+    session.info.pop(APPENDED_MESSAGES_KEY, None)
@@ -0,0 +1,148 @@
+"""
+Asynchronous chat jobs (POST /chat/jobs).
+
+The web tier creates the job first (so a missing Redis fails before any
+conversation is written), validates the request, resolves the conversation
+and loads its memory, then hands the AskContext to run_chat_job on the
+dedicated "chat" Celery queue and returns a job id at once. Job state lives
+in a Redis hash (chat:job:<id>) for CHAT_JOB_TTL_SECONDS:
+
+    status       created -> queued -> running -> done | failed
+    lease_until  while running; a worker that dies leaves the job running
+                 with an expired lease, and a redelivered task may take it
+                 over (up to CHAT_JOB_MAX_ATTEMPTS runs); the answer row
+                 carries the job id, so a takeover never adds the turn twice
+    result       the /chat/ask response body once done
+
+Clients poll GET /chat/jobs/<id>, optionally holding each request for up
+to CHAT_JOB_MAX_WAIT_SECONDS with ?wait=<s>, or, with "push": true, get a
+push notification through PushService when the answer is ready.
+"""
+import json
+import time
+import uuid
+
+from flask import current_app
+from werkzeug.exceptions import ServiceUnavailable
+
+from ..utils.redis_client import get_redis
+from .chat_pipeline import AskContext
+
+JOB_FIELDS = (
+    "user_id", "question", "language", "province", "safe_mode",
+    "conversation_id", "is_new_conversation", "memory",
+)
+TERMINAL = {"done", "failed"}
+_POLL_SECONDS = 0.25
+
+# KEYS[1] job hash; ARGV: now, lease seconds, max attempts.
+# Returns {outcome, lease seconds left}: claimed | busy | failed | <status>.
+_CLAIM_LUA = """
+local status = redis.call('HGET', KEYS[1], 'status')
+if not status then return {'missing', '0'} end
+local now = tonumber(ARGV[1])
+if status == 'running' then
+  local lease_until = tonumber(redis.call('HGET', KEYS[1], 'lease_until') or '0')
+  if lease_until > now then return {'busy', tostring(lease_until - now)} end
+  if tonumber(redis.call('HGET', KEYS[1], 'attempts') or '0') >= tonumber(ARGV[3]) then
+    redis.call('HSET', KEYS[1], 'status', 'failed', 'error', 'Chat job failed')
+    return {'failed', '0'}
+  end
+elseif status ~= 'queued' then
+  return {status, '0'}
+end
+redis.call('HSET', KEYS[1], 'status', 'running', 'lease_until', tostring(now + tonumber(ARGV[2])))
+redis.call('HINCRBY', KEYS[1], 'attempts', 1)
+return {'claimed', '0'}
+"""
+
+
+class ChatJobService:
+
+    @staticmethod
+    def _redis():
+        r = get_redis()
+        if r is None:
+            raise ServiceUnavailable("Chat jobs require Redis (REDIS_URL)")
+        return r
+
+    @staticmethod
+    def _key(job_id: str) -> str:
+        return f"chat:job:{job_id}"
+
+    @staticmethod
+    def create(user_id: int, push: bool = False) -> str:
+        """Reserve a job id. Raises 503 before anything else is written if Redis is missing."""
+        r = ChatJobService._redis()
+        job_id = uuid.uuid4().hex
+        r.hset(ChatJobService._key(job_id), mapping={
+            "status": "created",
+            "user_id": user_id,
+            "push": int(push),
+            "created_at": time.time(),
+        })
+        r.expire(ChatJobService._key(job_id), int(current_app.config.get("CHAT_JOB_TTL_SECONDS", 3600)))
+        return job_id
+
+    @staticmethod
+    def queue(job_id: str, ctx: AskContext) -> None:
+        ChatJobService.update(
+            job_id,
+            status="queued",
+            context=json.dumps({f: getattr(ctx, f) for f in JOB_FIELDS}),
+        )
+
+    @staticmethod
+    def discard(job_id: str) -> None:
+        ChatJobService._redis().delete(ChatJobService._key(job_id))
+
+    @staticmethod
+    def claim(job_id: str) -> tuple[str, float]:
+        """
+        Atomically move a queued job, or a running one whose lease expired,
+        to running. Returns (outcome, seconds) where outcome is "claimed",
+        "busy" (another worker holds the lease for `seconds` more), "failed"
+        (lease expired with no attempts left) or the job's other status.
+        """
+        cfg = current_app.config
+        lease = float(cfg.get("CHAT_JOB_TIMEOUT_SECONDS", 60)) + float(cfg.get("CHAT_JOB_LEASE_GRACE_SECONDS", 30))
+        r = ChatJobService._redis()
+        outcome, remaining = r.register_script(_CLAIM_LUA)(
+            keys=[ChatJobService._key(job_id)],
+            args=[time.time(), lease, int(cfg.get("CHAT_JOB_MAX_ATTEMPTS", 2))],
+        )
+        return outcome.decode(), float(remaining)
+
+    @staticmethod
+    def load_context(job_id: str, job: dict) -> AskContext:
+        return AskContext(**json.loads(job["context"]), job_id=job_id)
+
+    @staticmethod
+    def get(job_id: str) -> dict | None:
+        raw = ChatJobService._redis().hgetall(ChatJobService._key(job_id))
+        if not raw:
+            return None
+        return {k.decode(): v.decode() for k, v in raw.items()}
+
+    @staticmethod
+    def update(job_id: str, **fields) -> None:
+        ChatJobService._redis().hset(ChatJobService._key(job_id), mapping=fields)
+
+    @staticmethod
+    def wait(job_id: str, timeout: float) -> dict | None:
+        """Re-read the job until it is finished or timeout seconds pass."""
+        give_up_at = time.monotonic() + max(0.0, timeout)
+        while True:
+            job = ChatJobService.get(job_id)
+            if job is None or job["status"] in TERMINAL or time.monotonic() >= give_up_at:
+                return job
+            time.sleep(_POLL_SECONDS)
+
+    @staticmethod
+    def public_view(job_id: str, job: dict) -> dict:
+        view = {"jobId": job_id, "status": job["status"]}
+        if job["status"] == "done":
+            view["result"] = json.loads(job["result"])
+        elif job["status"] == "failed":
+            view["error"] = job.get("error") or "Chat job failed"
+        return view
@@ -0,0 +1,372 @@
+"""
+Staged /chat/ask pipeline.
+
+Every ask request runs the same stages in order:
+
+    route     emergency fast path + classifier; greeting / emergency /
+              refusal requests get their final answer here
+    retrieve  query embedding + vector search
+    generate  legal-awareness answer (retrieval-only when the provider is
+              unavailable or the request deadline is too close)
+    persist   save the turn and queue the rolling summary refresh
+    metrics   one evaluation record with the per-stage latency breakdown,
+              appended to EvaluationBuffer for bulk insertion
+
+Stage wall time is recorded automatically in AskContext.timings. Once a
+stage has produced an answer, the remaining answer stages are skipped;
+persist and metrics always run.
+
+Stateless requests (safe mode or first turn) are coalesced through
+SingleFlight: identical concurrent questions share one run of the answer
+stages and record their wait as the "coalesced" timing.
+
+The DB connection is returned to the pool before each provider call, so a
+gevent worker (see gunicorn.conf.py) can keep many chats waiting on
+providers without draining the pool.
+"""
+import time
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from ..extensions import db
+from ..models.chat import ChatMessage
+from ..tasks.evaluation_tasks import log_rag_evaluation_async
+from ..tasks.memory_tasks import summarize_conversation_async
+from ..utils.deadline import DeadlineExceeded
+from ..utils.emergency_matcher import EmergencyMatcher
+from ..utils.metrics import CHAT_STAGE_SECONDS, count_cache
+from ..utils.tracing import start_span
+from .circuit_breaker import CircuitOpenError
+from .conversation_memory_service import ConversationMemoryService
+from .embedding_batcher import EmbeddingBatcher
+from .evaluation_buffer import EvaluationBuffer
+from .llm_service import LLMService
+from .rag_service import RAGService
+from .single_flight import SingleFlight
+
+SHORT_CIRCUIT_CATEGORIES = {"GREETING_OR_APP_HELP", "EMERGENCY", "OUT_OF_DOMAIN", "PROMPT_INJECTION_OR_MISUSE"}
+
+
+def greeting_message(language: str) -> str:
+    if language == "ur":
+        return (
+            "السلام علیکم! میں پاکستان میں خواتین کے لیے قانونی آگاہی میں مدد کر سکتی ہوں (کام کی جگہ ہراسانی، گھریلو تشدد، خاندانی معاملات، سائبر ہراسانی)۔ "
+            "براہِ کرم اپنا مسئلہ بتائیں، میں رہنمائی کروں گی۔"
+        )
+    return (
+        "Hello! I can help with legal awareness for women in Pakistan (workplace harassment, domestic violence, family matters, cyber harassment). "
+        "Please describe your situation and I will guide you."
+    )
+
+
+def refusal_message(language: str) -> str:
+    if language == "ur":
+        return "میں ایک اے آئی لیگل اسسٹنٹ ہوں۔ میں صرف قانونی آگاہی میں مدد کر سکتی ہوں۔ میں اس سوال پر مدد نہیں کر سکتی۔"
+    return (
+        "I am an AI legal lawyer assistant. I can only help you with legal awareness. "
+        "I'm not able to process this query."
+    )
+
+
+def degraded_answer(contexts: list[str], language: str) -> str:
+    """
+    Retrieval-only answer used when the answer provider's circuit is open.
+    Returns the best matching source excerpts instead of waiting on the LLM.
+    """
+    if not contexts:
+        if language == "ur":
+            return (
+                "ہماری اے آئی سروس اس وقت دستیاب نہیں ہے۔ براہِ کرم تھوڑی دیر بعد دوبارہ کوشش کریں۔ "
+                "فوری مدد کے لیے ہیلپ لائن استعمال کریں۔"
+            )
+        return (
+            "Our AI service is temporarily unavailable. Please try again in a few minutes. "
+            "For urgent help, use the Helpline."
+        )
+
+    excerpts = []
+    for c in contexts[:3]:
+        text = " ".join((c or "").split())
+        excerpts.append(f"- {text[:400]}{'…' if len(text) > 400 else ''}")
+
+    if language == "ur":
+        header = "ہماری اے آئی سروس اس وقت مصروف ہے۔ آپ کے سوال سے متعلق تصدیق شدہ قانونی ذرائع کے اقتباسات:"
+        footer = "نوٹ: قوانین صوبے کے لحاظ سے مختلف ہو سکتے ہیں۔ یہ معلومات صرف آگاہی کے لیے ہیں۔"
+    else:
+        header = "Our AI service is busy right now. Here are excerpts from verified legal sources related to your question:"
+        footer = "Note: Laws may vary by province. This information is for awareness only."
+    return "\n\n".join([header, "\n".join(excerpts), footer])
+
+
+def detect_emergency_fast(q: str) -> bool:
+    path = current_app.config.get("EMERGENCY_LEXICON_PATH") or None
+    return EmergencyMatcher.default(path).matches(q)
+
+
+def token_usage_kwargs(usage: dict, prompt_messages, answer: str) -> dict:
+    """
+    Evaluation kwargs for token accounting. Provider-reported counts are sent
+    as-is; the full prompt is only shipped when the provider returned no usage,
+    so the worker can fall back to tiktoken.
+    """
+    if usage.get("prompt_tokens") is not None:
+        return {
+            "prompt_tokens": usage["prompt_tokens"],
+            "completion_tokens": usage.get("completion_tokens"),
+            "total_tokens": usage.get("total_tokens"),
+            "cached_tokens": usage.get("cached_tokens"),
+        }
+    return {"prompt_messages": prompt_messages, "completion_text": answer}
+
+
+class AskContext:
+    """Everything one ask request knows; filled in stage by stage."""
+
+    def __init__(
+        self,
+        *,
+        user_id: int,
+        question: str,
+        language: str,
+        province: str | None,
+        safe_mode: bool,
+        conversation_id: int | None,
+        is_new_conversation: bool,
+        memory: dict | None = None,
+        started_at: float | None = None,
+        job_id: str | None = None,
+    ):
+        self.user_id = user_id
+        self.question = question
+        self.language = language
+        self.province = province
+        self.safe_mode = safe_mode
+        self.conversation_id = conversation_id
+        self.is_new_conversation = is_new_conversation
+        self.memory = memory or {"summary": None, "messages": []}
+        self.job_id = job_id
+
+        self.route: dict = {}
+        self.embedding = None
+        self.hits: list[dict] = []
+        self.contexts: list[str] = []
+        self.threshold: float | None = None
+        self.best_distance: float | None = None
+
+        self.answer: str | None = None
+        self.decision: str | None = None
+        self.in_domain = True
+        self.prompt_messages = None
+        self.usage: dict = {}
+
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.timings: dict[str, int] = {}
+
+    @property
+    def category(self) -> str | None:
+        return self.route.get("category")
+
+    def response(self) -> dict:
+        return {"answer": self.answer, "conversationId": self.conversation_id, "contextsUsed": len(self.contexts)}
+
+
+class ChatPipeline:
+    STAGES = ("route", "retrieve", "generate", "persist", "metrics")
+    ALWAYS_RUN = {"persist", "metrics"}
+
+    def run(self, ctx: AskContext) -> AskContext:
+        if self._coalescible(ctx):
+            t0 = time.perf_counter()
+            key = SingleFlight.key_for(ctx.question, ctx.language, ctx.province)
+            shared, leader = SingleFlight.do(key, lambda: self._answer(ctx))
+            count_cache("single_flight", hit=not leader)
+            if not leader:
+                self._apply_shared(ctx, shared)
+                ctx.timings["coalesced"] = int((time.perf_counter() - t0) * 1000)
+        else:
+            self._answer(ctx)
+
+        for name in self.STAGES:
+            if name in self.ALWAYS_RUN:
+                self._timed(name, ctx)
+        return ctx
+
+    def _timed(self, name: str, ctx: AskContext) -> None:
+        t0 = time.perf_counter()
+        with start_span(f"chat.{name}"):
+            getattr(self, f"_{name}")(ctx)
+        elapsed = time.perf_counter() - t0
+        ctx.timings[name] = int(elapsed * 1000)
+        CHAT_STAGE_SECONDS.labels(name).observe(elapsed)
+
+    def _answer(self, ctx: AskContext) -> dict:
+        """Run the answer stages; returns what duplicates of this request may reuse."""
+        for name in self.STAGES:
+            if name in self.ALWAYS_RUN or ctx.answer is not None:
+                continue
+            self._timed(name, ctx)
+        return {
+            "route": ctx.route,
+            "hits": [{"chunk_id": h.get("chunk_id"), "distance": h.get("distance")} for h in ctx.hits],
+            "contexts": ctx.contexts,
+            "threshold": ctx.threshold,
+            "best_distance": ctx.best_distance,
+            "answer": ctx.answer,
+            "decision": ctx.decision,
+            "in_domain": ctx.in_domain,
+        }
+
+    @staticmethod
+    def _coalescible(ctx: AskContext) -> bool:
+        """Answers without conversation memory depend only on the question."""
+        if not current_app.config.get("SINGLE_FLIGHT_ENABLED", True):
+            return False
+        memory = ctx.memory
+        return (ctx.safe_mode or ctx.is_new_conversation) and not memory["messages"] and not memory["summary"]
+
+    @staticmethod
+    def _apply_shared(ctx: AskContext, shared: dict) -> None:
+        for field, value in shared.items():
+            setattr(ctx, field, value)
+        # Followers made no provider calls of their own.
+        ctx.usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cached_tokens": 0}
+
+    def _route(self, ctx: AskContext) -> None:
+        if detect_emergency_fast(ctx.question):
+            ctx.route = {"category": "EMERGENCY", "confidence": 1.0, "topic": "emergency"}
+        else:
+            db.session.close()
+            ctx.route = LLMService.classify_query(question=ctx.question, language=ctx.language)
+
+        current_app.logger.info(
+            "Chat classify: safe_mode=%s user_id=%s conv_id=%s lang=%s category=%s topic=%s conf=%s",
+            int(ctx.safe_mode),
+            ctx.user_id,
+            ctx.conversation_id,
+            ctx.language,
+            ctx.category,
+            ctx.route.get("topic") or "other",
+            ctx.route.get("confidence"),
+        )
+
+        if ctx.category not in SHORT_CIRCUIT_CATEGORIES:
+            return
+
+        if ctx.category == "GREETING_OR_APP_HELP":
+            ctx.answer, ctx.decision = greeting_message(ctx.language), "GREETING"
+        elif ctx.category == "EMERGENCY":
+            ctx.answer = LLMService.emergency_response(language=ctx.language, province=ctx.province)
+            ctx.decision = "EMERGENCY"
+        else:
+            ctx.answer, ctx.decision, ctx.in_domain = refusal_message(ctx.language), "REFUSE_OUT_OF_DOMAIN", False
+
+    def _retrieve(self, ctx: AskContext) -> None:
+        try:
+            ctx.embedding = EmbeddingBatcher.embed_query(ctx.question)
+        except (CircuitOpenError, DeadlineExceeded):
+            ctx.embedding = None
+
+        if ctx.embedding is not None:
+            ctx.hits = RAGService.search_similar_with_scores(ctx.embedding, language=ctx.language)
+
+        ctx.threshold = RAGService.get_distance_threshold()
+        ctx.best_distance = ctx.hits[0]["distance"] if ctx.hits else None
+        has_verified_sources = bool(ctx.hits) and ctx.best_distance is not None and ctx.best_distance <= ctx.threshold
+        ctx.contexts = [h["chunk_text"] for h in ctx.hits] if has_verified_sources else []
+
+    def _generate(self, ctx: AskContext) -> None:
+        kwargs = dict(
+            question=ctx.question,
+            contexts=ctx.contexts,
+            language=ctx.language,
+            province=ctx.province,
+            history=ctx.memory["messages"],
+            memory_summary=ctx.memory["summary"],
+        )
+        db.session.close()
+        try:
+            answer, ctx.prompt_messages, _, ctx.usage = LLMService.chat_legal_awareness(**kwargs)
+            ctx.decision = "ANSWER_WITH_SOURCES" if ctx.contexts else "ANSWER_NO_SOURCES"
+        except (CircuitOpenError, DeadlineExceeded):
+            answer, ctx.decision = degraded_answer(ctx.contexts, ctx.language), "DEGRADED"
+        ctx.answer = answer
+
+    def _persist(self, ctx: AskContext) -> None:
+        if ctx.conversation_id is None:
+            return
+
+        # A chat job taken over after its lease expired may find the first
+        # run's turn already committed; keep that answer instead of adding
+        # the turn again.
+        if ctx.job_id is not None:
+            recorded = ChatMessage.job_answer(ctx.job_id)
+            if recorded is not None:
+                ctx.answer = recorded
+                return
+
+        try:
+            ChatMessage.add_turn(
+                user_id=ctx.user_id,
+                conversation_id=ctx.conversation_id,
+                question=ctx.question,
+                answer=ctx.answer,
+                max_messages=int(current_app.config.get("CHAT_HISTORY_MAX_MESSAGES", 100)),
+                trim_slack=int(current_app.config.get("CHAT_HISTORY_TRIM_SLACK", 20)),
+                job_id=ctx.job_id,
+            )
+            db.session.commit()
+        except IntegrityError:
+            if ctx.job_id is None:
+                raise
+            db.session.rollback()
+            ctx.answer = ChatMessage.job_answer(ctx.job_id) or ctx.answer
+            return
+
+        if ConversationMemoryService.needs_refresh(len(ctx.memory["messages"])):
+            try:
+                summarize_conversation_async.delay(ctx.conversation_id)
+            except Exception as e:
+                current_app.logger.warning("Failed to queue conversation summary task: %s", str(e))
+
+    def _metrics(self, ctx: AskContext) -> None:
+        # Greetings are canned app-help replies, not RAG interactions.
+        if ctx.decision == "GREETING":
+            return
+
+        answered = ctx.decision not in {"EMERGENCY", "REFUSE_OUT_OF_DOMAIN"}
+        stage_timings = dict(ctx.timings)
+        total_time_ms = int((time.perf_counter() - ctx.started_at) * 1000)
+        # Short-circuited routes never reach retrieval, but threshold_used is
+        # NOT NULL; log the threshold in force so their rows are not dropped.
+        threshold = ctx.threshold if ctx.threshold is not None else RAGService.get_distance_threshold()
+        record = dict(
+            user_id=ctx.user_id,
+            conversation_id=ctx.conversation_id,
+            language=ctx.language,
+            safe_mode=ctx.safe_mode,
+            is_new_conversation=ctx.is_new_conversation,
+            question=ctx.question,
+            answer=ctx.answer,
+            threshold=threshold,
+            best_distance=ctx.best_distance,
+            contexts_found=len(ctx.hits),
+            contexts_used=len(ctx.contexts),
+            in_domain=ctx.in_domain,
+            decision=ctx.decision,
+            chunk_ids=[h.get("chunk_id") for h in ctx.hits if h.get("chunk_id")],
+            embedding_time_ms=stage_timings.get("retrieve", 0) if answered else 0,
+            llm_time_ms=stage_timings.get("generate", 0) if answered else 0,
+            total_time_ms=total_time_ms,
+            stage_timings=stage_timings,
+            embedding_model=current_app.config["EMBEDDING_MODEL"],
+            embedding_dimension=current_app.config.get("EMBEDDING_DIMENSION"),
+            chat_model=current_app.config.get("CHAT_MODEL"),
+            **token_usage_kwargs(ctx.usage, ctx.prompt_messages, ctx.answer),
+        )
+        if EvaluationBuffer.enqueue(record):
+            return
+        try:
+            log_rag_evaluation_async.delay(**record)
+        except Exception as e:
+            current_app.logger.warning("Failed to queue evaluation task: %s", str(e))
@@ -0,0 +1,217 @@
+"""
+Per-provider circuit breaker with adaptive timeouts.
+
+One breaker exists per (provider, operation) pair inside each worker process,
+e.g. ("openai", "embed") or ("anthropic", "answer"). Each breaker keeps a
+rolling window of recent calls and:
+- Opens when the error rate in the window crosses CIRCUIT_ERROR_RATE
+- Fails fast with CircuitOpenError while open
+- Lets a single probe through after CIRCUIT_OPEN_SECONDS (half-open)
+- Derives the request timeout from the observed p99 latency, capped by the
+  call site's fixed timeout, so a slow provider can no longer pin a worker
+  for a full minute
+"""
+import threading
+import time
+from collections import deque
+
+from flask import current_app
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider whose circuit is open."""
+
+    def __init__(self, provider: str, operation: str, retry_after: float):
+        super().__init__(
+            f"Circuit open for provider={provider} operation={operation} "
+            f"(retry in {retry_after:.1f}s)"
+        )
+        self.provider = provider
+        self.operation = operation
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    _registry: dict = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(
+        self,
+        provider: str,
+        operation: str,
+        *,
+        window_seconds: float = 60.0,
+        min_calls: int = 10,
+        error_rate: float = 0.5,
+        open_seconds: float = 30.0,
+        timeout_multiplier: float = 2.0,
+        min_timeout: float = 3.0,
+    ):
+        self.provider = provider
+        self.operation = operation
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.open_seconds = open_seconds
+        self.timeout_multiplier = timeout_multiplier
+        self.min_timeout = min_timeout
+
+        self.state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._calls: deque = deque()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_provider(cls, provider: str, operation: str) -> "CircuitBreaker":
+        """
+        Return the process-wide breaker for (provider, operation),
+        creating it from app config on first use.
+        """
+        key = (provider, operation)
+        breaker = cls._registry.get(key)
+        if breaker is not None:
+            return breaker
+
+        with cls._registry_lock:
+            breaker = cls._registry.get(key)
+            if breaker is None:
+                cfg = current_app.config
+                breaker = cls(
+                    provider,
+                    operation,
+                    window_seconds=float(cfg.get("CIRCUIT_WINDOW_SECONDS", 60)),
+                    min_calls=int(cfg.get("CIRCUIT_MIN_CALLS", 10)),
+                    error_rate=float(cfg.get("CIRCUIT_ERROR_RATE", 0.5)),
+                    open_seconds=float(cfg.get("CIRCUIT_OPEN_SECONDS", 30)),
+                    timeout_multiplier=float(cfg.get("ADAPTIVE_TIMEOUT_MULTIPLIER", 2.0)),
+                    min_timeout=float(cfg.get("ADAPTIVE_TIMEOUT_MIN_SECONDS", 3)),
+                )
+                cls._registry[key] = breaker
+            return breaker
+
+    @classmethod
+    def snapshot_all(cls) -> list[dict]:
+        return [b.snapshot() for b in list(cls._registry.values())]
+
+    @classmethod
+    def reset_all(cls) -> None:
+        with cls._registry_lock:
+            cls._registry.clear()
+
+    def _prune(self, now: float) -> None:
+        horizon = now - self.window_seconds
+        while self._calls and self._calls[0][0] < horizon:
+            self._calls.popleft()
+
+    def is_open(self) -> bool:
+        with self._lock:
+            return self.state == self.OPEN and (time.monotonic() - self._opened_at) < self.open_seconds
+
+    def before_call(self) -> bool:
+        """
+        Gate a provider call. Raises CircuitOpenError while the circuit is open.
+        After the cool-down a single probe call is allowed through (half-open);
+        returns True for that probe, which the caller must settle with
+        record_success/record_failure or hand back with release_probe().
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return False
+
+            now = time.monotonic()
+            if self.state == self.OPEN:
+                remaining = self.open_seconds - (now - self._opened_at)
+                if remaining > 0:
+                    raise CircuitOpenError(self.provider, self.operation, remaining)
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+
+            if self._probe_in_flight:
+                raise CircuitOpenError(self.provider, self.operation, self.open_seconds)
+            self._probe_in_flight = True
+            return True
+
+    def release_probe(self) -> None:
+        """
+        Give back the half-open probe slot after a call that ended as neither
+        success nor failure (caller 4xx, bad payload, request deadline), so
+        the next call can probe instead of failing fast forever.
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probe_in_flight = False
+
+    def record_success(self, latency_s: float) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self.state == self.HALF_OPEN:
+                self.state = self.CLOSED
+                self._probe_in_flight = False
+                self._calls.clear()
+            self._calls.append((now, True, latency_s))
+            self._prune(now)
+
+    def record_failure(self, latency_s: float) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self.state == self.HALF_OPEN:
+                self._trip(now)
+                return
+
+            self._calls.append((now, False, latency_s))
+            self._prune(now)
+
+            total = len(self._calls)
+            if total < self.min_calls:
+                return
+            failures = sum(1 for _, ok, _ in self._calls if not ok)
+            if failures / total >= self.error_rate:
+                self._trip(now)
+
+    def _trip(self, now: float) -> None:
+        self.state = self.OPEN
+        self._opened_at = now
+        self._probe_in_flight = False
+        self._calls.clear()
+        current_app.logger.warning(
+            "Circuit opened provider=%s operation=%s open_seconds=%s",
+            self.provider,
+            self.operation,
+            self.open_seconds,
+        )
+
+    def timeout(self, default_timeout: float) -> float:
+        """
+        Adaptive timeout: p99 of successful latencies in the window times
+        the multiplier, clamped to [min_timeout, default_timeout].
+        Falls back to default_timeout until min_calls successes are observed.
+        """
+        with self._lock:
+            self._prune(time.monotonic())
+            latencies = sorted(lat for _, ok, lat in self._calls if ok)
+
+        if len(latencies) < self.min_calls:
+            return float(default_timeout)
+
+        p99 = latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))]
+        adaptive = p99 * self.timeout_multiplier
+        return float(max(self.min_timeout, min(adaptive, default_timeout)))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._prune(time.monotonic())
+            total = len(self._calls)
+            failures = sum(1 for _, ok, _ in self._calls if not ok)
+            return {
+                "provider": self.provider,
+                "operation": self.operation,
+                "state": self.state,
+                "calls": total,
+                "failures": failures,
+                "errorRate": round(failures / total, 4) if total else 0.0,
+            }
@@ -0,0 +1,144 @@
+"""
+Rolling conversation summary memory.
+
+Instead of replaying the last CHAT_MEMORY_LIMIT raw messages into every
+prompt, each ChatConversation keeps a compact running summary of its older
+turns. Prompts carry that summary plus only the last CHAT_MEMORY_RAW_TURNS
+raw turns.
+
+The summary is refreshed asynchronously after each turn
+(summarize_conversation_async). If the worker lags behind, any turns not yet
+folded into the summary are still replayed raw (bounded by
+CHAT_MEMORY_LIMIT), so no context is ever lost.
+
+The raw message window is served from ChatHistoryCache when Redis is
+configured.
+"""
+from datetime import datetime
+
+from flask import current_app
+
+from ..extensions import db
+from ..models.chat import ChatConversation, ChatMessage
+from .chat_history_cache import ChatHistoryCache
+from .llm_service import LLMService
+
+
+class ConversationMemoryService:
+
+    @staticmethod
+    def _raw_window() -> int:
+        return max(1, int(current_app.config.get("CHAT_MEMORY_RAW_TURNS", 2))) * 2
+
+    @staticmethod
+    def load(conversation_id: int, user_id: int) -> dict:
+        """
+        Returns {"summary": str | None, "messages": [{"role", "content"}, ...]}
+        where messages are chronological and not yet covered by the summary
+        (at least the last raw window).
+        """
+        limit = int(current_app.config.get("CHAT_MEMORY_LIMIT", 10))
+        conv = db.session.get(ChatConversation, conversation_id)
+        summary = conv.summary if conv is not None else None
+        through_id = conv.summary_through_message_id if conv is not None else None
+
+        rows = ChatHistoryCache.get(conversation_id, limit)
+        if rows is None:
+            generation = ChatHistoryCache.generation(conversation_id)
+            db_rows = (
+                ChatMessage.query
+                .filter_by(conversation_id=conversation_id, user_id=user_id)
+                .order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+                .limit(limit)
+                .all()
+            )
+            rows = [{"id": r.id, "role": r.role, "content": r.content} for r in reversed(db_rows)]
+            ChatHistoryCache.fill(conversation_id, rows, generation)
+
+        if summary and through_id is not None:
+            keep_from = max(0, len(rows) - ConversationMemoryService._raw_window())
+            rows = [r for i, r in enumerate(rows) if i >= keep_from or r["id"] > through_id]
+
+        return {
+            "summary": summary or None,
+            "messages": [{"role": r["role"], "content": r["content"]} for r in rows],
+        }
+
+    @staticmethod
+    def needs_refresh(history_len: int) -> bool:
+        """
+        Whether the turn just persisted pushed messages out of the raw window.
+        history_len is the number of prior messages loaded for the prompt.
+        """
+        if not current_app.config.get("CHAT_MEMORY_SUMMARY_ENABLED", True):
+            return False
+        return history_len + 2 > ConversationMemoryService._raw_window()
+
+    @staticmethod
+    def refresh_summary(conversation_id: int) -> bool:
+        """
+        Fold messages that fell out of the raw window into the running summary.
+        Returns True if the summary was updated.
+
+        Uses a conditional UPDATE instead of a row lock, so concurrent turns
+        never wait on the summarizer's LLM call.
+        """
+        conv = db.session.get(ChatConversation, conversation_id)
+        if conv is None:
+            return False
+
+        raw_window = ConversationMemoryService._raw_window()
+        through_id = conv.summary_through_message_id or 0
+
+        pending = (
+            ChatMessage.query
+            .filter(ChatMessage.conversation_id == conversation_id, ChatMessage.id > through_id)
+            .order_by(ChatMessage.id.asc())
+            .all()
+        )
+        to_fold = pending[:-raw_window] if len(pending) > raw_window else []
+        if not to_fold:
+            return False
+
+        new_through_id = to_fold[-1].id
+        previous_summary = conv.summary
+        db.session.commit()
+
+        max_tokens = int(current_app.config.get("CHAT_SUMMARY_MAX_TOKENS", 300))
+        summary = LLMService.summarize_conversation(
+            previous_summary=previous_summary,
+            messages=[{"role": m.role, "content": m.content} for m in to_fold],
+            max_tokens=max_tokens,
+        )
+        if not summary:
+            return False
+
+        updated = (
+            ChatConversation.query
+            .filter(
+                ChatConversation.id == conversation_id,
+                db.or_(
+                    ChatConversation.summary_through_message_id.is_(None),
+                    ChatConversation.summary_through_message_id < new_through_id,
+                ),
+            )
+            .update(
+                {
+                    "summary": summary,
+                    "summary_through_message_id": new_through_id,
+                    "summary_updated_at": datetime.utcnow(),
+                    "updated_at": ChatConversation.updated_at,
+                },
+                synchronize_session=False,
+            )
+        )
+        db.session.commit()
+
+        current_app.logger.info(
+            "Conversation summary refreshed conv_id=%s folded=%s through_id=%s updated=%s",
+            conversation_id,
+            len(to_fold),
+            new_through_id,
+            bool(updated),
+        )
+        return bool(updated)
@@ -0,0 +1,253 @@
+"""
+Cross-request embedding micro-batcher.
+
+Concurrent /chat/ask requests each need one query embedding. Instead of one
+provider call per request, queries arriving within EMBED_BATCH_WINDOW_MS are
+collected into a single batched LLMService.embed() call (up to
+EMBED_BATCH_MAX inputs) and the vectors are fanned back out.
+
+Modes (EMBED_BATCH_MODE):
+- off:   call the provider directly (default)
+- local: batch across threads of one worker process
+- redis: batch across all worker processes through a Redis queue; the first
+         caller to take the leader lock drains the queue for everyone.
+         Falls back to local mode when Redis is not configured, and to a
+         direct provider call when Redis errors mid-request.
+
+A batch is embedded under its own deadline: the latest one among its members
+(none if any member has none), so one client's short X-Request-Timeout
+cannot fail other users' embeds. Batched calls use the provider's
+"embed_batch" circuit; if one fails, including when that circuit is open,
+each member embeds its own query directly under its own deadline and the
+single-query "embed" circuit.
+"""
+import json
+import threading
+import time
+import uuid
+
+import redis
+from flask import current_app
+
+from .circuit_breaker import CircuitOpenError
+from .llm_service import LLMService
+from ..utils.deadline import Deadline, DeadlineExceeded, current_deadline, deadline_scope
+from ..utils.redis_client import get_redis
+
+
+class _PendingBatch:
+    def __init__(self):
+        self.texts: list[str] = []
+        self.index: dict[str, int] = {}
+        self.expires_at: list[float | None] = []
+        self.results: list | None = None
+        self.error: Exception | None = None
+        self.full = threading.Event()
+        self.done = threading.Event()
+
+
+class EmbeddingBatcher:
+    _lock = threading.Lock()
+    _open_batch: _PendingBatch | None = None
+
+    @staticmethod
+    def _settings() -> tuple[str, float, int]:
+        cfg = current_app.config
+        mode = (cfg.get("EMBED_BATCH_MODE") or "off").lower()
+        window_s = max(0.0, float(cfg.get("EMBED_BATCH_WINDOW_MS", 5)) / 1000)
+        max_batch = max(1, int(cfg.get("EMBED_BATCH_MAX", 32)))
+        return mode, window_s, max_batch
+
+    @staticmethod
+    def _expires_at() -> float | None:
+        """Wall-clock expiry of the caller's request deadline, if any."""
+        deadline = current_deadline()
+        return None if deadline is None else time.time() + deadline.remaining()
+
+    @staticmethod
+    def _batch_deadline(expires_at: list[float | None]) -> Deadline | None:
+        """The latest deadline among a batch's members; None if any has none."""
+        if not expires_at or any(e is None for e in expires_at):
+            return None
+        return Deadline(max(expires_at) - time.time())
+
+    @staticmethod
+    def _embed_batch(texts: list[str], expires_at: list[float | None]) -> list:
+        with deadline_scope(EmbeddingBatcher._batch_deadline(expires_at)):
+            return LLMService.embed(texts)
+
+    @staticmethod
+    def _after_batch_failure(text: str, error: Exception) -> list[float]:
+        """A member's answer when the batched call failed: embed it directly."""
+        current_app.logger.warning("Batched embedding failed (%s); embedding directly", str(error))
+        return LLMService.embed(text)
+
+    @staticmethod
+    def embed_query(text: str) -> list[float]:
+        """
+        Embed a single query, batched with concurrent callers when enabled.
+        Raises the provider's exception (including CircuitOpenError) on failure.
+        """
+        mode, window_s, max_batch = EmbeddingBatcher._settings()
+        if mode == "redis":
+            r = get_redis()
+            if r is not None:
+                return EmbeddingBatcher._embed_via_redis(r, text, window_s, max_batch)
+            mode = "local"
+        if mode == "local":
+            return EmbeddingBatcher._embed_local(text, window_s, max_batch)
+        return LLMService.embed(text)
+
+    @classmethod
+    def _embed_local(cls, text: str, window_s: float, max_batch: int) -> list[float]:
+        with cls._lock:
+            batch = cls._open_batch
+            leader = batch is None
+            if leader:
+                batch = _PendingBatch()
+                cls._open_batch = batch
+
+            idx = batch.index.get(text)
+            if idx is None:
+                idx = len(batch.texts)
+                batch.index[text] = idx
+                batch.texts.append(text)
+            batch.expires_at.append(EmbeddingBatcher._expires_at())
+
+            if len(batch.texts) >= max_batch:
+                batch.full.set()
+                cls._open_batch = None
+
+        if leader:
+            batch.full.wait(window_s)
+            with cls._lock:
+                if cls._open_batch is batch:
+                    cls._open_batch = None
+                texts, expires_at = list(batch.texts), list(batch.expires_at)
+            try:
+                batch.results = cls._embed_batch(texts, expires_at)
+            except Exception as e:
+                batch.error = e
+            finally:
+                batch.done.set()
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            return cls._after_batch_failure(text, batch.error)
+
+        current_app.logger.debug("Embedding micro-batch size=%s leader=%s", len(batch.texts), leader)
+        return batch.results[idx]
+
+    @staticmethod
+    def _keys() -> tuple[str, str]:
+        model = current_app.config["EMBEDDING_MODEL"]
+        return f"embed:batch:queue:{model}", f"embed:batch:leader:{model}"
+
+    @staticmethod
+    def _embed_via_redis(r, text: str, window_s: float, max_batch: int) -> list[float]:
+        queue_key, leader_key = EmbeddingBatcher._keys()
+        req_id = uuid.uuid4().hex
+        result_key = f"embed:batch:result:{req_id}"
+        wait_budget_s = float(current_app.config.get("EMBED_BATCH_WAIT_SECONDS", 45))
+        request_deadline = current_deadline()
+        if request_deadline is not None:
+            wait_budget_s = request_deadline.clip(wait_budget_s)
+
+        try:
+            r.rpush(queue_key, json.dumps({"id": req_id, "text": text, "expiresAt": EmbeddingBatcher._expires_at()}))
+
+            give_up_at = time.monotonic() + wait_budget_s
+            poll_s = max(0.05, window_s * 2)
+            while time.monotonic() < give_up_at:
+                own = EmbeddingBatcher._lead_if_free(r, queue_key, leader_key, req_id, window_s, max_batch)
+                if own is None:
+                    item = r.blpop([result_key], timeout=poll_s)
+                    own = item[1] if item is not None else None
+                if own is not None:
+                    try:
+                        return EmbeddingBatcher._decode_result(own)
+                    except Exception as e:
+                        return EmbeddingBatcher._after_batch_failure(text, e)
+        except redis.RedisError as e:
+            current_app.logger.warning("Embedding batch Redis error, embedding directly: %s", str(e))
+            return LLMService.embed(text)
+
+        current_app.logger.warning("Embedding batch wait timed out; embedding directly")
+        return LLMService.embed(text)
+
+    @staticmethod
+    def _lead_if_free(r, queue_key, leader_key, req_id, window_s, max_batch) -> str | None:
+        """
+        Become the leader if nobody holds the lock, then drain the queue in
+        batches. Returns this caller's own result payload if it was in a
+        drained batch.
+        """
+        token = uuid.uuid4().hex
+        lease_ms = int((window_s + 90) * 1000)
+        if not r.set(leader_key, token, nx=True, px=lease_ms):
+            return None
+
+        own_payload = None
+        try:
+            time.sleep(window_s)
+            while True:
+                pipe = r.pipeline()
+                pipe.lrange(queue_key, 0, max_batch - 1)
+                pipe.ltrim(queue_key, max_batch, -1)
+                raw_items, _ = pipe.execute()
+                if not raw_items:
+                    break
+
+                items = [json.loads(x) for x in raw_items]
+                texts = list(dict.fromkeys(i["text"] for i in items))
+                try:
+                    embeddings = EmbeddingBatcher._embed_batch(texts, [i.get("expiresAt") for i in items])
+                    vectors = dict(zip(texts, embeddings))
+                    payloads = {i["id"]: json.dumps({"embedding": vectors[i["text"]]}) for i in items}
+                except Exception as e:
+                    failure = json.dumps(EmbeddingBatcher._encode_error(e))
+                    payloads = {i["id"]: failure for i in items}
+
+                pipe = r.pipeline()
+                for item_id, payload in payloads.items():
+                    if item_id == req_id:
+                        own_payload = payload
+                        continue
+                    key = f"embed:batch:result:{item_id}"
+                    pipe.rpush(key, payload)
+                    pipe.expire(key, 60)
+                pipe.execute()
+
+                current_app.logger.debug("Embedding micro-batch (redis) size=%s unique=%s", len(items), len(texts))
+                if own_payload is not None:
+                    break
+        finally:
+            try:
+                if r.get(leader_key) == token.encode():
+                    r.delete(leader_key)
+            except redis.RedisError:
+                pass  # the lease expires on its own
+
+        return own_payload
+
+    @staticmethod
+    def _encode_error(e: Exception) -> dict:
+        if isinstance(e, CircuitOpenError):
+            return {"circuitOpen": True, "provider": e.provider, "operation": e.operation, "retryAfter": e.retry_after}
+        if isinstance(e, DeadlineExceeded):
+            return {"deadlineExceeded": True, "operation": e.operation, "remaining": e.remaining}
+        return {"error": str(e)[:500]}
+
+    @staticmethod
+    def _decode_result(raw) -> list[float]:
+        data = json.loads(raw)
+        if "embedding" in data:
+            return data["embedding"]
+        if data.get("circuitOpen"):
+            raise CircuitOpenError(
+                data.get("provider") or "embedding", data.get("operation") or "embed", float(data.get("retryAfter") or 0)
+            )
+        if data.get("deadlineExceeded"):
+            raise DeadlineExceeded(data.get("operation") or "embed", float(data.get("remaining") or 0))
+        raise RuntimeError(f"Batched embedding failed: {data.get('error')}")
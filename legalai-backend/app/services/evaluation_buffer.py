@@ -0,0 +1,183 @@
+"""
+Append-only buffer for RAG evaluation logs.
+
+/chat/ask used to enqueue one Celery task per request, each doing its own
+title join, token counting and single-row INSERT + commit. Instead, the
+request path now XADDs the evaluation record to a Redis Stream
+(RAG_EVAL_BUFFER_STREAM) and the drain_rag_evaluation_buffer beat task
+bulk-inserts it with others every RAG_EVAL_BUFFER_FLUSH_SECONDS:
+
+- records are read through a consumer group and only acknowledged after
+  their batch commits, so a crashed drain is retried (XAUTOCLAIM)
+- a batch that fails as a whole is retried row by row so one bad record
+  cannot block the stream; records are only acknowledged once written or
+  rejected on their own (bad data, constraint violation), so a database
+  outage leaves the batch pending for a later drain instead of dropping it
+- the stream is capped at RAG_EVAL_BUFFER_MAXLEN entries (approximate)
+
+enqueue() returns False when Redis is not configured or unreachable; callers
+then fall back to log_rag_evaluation_async.
+"""
+import json
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy.exc import DataError, DisconnectionError, IntegrityError, InterfaceError, OperationalError
+
+from ..extensions import db
+from ..utils.redis_client import get_redis
+from .rag_evaluation_service import RAGEvaluationService
+
+_GROUP = "rag-eval-drain"
+# The database is unreachable: keep the records pending.
+_UNAVAILABLE = (OperationalError, InterfaceError, DisconnectionError)
+# The record itself cannot be stored: acknowledge and drop it.
+_RECORD_ERRORS = (IntegrityError, DataError, ValueError, TypeError, KeyError)
+
+
+class EvaluationBuffer:
+
+    @staticmethod
+    def _stream() -> str:
+        return current_app.config.get("RAG_EVAL_BUFFER_STREAM", "rag:eval:buffer")
+
+    @staticmethod
+    def _client():
+        if not current_app.config.get("RAG_EVAL_BUFFER_ENABLED", True):
+            return None
+        return get_redis()
+
+    @staticmethod
+    def enqueue(record: dict) -> bool:
+        """
+        Buffer one log_evaluation() kwargs dict. Returns False if the record
+        was not buffered.
+        """
+        r = EvaluationBuffer._client()
+        if r is None:
+            return False
+
+        record = dict(record)
+        record.setdefault("created_at", datetime.utcnow().isoformat())
+        # Bound what sits in Redis to what log_evaluation would store anyway.
+        record["question"] = (record.get("question") or "")[:5000]
+        record["answer"] = (record.get("answer") or "")[:10000]
+        try:
+            r.xadd(
+                EvaluationBuffer._stream(),
+                {"data": json.dumps(record, default=str)},
+                maxlen=int(current_app.config.get("RAG_EVAL_BUFFER_MAXLEN", 100000)),
+                approximate=True,
+            )
+            return True
+        except Exception as e:
+            current_app.logger.warning("Evaluation buffer unavailable: %s", str(e))
+            return False
+
+    @staticmethod
+    def _ensure_group(r, stream: str) -> None:
+        try:
+            r.xgroup_create(stream, _GROUP, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    @staticmethod
+    def _read(r, stream: str, consumer: str, batch_size: int) -> list[tuple[str, dict]]:
+        min_idle_ms = int(current_app.config.get("RAG_EVAL_BUFFER_CLAIM_IDLE_SECONDS", 60)) * 1000
+        claimed = r.xautoclaim(stream, _GROUP, consumer, min_idle_ms, start_id="0-0", count=batch_size)
+        entries = list(claimed[1]) if claimed else []
+        if len(entries) < batch_size:
+            fresh = r.xreadgroup(_GROUP, consumer, {stream: ">"}, count=batch_size - len(entries))
+            for _, stream_entries in fresh or []:
+                entries.extend(stream_entries)
+
+        out = []
+        for entry_id, fields in entries:
+            if not fields:
+                continue
+            raw = fields.get(b"data") or fields.get("data")
+            out.append((entry_id, json.loads(raw)))
+        return out
+
+    @staticmethod
+    def _insert(entries: list[tuple[str, dict]]) -> tuple[int, list, bool]:
+        """
+        Write a batch. Returns (rows written, ids safe to acknowledge, whether
+        the database looked unavailable).
+
+        Only rows that were written or that failed on their own (bad data,
+        constraint violation) are acknowledged. Rows that hit a connection
+        error or an unexpected error stay pending so XAUTOCLAIM retries them
+        on a later drain instead of losing them during an outage.
+        """
+        try:
+            written = RAGEvaluationService.log_evaluations_bulk([rec for _, rec in entries])
+            return written, [entry_id for entry_id, _ in entries], False
+        except _UNAVAILABLE as e:
+            db.session.rollback()
+            current_app.logger.warning(
+                "Evaluation insert deferred, database unavailable (%s rows kept pending): %s",
+                len(entries),
+                str(e),
+            )
+            return 0, [], True
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.warning(
+                "Bulk evaluation insert failed for %s rows, retrying one by one: %s",
+                len(entries),
+                str(e),
+            )
+
+        written, settled = 0, []
+        for entry_id, rec in entries:
+            try:
+                written += RAGEvaluationService.log_evaluations_bulk([rec])
+                settled.append(entry_id)
+            except _UNAVAILABLE as e:
+                db.session.rollback()
+                current_app.logger.warning("Evaluation insert deferred, database unavailable: %s", str(e))
+                return written, settled, True
+            except _RECORD_ERRORS as e:
+                db.session.rollback()
+                current_app.logger.error("Dropping evaluation record %s: %s", entry_id, str(e))
+                settled.append(entry_id)
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error("Evaluation record %s left pending: %s", entry_id, str(e))
+        return written, settled, False
+
+    @staticmethod
+    def drain(consumer: str = "drain", max_batches: int | None = None) -> int:
+        """
+        Bulk-insert buffered records in batches of RAG_EVAL_BUFFER_BATCH_SIZE
+        until the stream is empty (or max_batches). Returns rows written.
+        """
+        r = get_redis()
+        if r is None:
+            return 0
+
+        stream = EvaluationBuffer._stream()
+        batch_size = int(current_app.config.get("RAG_EVAL_BUFFER_BATCH_SIZE", 500))
+        if max_batches is None:
+            max_batches = int(current_app.config.get("RAG_EVAL_BUFFER_MAX_BATCHES", 20))
+
+        EvaluationBuffer._ensure_group(r, stream)
+        written = 0
+        for _ in range(max_batches):
+            entries = EvaluationBuffer._read(r, stream, consumer, batch_size)
+            if not entries:
+                break
+            batch_written, settled, unavailable = EvaluationBuffer._insert(entries)
+            written += batch_written
+
+            if settled:
+                r.xack(stream, _GROUP, *settled)
+                r.xdel(stream, *settled)
+            if unavailable or len(settled) < len(entries) or len(entries) < batch_size:
+                break
+
+        if written:
+            current_app.logger.info("Evaluation buffer drained: rows=%s", written)
+        return written
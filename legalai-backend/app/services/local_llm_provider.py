@@ -0,0 +1,173 @@
+"""
+Deterministic local stub provider (EMBEDDING_PROVIDER=local / CHAT_PROVIDER=local).
+
+Answers LLMService requests in-process with OpenAI-shaped responses so the
+whole /chat/ask path (breakers, batching, evaluation) can be load tested
+offline without spending API credits:
+
+- embeddings: unit vectors of EMBEDDING_DIMENSION seeded from
+  sha256(model, text), identical across runs and machines
+- classify:   canned classifier JSON (LOCAL_LLM_CLASSIFY_CATEGORY)
+- answer / summarize: seeded filler text of LOCAL_LLM_COMPLETION_TOKENS words
+
+Latency is simulated as time-to-first-token plus per-token decode time:
+  LOCAL_LLM_EMBED_LATENCY_MS / LOCAL_LLM_CHAT_LATENCY_MS  base latency
+  LOCAL_LLM_LATENCY_DISTRIBUTION                          fixed | uniform | normal | lognormal
+  LOCAL_LLM_LATENCY_JITTER_MS                             spread around the base
+  LOCAL_LLM_TOKEN_LATENCY_MS                              delay per streamed token
+  LOCAL_LLM_SEED                                          seeds the latency sampler
+"""
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+
+from flask import current_app
+
+_WORDS = (
+    "the law provides that a woman may apply to the family court for protection "
+    "maintenance custody and dissolution of marriage under the relevant provincial act "
+    "and should keep copies of all documents and seek help from a registered lawyer"
+).split()
+
+
+class LocalLLMProvider:
+    _rng: random.Random | None = None
+    _rng_seed = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _seeded(*parts: str) -> random.Random:
+        digest = hashlib.sha256("\0".join(parts).encode("utf-8")).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+
+    @classmethod
+    def _sample_ms(cls, base_ms: float) -> float:
+        cfg = current_app.config
+        distribution = (cfg.get("LOCAL_LLM_LATENCY_DISTRIBUTION") or "fixed").lower()
+        jitter_ms = float(cfg.get("LOCAL_LLM_LATENCY_JITTER_MS", 0))
+        if base_ms <= 0 or distribution == "fixed" or jitter_ms <= 0:
+            return max(0.0, base_ms)
+
+        seed = cfg.get("LOCAL_LLM_SEED")
+        with cls._lock:
+            if cls._rng is None or cls._rng_seed != seed:
+                cls._rng = random.Random(seed)
+                cls._rng_seed = seed
+
+            if distribution == "uniform":
+                value = cls._rng.uniform(base_ms - jitter_ms, base_ms + jitter_ms)
+            elif distribution == "normal":
+                value = cls._rng.gauss(base_ms, jitter_ms)
+            elif distribution == "lognormal":
+                # Median base_ms, long right tail like real provider latency.
+                value = cls._rng.lognormvariate(math.log(base_ms), jitter_ms / base_ms)
+            else:
+                raise RuntimeError(f"Unsupported LOCAL_LLM_LATENCY_DISTRIBUTION: {distribution}")
+        return max(0.0, value)
+
+    @staticmethod
+    def embedding(model: str, text: str, dim: int) -> list[float]:
+        rng = LocalLLMProvider._seeded(model, text)
+        vec = [rng.gauss(0.0, 1.0) for _ in range(dim)]
+        norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+        return [v / norm for v in vec]
+
+    @staticmethod
+    def _last_user_text(messages: list[dict]) -> str:
+        for m in reversed(messages or []):
+            if m.get("role") == "user":
+                return str(m.get("content") or "")
+        return ""
+
+    @staticmethod
+    def _completion_text(operation: str, payload: dict) -> str:
+        cfg = current_app.config
+        if operation == "classify":
+            return json.dumps({
+                "category": cfg.get("LOCAL_LLM_CLASSIFY_CATEGORY", "IN_DOMAIN_LEGAL"),
+                "confidence": 0.9,
+                "topic": "other",
+            })
+
+        n_words = int(cfg.get("LOCAL_LLM_COMPLETION_TOKENS", 200))
+        if payload.get("max_tokens"):
+            n_words = min(n_words, int(payload["max_tokens"]))
+        rng = LocalLLMProvider._seeded(operation, LocalLLMProvider._last_user_text(payload.get("messages")))
+        body = " ".join(rng.choice(_WORDS) for _ in range(max(1, n_words)))
+        if operation == "answer":
+            body += "\n\nLaws may vary by province. This information is for awareness only."
+        return body
+
+    @staticmethod
+    def response(operation: str, payload: dict) -> tuple[dict, float]:
+        """
+        Build the OpenAI-shaped response for a request and its simulated
+        latency in seconds (not slept).
+        """
+        cfg = current_app.config
+        if operation in {"embed", "embed_batch"}:
+            dim = int(cfg["EMBEDDING_DIMENSION"])
+            inputs = payload.get("input") or []
+            data = {
+                "data": [
+                    {"index": i, "embedding": LocalLLMProvider.embedding(payload.get("model", ""), t, dim)}
+                    for i, t in enumerate(inputs)
+                ],
+                "usage": {"prompt_tokens": sum(len(t) for t in inputs) // 4},
+            }
+            delay_ms = LocalLLMProvider._sample_ms(float(cfg.get("LOCAL_LLM_EMBED_LATENCY_MS", 20)))
+            return data, delay_ms / 1000
+
+        text = LocalLLMProvider._completion_text(operation, payload)
+        prompt_tokens = sum(len(str(m.get("content") or "")) for m in payload.get("messages") or []) // 4
+        completion_tokens = len(text.split())
+        data = {
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": 0},
+            },
+        }
+        delay_ms = LocalLLMProvider._sample_ms(float(cfg.get("LOCAL_LLM_CHAT_LATENCY_MS", 300)))
+        delay_ms += completion_tokens * float(cfg.get("LOCAL_LLM_TOKEN_LATENCY_MS", 0))
+        return data, delay_ms / 1000
+
+    @staticmethod
+    def post(operation: str, payload: dict, timeout: float) -> dict:
+        """
+        Sync counterpart of a provider POST. Raises TimeoutError when the
+        simulated latency exceeds the timeout (after waiting the timeout).
+        """
+        data, delay_s = LocalLLMProvider.response(operation, payload)
+        if delay_s > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Local provider {operation} exceeded {timeout:.2f}s")
+        time.sleep(delay_s)
+        return data
+
+    @staticmethod
+    def stream(operation: str, payload: dict):
+        """
+        Yield OpenAI-style chat.completion.chunk dicts: the first after the
+        time-to-first-token latency, then one per word every
+        LOCAL_LLM_TOKEN_LATENCY_MS.
+        """
+        cfg = current_app.config
+        text = LocalLLMProvider._completion_text(operation, payload)
+        token_s = float(cfg.get("LOCAL_LLM_TOKEN_LATENCY_MS", 0)) / 1000
+
+        time.sleep(LocalLLMProvider._sample_ms(float(cfg.get("LOCAL_LLM_CHAT_LATENCY_MS", 300))) / 1000)
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            if i and token_s:
+                time.sleep(token_s)
+            yield {
+                "object": "chat.completion.chunk",
+                "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}],
+            }
+        yield {"object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
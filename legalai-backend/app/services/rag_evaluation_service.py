@@ -13,6 +13,8 @@ from ..extensions import db
 from ..models.rag_evaluation import RAGEvaluationLog
 from ..models.rag import KnowledgeChunk, KnowledgeSource
 from ..utils.token_counter import TokenCounter
+from datetime import datetime
+from sqlalchemy import insert
 from typing import Optional, List, Dict, Any
 import time
 
@@ -24,6 +26,165 @@ class RAGEvaluationService:
     Thread-safe, designed for async execution via Celery.
     """
     
+    @staticmethod
+    def _source_titles_by_chunk(chunk_ids: List[int]) -> Dict[int, str]:
+        """
+        Source title per chunk id, in one query for any number of evaluations.
+        """
+        if not chunk_ids:
+            return {}
+        try:
+            rows = (
+                KnowledgeChunk.query
+                .filter(KnowledgeChunk.id.in_(set(chunk_ids)))
+                .join(KnowledgeSource, KnowledgeChunk.source_id == KnowledgeSource.id)
+                .with_entities(KnowledgeChunk.id, KnowledgeSource.title)
+                .all()
+            )
+            return {r.id: r.title for r in rows if r.title}
+        except Exception as e:
+            current_app.logger.warning(
+                "Failed to fetch source titles for evaluation: %s", 
+                str(e)
+            )
+            return {}
+    
+    @staticmethod
+    def _build_row(record: Dict[str, Any], titles_by_chunk: Dict[int, str]) -> Dict[str, Any]:
+        """
+        Turn a log_evaluation() argument dict into RAGEvaluationLog column
+        values: sanitizes text, derives fallback/disclaimer flags, resolves
+        source titles and falls back to tiktoken for missing token counts.
+        """
+        question = record.get("question") or ""
+        answer = record.get("answer") or ""
+        question_sanitized = question[:5000]
+        answer_sanitized = answer[:10000]
+        
+        fallback_indicators = [
+            "can only help with legal awareness",
+            "could not find relevant information",
+            "please ask a legal question",
+            "i can only help",
+            "not able to process"
+        ]
+        used_fallback = any(
+            indicator in answer_sanitized.lower() 
+            for indicator in fallback_indicators
+        )
+        
+        disclaimer_indicators = [
+            "this information is provided only",
+            "please contact a lawyer",
+            "for urgent help, use the helpline"
+        ]
+        disclaimer_added = any(
+            indicator in answer_sanitized.lower()
+            for indicator in disclaimer_indicators
+        )
+        
+        chunk_ids = record.get("chunk_ids") or []
+        source_titles = []
+        for cid in chunk_ids:
+            title = titles_by_chunk.get(cid)
+            if title and title not in source_titles:
+                source_titles.append(title)
+        
+        chat_model = record.get("chat_model")
+        prompt_tokens = record.get("prompt_tokens")
+        completion_tokens = record.get("completion_tokens")
+        total_tokens = record.get("total_tokens")
+        if chat_model and prompt_tokens is None:
+            try:
+                if record.get("prompt_messages"):
+                    prompt_tokens = TokenCounter.count_messages_tokens(
+                        record["prompt_messages"], 
+                        chat_model
+                    )
+                
+                if record.get("completion_text"):
+                    completion_tokens = TokenCounter.count_tokens(
+                        record["completion_text"], 
+                        chat_model
+                    )
+                    
+            except Exception as e:
+                current_app.logger.warning(
+                    "Token counting failed in evaluation: %s", 
+                    str(e)
+                )
+        
+        if total_tokens is None and prompt_tokens and completion_tokens:
+            total_tokens = prompt_tokens + completion_tokens
+        
+        error_message = record.get("error_message")
+        return dict(
+            user_id=record["user_id"],
+            conversation_id=record.get("conversation_id"),
+            language=record["language"],
+            safe_mode=record["safe_mode"],
+            is_new_conversation=record.get("is_new_conversation"),
+            
+            question_text=question_sanitized,
+            question_length=len(question),
+            answer_text=answer_sanitized,
+            answer_length=len(answer),
+            
+            threshold_used=record["threshold"],
+            best_distance=record.get("best_distance"),
+            contexts_found=record["contexts_found"],
+            contexts_used=record["contexts_used"],
+            in_domain=record["in_domain"],
+            decision=record["decision"],
+            source_chunk_ids=chunk_ids,
+            source_titles=source_titles,
+            
+            embedding_time_ms=record["embedding_time_ms"],
+            llm_time_ms=record.get("llm_time_ms"),
+            total_time_ms=record["total_time_ms"],
+            stage_timings=record.get("stage_timings"),
+            
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=total_tokens,
+            cached_tokens=record.get("cached_tokens"),
+            
+            embedding_model=record["embedding_model"],
+            embedding_dimension=record.get("embedding_dimension"),
+            chat_model=chat_model,
+            
+            used_fallback=used_fallback,
+            disclaimer_added=disclaimer_added,
+            
+            error_occurred=record.get("error_occurred", False),
+            error_type=record.get("error_type"),
+            error_message=error_message[:500] if error_message else None,
+        )
+    
+    @staticmethod
+    def log_evaluations_bulk(records: List[Dict[str, Any]]) -> int:
+        """
+        Insert many evaluations (log_evaluation() kwargs, optionally with a
+        "created_at" ISO timestamp) with one title lookup, multi-row INSERTs
+        and a single commit. Returns the number of rows written.
+        """
+        if not records:
+            return 0
+        
+        all_chunk_ids = [cid for r in records for cid in (r.get("chunk_ids") or [])]
+        titles_by_chunk = RAGEvaluationService._source_titles_by_chunk(all_chunk_ids)
+        
+        rows = []
+        for record in records:
+            row = RAGEvaluationService._build_row(record, titles_by_chunk)
+            created_at = record.get("created_at")
+            row["created_at"] = datetime.fromisoformat(created_at) if created_at else datetime.utcnow()
+            rows.append(row)
+        
+        db.session.execute(insert(RAGEvaluationLog), rows)
+        db.session.commit()
+        return len(rows)
+    
     @staticmethod
     def log_evaluation(
         user_id: int,
@@ -54,6 +215,13 @@ class RAGEvaluationService:
         prompt_messages: Optional[List[Dict]] = None,
         completion_text: Optional[str] = None,
         
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+        total_tokens: Optional[int] = None,
+        cached_tokens: Optional[int] = None,
+        
+        stage_timings: Optional[Dict[str, int]] = None,
+        
         error_occurred: bool = False,
         error_type: Optional[str] = None,
         error_message: Optional[str] = None,
@@ -61,120 +229,22 @@ class RAGEvaluationService:
         """
         Log RAG evaluation metrics (async-safe).
         
+        Token counts reported by the provider are stored as-is. tiktoken is
+        only used as a fallback when they are missing and prompt_messages /
+        completion_text were sent instead.
+        
         Returns:
             Optional[int]: Evaluation log ID if successful, None if failed
         """
+        record = dict(locals())
         try:
-            question_sanitized = question[:5000] if question else ""
-            answer_sanitized = answer[:10000] if answer else ""
-            
-            fallback_indicators = [
-                "can only help with legal awareness",
-                "could not find relevant information",
-                "please ask a legal question",
-                "i can only help",
-                "not able to process"
-            ]
-            used_fallback = any(
-                indicator in answer_sanitized.lower() 
-                for indicator in fallback_indicators
-            )
-            
-            disclaimer_indicators = [
-                "this information is provided only",
-                "please contact a lawyer",
-                "for urgent help, use the helpline"
-            ]
-            disclaimer_added = any(
-                indicator in answer_sanitized.lower()
-                for indicator in disclaimer_indicators
-            )
-            
-            source_titles = []
-            if chunk_ids:
-                try:
-                    chunks = (
-                        KnowledgeChunk.query
-                        .filter(KnowledgeChunk.id.in_(chunk_ids))
-                        .join(KnowledgeSource, KnowledgeChunk.source_id == KnowledgeSource.id)
-                        .with_entities(KnowledgeSource.title)
-                        .distinct()
-                        .all()
-                    )
-                    source_titles = [c.title for c in chunks if c.title]
-                except Exception as e:
-                    current_app.logger.warning(
-                        "Failed to fetch source titles for evaluation: %s", 
-                        str(e)
-                    )
-            
-            prompt_tokens = None
-            completion_tokens = None
-            total_tokens = None
-            
-            if chat_model:
-                try:
-                    if prompt_messages:
-                        prompt_tokens = TokenCounter.count_messages_tokens(
-                            prompt_messages, 
-                            chat_model
-                        )
-                    
-                    if completion_text:
-                        completion_tokens = TokenCounter.count_tokens(
-                            completion_text, 
-                            chat_model
-                        )
-                    
-                    if prompt_tokens and completion_tokens:
-                        total_tokens = prompt_tokens + completion_tokens
-                        
-                except Exception as e:
-                    current_app.logger.warning(
-                        "Token counting failed in evaluation: %s", 
-                        str(e)
-                    )
-            
-            eval_log = RAGEvaluationLog(
-                user_id=user_id,
-                conversation_id=conversation_id,
-                language=language,
-                safe_mode=safe_mode,
-                is_new_conversation=is_new_conversation,
-                
-                question_text=question_sanitized,
-                question_length=len(question),
-                answer_text=answer_sanitized,
-                answer_length=len(answer),
-                
-                threshold_used=threshold,
-                best_distance=best_distance,
-                contexts_found=contexts_found,
-                contexts_used=contexts_used,
-                in_domain=in_domain,
-                decision=decision,
-                source_chunk_ids=chunk_ids if chunk_ids else [],
-                source_titles=source_titles if source_titles else [],
-                
-                embedding_time_ms=embedding_time_ms,
-                llm_time_ms=llm_time_ms,
-                total_time_ms=total_time_ms,
-                
-                prompt_tokens=prompt_tokens,
-                completion_tokens=completion_tokens,
-                total_tokens=total_tokens,
-                
-                embedding_model=embedding_model,
-                embedding_dimension=embedding_dimension,
-                chat_model=chat_model,
-                
-                used_fallback=used_fallback,
-                disclaimer_added=disclaimer_added,
-                
-                error_occurred=error_occurred,
-                error_type=error_type,
-                error_message=error_message[:500] if error_message else None,
+            row = RAGEvaluationService._build_row(
+                record,
+                RAGEvaluationService._source_titles_by_chunk(chunk_ids),
             )
+            eval_log = RAGEvaluationLog(**row)
+            used_fallback = row["used_fallback"]
+            total_tokens = row["total_tokens"]
             
             db.session.add(eval_log)
             db.session.commit()
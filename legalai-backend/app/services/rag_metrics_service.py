@@ -0,0 +1,159 @@
+"""
+Aggregated RAG metrics for the admin dashboard.
+
+The summary used to run a dozen aggregate queries over rag_evaluation_logs
+per request. It now costs two:
+- one SUM over rag_metrics_hourly for the completed hours of the window
+  that the rollup already covers
+- one scan of the raw logs for the rest (the partial first hour and
+  everything after the rollup watermark), every metric computed in the same
+  pass with aggregate FILTER clauses
+
+refresh_hourly_rollups() is run by the refresh_rag_metrics_rollup beat task
+every RAG_METRICS_ROLLUP_INTERVAL_SECONDS. It upserts completed hours only,
+re-aggregating the last RAG_METRICS_ROLLUP_LOOKBACK_HOURS so evaluations
+drained late from the buffer are still counted. An empty rollup table is
+backfilled for RAG_METRICS_MAX_DAYS; if the task stops running the summary
+stays correct and simply scans more raw rows.
+"""
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import DateTime, func, literal, literal_column, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from ..extensions import db
+from ..models.rag_evaluation import RAGEvaluationLog, RAGMetricsHourly
+
+_HOUR = timedelta(hours=1)
+
+# Decision values ChatPipeline logs (greetings are not logged) -> rollup column.
+DECISION_COLUMNS = {
+    "ANSWER_WITH_SOURCES": "answer_with_sources_count",
+    "ANSWER_NO_SOURCES": "answer_no_sources_count",
+    "DEGRADED": "degraded_count",
+    "EMERGENCY": "emergency_count",
+    "REFUSE_OUT_OF_DOMAIN": "refused_count",
+}
+
+
+def _floor_hour(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def _aggregates() -> dict:
+    """rag_metrics_hourly column -> aggregate over rag_evaluation_logs."""
+    log = RAGEvaluationLog
+    in_domain = log.in_domain.is_(True)
+    return {
+        "total_queries": func.count(log.id),
+        **{column: func.count(log.id).filter(log.decision == decision)
+           for decision, column in DECISION_COLUMNS.items()},
+        "in_domain_count": func.count(log.id).filter(in_domain),
+        "fallback_count": func.count(log.id).filter(log.used_fallback.is_(True)),
+        "error_count": func.count(log.id).filter(log.error_occurred.is_(True)),
+        "total_time_ms_sum": func.coalesce(func.sum(log.total_time_ms), 0),
+        "embedding_time_ms_sum": func.coalesce(func.sum(log.embedding_time_ms), 0),
+        "llm_time_ms_count": func.count(log.llm_time_ms),
+        "llm_time_ms_sum": func.coalesce(func.sum(log.llm_time_ms), 0),
+        "total_tokens_count": func.count(log.total_tokens),
+        "total_tokens_sum": func.coalesce(func.sum(log.total_tokens), 0),
+        "best_distance_count": func.count(log.best_distance).filter(in_domain),
+        "best_distance_sum": func.coalesce(func.sum(log.best_distance).filter(in_domain), 0),
+        "contexts_used_sum": func.coalesce(func.sum(log.contexts_used), 0),
+    }
+
+
+class RAGMetricsService:
+
+    @staticmethod
+    def _rollup_totals(start: datetime, end: datetime) -> tuple[dict, datetime | None]:
+        """
+        Summed rollup columns for buckets in [start, end), and the end of the
+        newest bucket found (None when the rollup has nothing in range).
+        """
+        columns = list(_aggregates())
+        row = db.session.execute(
+            select(
+                *[func.coalesce(func.sum(getattr(RAGMetricsHourly, c)), 0).label(c) for c in columns],
+                func.max(RAGMetricsHourly.bucket_start).label("last_bucket"),
+            ).where(
+                RAGMetricsHourly.bucket_start >= start,
+                RAGMetricsHourly.bucket_start < end,
+            )
+        ).one()
+        totals = {c: row._mapping[c] for c in columns}
+        return totals, (row.last_bucket + _HOUR if row.last_bucket else None)
+
+    @staticmethod
+    def _raw_totals(*conditions) -> dict:
+        aggregates = _aggregates()
+        row = db.session.execute(
+            select(*[expr.label(c) for c, expr in aggregates.items()]).where(*conditions)
+        ).one()
+        return {c: row._mapping[c] or 0 for c in aggregates}
+
+    @staticmethod
+    def totals(days: int, now: datetime | None = None) -> dict:
+        """Aggregated counters for the last `days` days, merged from rollups and raw logs."""
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(days=days)
+        rollup_from = _floor_hour(cutoff)
+        if rollup_from < cutoff:
+            rollup_from += _HOUR
+
+        rolled, watermark = RAGMetricsService._rollup_totals(rollup_from, _floor_hour(now))
+        created = RAGEvaluationLog.created_at
+        if watermark is None:
+            raw = RAGMetricsService._raw_totals(created >= cutoff)
+        else:
+            raw = RAGMetricsService._raw_totals(
+                created >= cutoff,
+                or_(created < rollup_from, created >= watermark),
+            )
+        return {c: float(rolled[c] or 0) + float(raw[c] or 0) for c in rolled}
+
+    @staticmethod
+    def refresh_hourly_rollups(now: datetime | None = None) -> int:
+        """
+        Upsert rag_metrics_hourly for completed hours since the last refresh.
+
+        Returns the number of hourly buckets written.
+        """
+        now = now or datetime.utcnow()
+        end = _floor_hour(now)
+        lookback = int(current_app.config.get("RAG_METRICS_ROLLUP_LOOKBACK_HOURS", 3))
+
+        last_bucket = db.session.query(func.max(RAGMetricsHourly.bucket_start)).scalar()
+        if last_bucket is None:
+            start = end - timedelta(days=int(current_app.config.get("RAG_METRICS_MAX_DAYS", 90)))
+        else:
+            start = last_bucket + _HOUR - timedelta(hours=lookback)
+        if start >= end:
+            return 0
+
+        aggregates = _aggregates()
+        # Inline 'hour' so the SELECT and GROUP BY expressions match exactly.
+        bucket = func.date_trunc(literal_column("'hour'"), RAGEvaluationLog.created_at)
+        rows = (
+            select(
+                bucket.label("bucket_start"),
+                *[expr.label(c) for c, expr in aggregates.items()],
+                literal(datetime.utcnow(), DateTime).label("updated_at"),
+            )
+            .where(RAGEvaluationLog.created_at >= start, RAGEvaluationLog.created_at < end)
+            .group_by(bucket)
+        )
+        columns = ["bucket_start", *aggregates, "updated_at"]
+        stmt = pg_insert(RAGMetricsHourly).from_select(columns, rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["bucket_start"],
+            set_={c: stmt.excluded[c] for c in columns[1:]},
+        )
+        written = db.session.execute(stmt).rowcount
+        db.session.commit()
+
+        current_app.logger.info(
+            "RAG metrics rollup: buckets=%s from=%s to=%s", written, start.isoformat(), end.isoformat()
+        )
+        return written
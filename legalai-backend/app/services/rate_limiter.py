@@ -0,0 +1,207 @@
+"""
+Client-side provider rate limiter.
+
+One token bucket per (provider, model) tracks both requests and tokens per
+minute (LLM_RATE_LIMIT_RPM / LLM_RATE_LIMIT_TPM, overridable per
+"provider:model" in LLM_RATE_LIMITS). Buckets live in Redis so every web and
+Celery worker sharing an API key draws from the same budget; without Redis
+each process keeps its own bucket.
+
+Two priority lanes share each bucket:
+- interactive: user-facing calls; may drain the bucket to zero and only wait
+  up to LLM_RATE_LIMIT_MAX_WAIT_SECONDS before going ahead anyway
+- batch: ingestion and background jobs; may only spend down to
+  LLM_RATE_LIMIT_BATCH_RESERVE of capacity, so they yield to interactive
+  traffic and wait for refill instead of hitting 429s
+"""
+import json
+import math
+import threading
+import time
+
+from flask import current_app
+
+from ..utils.redis_client import get_redis
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+
+_TAKE_LUA = """
+local now = tonumber(ARGV[1])
+local rcap = tonumber(ARGV[2])
+local tcap = tonumber(ARGV[3])
+local rcost = tonumber(ARGV[4])
+local tcost = tonumber(ARGV[5])
+local reserve = tonumber(ARGV[6])
+
+local state = redis.call('HMGET', KEYS[1], 'r', 't', 'ts')
+local r = tonumber(state[1]) or rcap
+local t = tonumber(state[2]) or tcap
+local ts = tonumber(state[3]) or now
+local elapsed = math.max(0, now - ts)
+r = math.min(rcap, r + elapsed * rcap / 60000)
+t = math.min(tcap, t + elapsed * tcap / 60000)
+
+local wait = 0
+if rcap > 0 then
+  local need = rcost + reserve * rcap - r
+  if need > 0 then wait = math.max(wait, need * 60000 / rcap) end
+end
+if tcap > 0 then
+  tcost = math.min(tcost, tcap * (1 - reserve))
+  local need = tcost + reserve * tcap - t
+  if need > 0 then wait = math.max(wait, need * 60000 / tcap) end
+end
+if wait == 0 then
+  r = r - rcost
+  t = t - tcost
+end
+
+redis.call('HSET', KEYS[1], 'r', tostring(r), 't', tostring(t), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], 120000)
+return math.ceil(wait)
+"""
+
+
+def _take(state: dict, now_ms: float, rcap: float, tcap: float, rcost: float, tcost: float, reserve: float) -> int:
+    """In-process twin of _TAKE_LUA. Mutates state; returns wait in ms (0 = granted)."""
+    r = state.get("r", rcap)
+    t = state.get("t", tcap)
+    elapsed = max(0.0, now_ms - state.get("ts", now_ms))
+    r = min(rcap, r + elapsed * rcap / 60000)
+    t = min(tcap, t + elapsed * tcap / 60000)
+
+    wait = 0.0
+    if rcap > 0:
+        need = rcost + reserve * rcap - r
+        if need > 0:
+            wait = max(wait, need * 60000 / rcap)
+    if tcap > 0:
+        tcost = min(tcost, tcap * (1 - reserve))
+        need = tcost + reserve * tcap - t
+        if need > 0:
+            wait = max(wait, need * 60000 / tcap)
+    if wait == 0:
+        r -= rcost
+        t -= tcost
+
+    state.update(r=r, t=t, ts=now_ms)
+    return math.ceil(wait)
+
+
+class ProviderRateLimiter:
+    _local: dict[str, dict] = {}
+    _lock = threading.Lock()
+    _script = None
+
+    @staticmethod
+    def _limits(provider: str, model: str) -> tuple[float, float]:
+        cfg = current_app.config
+        rpm = float(cfg.get("LLM_RATE_LIMIT_RPM", 0))
+        tpm = float(cfg.get("LLM_RATE_LIMIT_TPM", 0))
+        overrides = cfg.get("LLM_RATE_LIMITS") or {}
+        if isinstance(overrides, str):
+            overrides = json.loads(overrides) if overrides.strip() else {}
+        specific = overrides.get(f"{provider}:{model}") or overrides.get(provider) or {}
+        return float(specific.get("rpm", rpm)), float(specific.get("tpm", tpm))
+
+    @staticmethod
+    def estimate_tokens(payload: dict) -> int:
+        """Rough pre-call token cost (chars / 4, plus the completion budget)."""
+        if "input" in payload:
+            inputs = payload["input"]
+            inputs = inputs if isinstance(inputs, list) else [inputs]
+            return max(1, sum(len(str(i)) for i in inputs) // 4)
+        chars = 0
+        for m in payload.get("messages") or []:
+            chars += len(str(m.get("content") or ""))
+        system = payload.get("system")
+        if isinstance(system, list):
+            chars += sum(len(b.get("text", "")) for b in system)
+        elif system:
+            chars += len(system)
+        return max(1, chars // 4 + int(payload.get("max_tokens") or 0))
+
+    @classmethod
+    def _try_take(cls, provider: str, model: str, tokens: int, lane: str) -> float:
+        """Returns seconds to wait before retrying; 0 means the call may proceed."""
+        rpm, tpm = cls._limits(provider, model)
+        if rpm <= 0 and tpm <= 0:
+            return 0.0
+
+        reserve = float(current_app.config.get("LLM_RATE_LIMIT_BATCH_RESERVE", 0.3)) if lane == BATCH else 0.0
+        key = f"llm:ratelimit:{provider}:{model}"
+        now_ms = time.time() * 1000
+
+        r = get_redis()
+        if r is not None:
+            try:
+                if cls._script is None:
+                    cls._script = r.register_script(_TAKE_LUA)
+                wait_ms = cls._script(keys=[key], args=[now_ms, rpm, tpm, 1, tokens, reserve], client=r)
+                return int(wait_ms) / 1000
+            except Exception as e:
+                current_app.logger.warning("Rate limiter Redis unavailable, using local bucket: %s", str(e))
+
+        with cls._lock:
+            state = cls._local.setdefault(key, {})
+            return _take(state, now_ms, rpm, tpm, 1, tokens, reserve) / 1000
+
+    @staticmethod
+    def _max_wait(lane: str) -> float:
+        cfg = current_app.config
+        if lane == BATCH:
+            return float(cfg.get("LLM_RATE_LIMIT_BATCH_MAX_WAIT_SECONDS", 300))
+        return float(cfg.get("LLM_RATE_LIMIT_MAX_WAIT_SECONDS", 2))
+
+    @classmethod
+    def acquire(cls, provider: str, model: str, tokens: int, lane: str = INTERACTIVE) -> float:
+        """
+        Block until the bucket admits the call. Returns seconds waited.
+
+        Interactive calls proceed once their max wait is spent; batch calls
+        raise RuntimeError instead.
+        """
+        deadline = time.monotonic() + cls._max_wait(lane)
+        waited = 0.0
+        while True:
+            wait_s = cls._try_take(provider, model, tokens, lane)
+            if wait_s <= 0:
+                return waited
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return cls._on_exhausted(provider, model, lane, waited)
+            step = min(wait_s, remaining)
+            time.sleep(step)
+            waited += step
+
+    @staticmethod
+    def _on_exhausted(provider: str, model: str, lane: str, waited: float) -> float:
+        if lane == BATCH:
+            raise RuntimeError(f"Rate limit wait exceeded for {provider}:{model} ({waited:.1f}s)")
+        current_app.logger.warning(
+            "Rate limiter wait exhausted provider=%s model=%s waited=%.2fs; proceeding",
+            provider,
+            model,
+            waited,
+        )
+        return waited
+
+    @classmethod
+    def drain(cls, provider: str, model: str) -> None:
+        """
+        Empty the bucket after a provider 429 so every worker backs off
+        until it refills.
+        """
+        key = f"llm:ratelimit:{provider}:{model}"
+        now_ms = time.time() * 1000
+        r = get_redis()
+        if r is not None:
+            try:
+                r.hset(key, mapping={"r": 0, "t": 0, "ts": now_ms})
+                r.pexpire(key, 120000)
+                return
+            except Exception as e:
+                current_app.logger.warning("Rate limiter drain failed: %s", str(e))
+        with cls._lock:
+            cls._local[key] = {"r": 0.0, "t": 0.0, "ts": now_ms}
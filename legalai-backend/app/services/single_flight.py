@@ -0,0 +1,171 @@
+"""
+Single-flight coalescing of identical stateless questions.
+
+During awareness campaigns many users send the same question within seconds.
+For requests whose answer depends only on (question, language, province) and
+the knowledge base, i.e. safe mode and first turns, one leader computes the
+answer and concurrent duplicates wait for it instead of issuing their own
+classify / embed / answer calls.
+
+- in-process: threads of one worker share a threading.Event
+- cross-worker: the leader holds sf:lock:<key> (SET NX PX) in Redis and
+  publishes its result to sf:result:<key> for SINGLE_FLIGHT_RESULT_TTL_SECONDS;
+  followers poll for it within their request deadline
+
+Keys include the knowledge-base version (rag:kb:version), bumped whenever a
+source finishes ingesting or is deleted, so answers never outlive the
+sources they were built from. If the leader fails, followers compute the
+answer themselves.
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+import uuid
+
+from flask import current_app
+
+from ..utils.deadline import current_deadline
+from ..utils.redis_client import get_redis
+
+_KB_VERSION_KEY = "rag:kb:version"
+_POLL_SECONDS = 0.05
+_TRAILING_PUNCT = re.compile(r"[\s?!.،۔؟]+$")
+
+# KEYS[1] lock; ARGV[1] leader token. Deletes the lock only while this
+# leader still holds it, so a leader that outlived its lock cannot release
+# the lock a newer leader took after expiry.
+_UNLOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class SingleFlight:
+    _lock = threading.Lock()
+    _flights: dict[str, _Flight] = {}
+    _local_kb_version = 0
+
+    @staticmethod
+    def kb_version() -> str:
+        r = get_redis()
+        if r is not None:
+            try:
+                value = r.get(_KB_VERSION_KEY)
+                return value.decode() if value else "0"
+            except Exception as e:
+                current_app.logger.warning("KB version read failed: %s", str(e))
+        return str(SingleFlight._local_kb_version)
+
+    @staticmethod
+    def bump_kb_version() -> None:
+        """Call whenever the set of searchable knowledge sources changes."""
+        SingleFlight._local_kb_version += 1
+        r = get_redis()
+        if r is not None:
+            try:
+                r.incr(_KB_VERSION_KEY)
+            except Exception as e:
+                current_app.logger.warning("KB version bump failed: %s", str(e))
+
+    @staticmethod
+    def key_for(question: str, language: str, province: str | None) -> str:
+        normalized = _TRAILING_PUNCT.sub("", " ".join((question or "").casefold().split()))
+        raw = "\0".join([normalized, language or "", province or "", SingleFlight.kb_version()])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _wait_budget() -> float:
+        budget = float(current_app.config.get("SINGLE_FLIGHT_MAX_WAIT_SECONDS", 20))
+        deadline = current_deadline()
+        if deadline is not None:
+            budget = min(budget, deadline.remaining())
+        return max(0.0, budget)
+
+    @classmethod
+    def do(cls, key: str, fn) -> tuple[dict, bool]:
+        """
+        Run fn() (returning a JSON-serializable dict) at most once per key
+        across concurrent callers. Returns (result, is_leader).
+        """
+        with cls._lock:
+            flight = cls._flights.get(key)
+            local_leader = flight is None
+            if local_leader:
+                flight = _Flight()
+                cls._flights[key] = flight
+
+        if not local_leader:
+            flight.done.wait(cls._wait_budget())
+            if flight.result is not None:
+                return flight.result, False
+            return fn(), True
+
+        try:
+            result, leader = cls._do_shared(key, fn)
+            flight.result = result
+            return result, leader
+        finally:
+            with cls._lock:
+                cls._flights.pop(key, None)
+            flight.done.set()
+
+    @staticmethod
+    def _do_shared(key: str, fn) -> tuple[dict, bool]:
+        r = get_redis()
+        if r is None:
+            return fn(), True
+
+        lock_key = f"sf:lock:{key}"
+        result_key = f"sf:result:{key}"
+        token = uuid.uuid4().hex
+        lock_ms = int(float(current_app.config.get("SINGLE_FLIGHT_LOCK_SECONDS", 30)) * 1000)
+        try:
+            cached = r.get(result_key)
+            if cached is not None:
+                return json.loads(cached), False
+            leader = bool(r.set(lock_key, token, nx=True, px=lock_ms))
+        except Exception as e:
+            current_app.logger.warning("Single-flight Redis unavailable: %s", str(e))
+            return fn(), True
+
+        if leader:
+            try:
+                result = fn()
+                try:
+                    r.set(result_key, json.dumps(result),
+                          ex=int(current_app.config.get("SINGLE_FLIGHT_RESULT_TTL_SECONDS", 5)))
+                except Exception as e:
+                    current_app.logger.warning("Single-flight publish failed: %s", str(e))
+                return result, True
+            finally:
+                try:
+                    r.register_script(_UNLOCK_LUA)(keys=[lock_key], args=[token])
+                except Exception as e:
+                    current_app.logger.warning("Single-flight unlock failed: %s", str(e))
+
+        give_up_at = time.monotonic() + SingleFlight._wait_budget()
+        try:
+            while time.monotonic() < give_up_at:
+                cached = r.get(result_key)
+                if cached is not None:
+                    return json.loads(cached), False
+                if not r.exists(lock_key):
+                    # Leader finished (re-check its result) or failed.
+                    cached = r.get(result_key)
+                    if cached is not None:
+                        return json.loads(cached), False
+                    break
+                time.sleep(_POLL_SECONDS)
+        except Exception as e:
+            current_app.logger.warning("Single-flight wait failed: %s", str(e))
+        return fn(), True
@@ -8,7 +8,9 @@ from .email_tasks import (
 )
 from .ingestion_tasks import ingest_source, retry_stale_knowledge_sources
 from .reminders_tasks import send_due_reminders
-from .evaluation_tasks import log_rag_evaluation_async
+from .evaluation_tasks import log_rag_evaluation_async, drain_rag_evaluation_buffer
+from .chat_tasks import run_chat_job
+from .memory_tasks import summarize_conversation_async, trim_chat_histories
 
 __all__ = [
     "send_verification_email_task",
@@ -18,4 +20,8 @@ __all__ = [
     "retry_stale_knowledge_sources",
     "send_due_reminders",
     "log_rag_evaluation_async",
+    "drain_rag_evaluation_buffer",
+    "run_chat_job",
+    "summarize_conversation_async",
+    "trim_chat_histories",
 ]
\ No newline at end of file
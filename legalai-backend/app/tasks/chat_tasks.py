@@ -0,0 +1,85 @@
+"""
+Chat job tasks.
+
+run_chat_job executes the /chat/ask pipeline for POST /chat/jobs on the
+dedicated "chat" queue, so long LLM calls occupy chat workers instead of
+web workers:
+
+    celery -A app.celery_worker:celery worker -Q chat --loglevel=info
+"""
+import json
+import time
+
+from flask import current_app, g
+
+from .celery_app import celery
+from ..services.chat_jobs import ChatJobService
+from ..services.chat_pipeline import ChatPipeline
+from ..services.push_service import PushService
+from ..utils.deadline import Deadline
+
+_flask_app = None
+
+
+def _get_app():
+    global _flask_app
+    if _flask_app is None:
+        from .. import create_app
+        _flask_app = create_app()
+    return _flask_app
+
+
+@celery.task(bind=True, queue="chat", acks_late=True, reject_on_worker_lost=True, max_retries=3)
+def run_chat_job(self, job_id: str):
+    """
+    Run one chat job and store its response. Failures are not retried; the
+    client resubmits instead.
+
+    A worker lost mid-job leaves the job running; the redelivered message
+    waits for the lease to expire, then takes the job over (at most
+    CHAT_JOB_MAX_ATTEMPTS runs in total). If the lost run had already
+    committed its turn, the takeover returns that answer instead of
+    recording the turn again. With the Redis broker, messages
+    of a crashed worker come back after the broker visibility timeout, so
+    keep CHAT_JOB_TTL_SECONDS above it.
+    """
+    app = _get_app()
+    with app.app_context():
+        outcome, lease_remaining = ChatJobService.claim(job_id)
+        if outcome == "busy":
+            # Duplicate delivery while another worker may still hold the job.
+            raise self.retry(countdown=lease_remaining + 1)
+        if outcome != "claimed":
+            return
+
+        job = ChatJobService.get(job_id)
+        queued_ms = int((time.time() - float(job["created_at"])) * 1000)
+        g.deadline = Deadline(float(current_app.config.get("CHAT_JOB_TIMEOUT_SECONDS", 60)))
+
+        try:
+            ctx = ChatPipeline().run(ChatJobService.load_context(job_id, job))
+        except Exception as exc:
+            current_app.logger.exception("Chat job failed job_id=%s: %s", job_id, str(exc))
+            ChatJobService.update(job_id, status="failed", error="Chat job failed")
+            return
+
+        result = ctx.response()
+        ChatJobService.update(job_id, status="done", result=json.dumps(result))
+        current_app.logger.info(
+            "Chat job done job_id=%s queued_ms=%s decision=%s timings=%s",
+            job_id,
+            queued_ms,
+            ctx.decision,
+            ctx.timings,
+        )
+
+        if job.get("push") == "1":
+            try:
+                PushService.send_to_user(
+                    ctx.user_id,
+                    "Your answer is ready",
+                    (ctx.answer or "")[:120],
+                    data={"type": "chat_job", "jobId": job_id, "conversationId": str(ctx.conversation_id or "")},
+                )
+            except Exception as e:
+                current_app.logger.warning("Chat job push failed job_id=%s: %s", job_id, str(e))
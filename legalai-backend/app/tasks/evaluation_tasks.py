@@ -2,9 +2,17 @@
 Async evaluation tasks for RAG monitoring.
 
 Runs in background to avoid blocking chat responses.
+- drain_rag_evaluation_buffer: periodic bulk insert of buffered evaluations
+- log_rag_evaluation_async: single evaluation, used when the buffer is
+  unavailable
+- refresh_rag_metrics_rollup: periodic upsert of the rag_metrics_hourly
+  rollup read by the admin metrics summary
 """
 from .celery_app import celery
+from ..config import Config
+from ..services.evaluation_buffer import EvaluationBuffer
 from ..services.rag_evaluation_service import RAGEvaluationService
+from ..services.rag_metrics_service import RAGMetricsService
 from flask import current_app
 
 _flask_app = None
@@ -35,4 +43,48 @@ def log_rag_evaluation_async(self, **kwargs):
                 self.request.retries + 1,
                 str(exc),
             )
-            raise self.retry(exc=exc, countdown=2 ** self.request.retries)
\ No newline at end of file
+            raise self.retry(exc=exc, countdown=2 ** self.request.retries)
+
+
+@celery.task(bind=True)
+def drain_rag_evaluation_buffer(self):
+    """
+    Bulk-insert evaluations buffered in the Redis stream.
+    """
+    app = _get_app()
+    with app.app_context():
+        EvaluationBuffer.drain(consumer=self.request.hostname or "drain")
+
+
+@celery.task
+def refresh_rag_metrics_rollup():
+    """
+    Fold newly completed hours of rag_evaluation_logs into rag_metrics_hourly.
+    """
+    app = _get_app()
+    with app.app_context():
+        RAGMetricsService.refresh_hourly_rollups()
+
+
+@celery.on_after_configure.connect
+def setup_periodic_evaluation_drain(sender, **kwargs):
+    """
+    Register the evaluation buffer drain every RAG_EVAL_BUFFER_FLUSH_SECONDS.
+    """
+    sender.add_periodic_task(
+        float(Config.RAG_EVAL_BUFFER_FLUSH_SECONDS),
+        drain_rag_evaluation_buffer.s(),
+        name="drain_rag_evaluation_buffer",
+    )
+
+
+@celery.on_after_configure.connect
+def setup_periodic_metrics_rollup(sender, **kwargs):
+    """
+    Register the RAG metrics rollup refresh every RAG_METRICS_ROLLUP_INTERVAL_SECONDS.
+    """
+    sender.add_periodic_task(
+        float(Config.RAG_METRICS_ROLLUP_INTERVAL_SECONDS),
+        refresh_rag_metrics_rollup.s(),
+        name="refresh_rag_metrics_rollup",
+    )
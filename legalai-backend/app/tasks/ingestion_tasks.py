@@ -3,6 +3,9 @@ from .celery_app import celery
 from ..extensions import db
 from ..models.rag import KnowledgeSource, KnowledgeChunk
 from ..services.llm_service import LLMService
+from ..services.rate_limiter import BATCH
+from ..services.single_flight import SingleFlight
+from ..utils.metrics import INGESTION_CHUNKS, INGESTION_SECONDS, INGESTION_SOURCES
 from ..utils.text_extract import extract_text_from_source, chunk_text
 from flask import current_app
 
@@ -40,6 +43,7 @@ def ingest_source(source_id: int):
         if not src:
             return
 
+        t0 = time.perf_counter()
         try:
             src.retry_count = (src.retry_count or 0) + 1
             src.status = "processing"
@@ -51,6 +55,7 @@ def ingest_source(source_id: int):
                 src.status = "invalid"
                 src.error_message = "Extraction returned empty or too little text."
                 db.session.commit()
+                INGESTION_SOURCES.labels("invalid").inc()
                 return
 
             chunks = chunk_text(text)
@@ -60,6 +65,7 @@ def ingest_source(source_id: int):
                 src.status = "invalid"
                 src.error_message = "No valid chunks produced from extracted text."
                 db.session.commit()
+                INGESTION_SOURCES.labels("invalid").inc()
                 return
 
             batch_size = 32 
@@ -70,7 +76,7 @@ def ingest_source(source_id: int):
 
                 for attempt in range(3):
                     try:
-                        embs = LLMService.embed(batch) 
+                        embs = LLMService.embed(batch, lane=BATCH)
                         break
                     except Exception as e:
                         if attempt == 2:
@@ -95,12 +101,17 @@ def ingest_source(source_id: int):
             src.embedding_model = model_name
             src.embedding_dimension = expected_dim
             db.session.commit()
+            SingleFlight.bump_kb_version()
+            INGESTION_SOURCES.labels("done").inc()
+            INGESTION_CHUNKS.inc(len(chunks))
+            INGESTION_SECONDS.observe(time.perf_counter() - t0)
 
         except Exception as e:
             db.session.rollback()
             src.status = "failed"
             src.error_message = str(e)
             db.session.commit()
+            INGESTION_SOURCES.labels("failed").inc()
 
 @celery.task
 def retry_stale_knowledge_sources():
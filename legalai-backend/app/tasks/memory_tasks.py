@@ -0,0 +1,86 @@
+"""
+Async conversation memory tasks.
+
+- Refreshes the rolling conversation summary after a chat turn,
+  off the request path
+- Periodically trims chat histories back to CHAT_HISTORY_MAX_MESSAGES
+"""
+from .celery_app import celery
+from ..extensions import db
+from ..models.chat import ChatConversation, ChatMessage
+from ..services.conversation_memory_service import ConversationMemoryService
+from flask import current_app
+
+_flask_app = None
+
+
+def _get_app():
+    global _flask_app
+    if _flask_app is None:
+        from .. import create_app
+        _flask_app = create_app()
+    return _flask_app
+
+
+@celery.task(bind=True, max_retries=2)
+def summarize_conversation_async(self, conversation_id: int):
+    """
+    Fold turns that left the raw memory window into the conversation summary.
+
+    Retries up to 2 times; on final failure the turns are simply replayed raw.
+    """
+    app = _get_app()
+    with app.app_context():
+        try:
+            ConversationMemoryService.refresh_summary(conversation_id)
+        except Exception as exc:
+            current_app.logger.warning(
+                "Conversation summary task failed conv_id=%s (attempt %s): %s",
+                conversation_id,
+                self.request.retries + 1,
+                str(exc),
+            )
+            raise self.retry(exc=exc, countdown=2 ** self.request.retries)
+
+
+@celery.task
+def trim_chat_histories(batch_size: int = 500):
+    """
+    Trim conversations whose history grew past CHAT_HISTORY_MAX_MESSAGES.
+
+    Per-turn writes only trim once the slack margin is exceeded; this sweep
+    keeps the remaining overshoot bounded without touching the request path.
+    """
+    app = _get_app()
+    with app.app_context():
+        max_messages = int(current_app.config.get("CHAT_HISTORY_MAX_MESSAGES", 100))
+        conv_ids = [
+            cid for (cid,) in (
+                ChatConversation.query
+                .filter(ChatConversation.message_count > max_messages)
+                .with_entities(ChatConversation.id)
+                .limit(batch_size)
+                .all()
+            )
+        ]
+
+        deleted = 0
+        for cid in conv_ids:
+            deleted += ChatMessage.trim_conversation(cid, max_messages)
+            db.session.commit()
+
+        current_app.logger.info(
+            "Chat history trim: conversations=%s deleted=%s", len(conv_ids), deleted
+        )
+
+
+@celery.on_after_configure.connect
+def setup_periodic_history_trim(sender, **kwargs):
+    """
+    Register the hourly chat history trim sweep.
+    """
+    sender.add_periodic_task(
+        60 * 60,
+        trim_chat_histories.s(),
+        name="trim_chat_histories_hourly",
+    )
@@ -0,0 +1,88 @@
+"""
+Per-request deadlines.
+
+A /chat/ask request gets one time budget (CHAT_REQUEST_TIMEOUT_SECONDS, or
+less via the X-Request-Timeout header) stored on flask.g. Every provider
+call derives its timeout from what is left, and stages that cannot finish
+in time are skipped instead of running past the point where the client has
+given up.
+"""
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_app_context, request
+
+
+class DeadlineExceeded(RuntimeError):
+    def __init__(self, operation: str, remaining: float):
+        super().__init__(f"Request deadline exceeded before {operation} ({remaining:.2f}s left)")
+        self.operation = operation
+        self.remaining = remaining
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.budget = max(0.0, float(seconds))
+        self.expires_at = time.monotonic() + self.budget
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def clip(self, timeout: float) -> float:
+        return min(float(timeout), self.remaining())
+
+
+def start_request_deadline() -> Deadline:
+    """
+    Create the deadline for the current request and store it on g.
+
+    X-Request-Timeout (seconds) can only shorten the configured budget.
+    CHAT_DEADLINE_RESERVE_SECONDS is held back for persisting and responding.
+    """
+    budget = float(current_app.config.get("CHAT_REQUEST_TIMEOUT_SECONDS", 25))
+    header = request.headers.get("X-Request-Timeout")
+    if header:
+        try:
+            client_budget = float(header)
+            if client_budget > 0:
+                budget = min(budget, client_budget)
+        except ValueError:
+            pass
+
+    reserve = float(current_app.config.get("CHAT_DEADLINE_RESERVE_SECONDS", 0.5))
+    g.deadline = Deadline(budget - reserve)
+    return g.deadline
+
+
+def current_deadline() -> Deadline | None:
+    if not has_app_context():
+        return None
+    return g.get("deadline")
+
+
+@contextmanager
+def deadline_scope(deadline: Deadline | None):
+    """
+    Run the block under `deadline` instead of the request's own, e.g. for
+    a provider call made on behalf of several requests. None means no
+    deadline.
+    """
+    previous = g.pop("deadline", None)
+    if deadline is not None:
+        g.deadline = deadline
+    try:
+        yield deadline
+    finally:
+        g.pop("deadline", None)
+        if previous is not None:
+            g.deadline = previous
+
+
+def check_budget(operation: str, min_seconds: float) -> None:
+    """Raise DeadlineExceeded if less than min_seconds remain for this request."""
+    deadline = current_deadline()
+    if deadline is not None and deadline.remaining() < min_seconds:
+        raise DeadlineExceeded(operation, deadline.remaining())
@@ -0,0 +1,138 @@
+"""
+Multilingual emergency phrase matcher.
+
+Phrases come from a versioned lexicon file (app/data/emergency_lexicon.json,
+or EMERGENCY_LEXICON_PATH) covering English, Urdu and Roman Urdu. They are
+compiled once into an Aho-Corasick automaton, so a question is scanned in a
+single pass whose cost depends on the question length, not the lexicon size.
+
+Questions and phrases go through the same normalization:
+- NFKC + casefold
+- Arabic-script diacritics (zabar/zer/pesh, tanween, shadda, ...), tatweel
+  and zero-width / direction marks removed
+- Arabic-script letter variants folded to one Urdu form
+  (ي/ى/ے -> ی, ك -> ک, ه/ة/ھ -> ہ, أ/إ/آ -> ا, ؤ -> و)
+- every run of non-letters becomes a single space
+
+Matches must start at a word boundary and, unless the phrase ends with "*",
+end at one too: "kill" does not match "skills", "kill*" matches "killing".
+"""
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import deque
+
+DEFAULT_LEXICON_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "emergency_lexicon.json")
+
+_IGNORED = re.compile("[ؐ-ًؚ-ٰٟۖ-ۭـ‌-‏]")
+_FOLD = str.maketrans({
+    "ي": "ی",  # arabic yeh
+    "ى": "ی",  # alef maksura
+    "ے": "ی",  # yeh barree
+    "ئ": "ی",  # yeh with hamza
+    "ك": "ک",  # arabic kaf
+    "ه": "ہ",  # arabic heh
+    "ھ": "ہ",  # heh doachashmee
+    "ة": "ہ",  # teh marbuta
+    "ۀ": "ہ",  # heh with yeh
+    "أ": "ا",  # alef with hamza above
+    "إ": "ا",  # alef with hamza below
+    "آ": "ا",  # alef madda
+    "ٱ": "ا",  # alef wasla
+    "ؤ": "و",  # waw with hamza
+})
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    text = _IGNORED.sub("", text).translate(_FOLD)
+    return _NON_WORD.sub(" ", text).strip()
+
+
+class EmergencyMatcher:
+    """Aho-Corasick automaton over normalized lexicon phrases."""
+
+    _default = None
+    _default_path = None
+    _lock = threading.Lock()
+
+    def __init__(self, phrases, version=None):
+        self.version = version
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        # Per state: (length, is_prefix) of every phrase ending there.
+        self._out: list[list[tuple[int, bool]]] = [[]]
+
+        for phrase in phrases:
+            norm = normalize(phrase.rstrip("*"))
+            if norm:
+                self._add(norm, phrase.endswith("*"))
+        self._link()
+
+    def _add(self, phrase: str, prefix: bool) -> None:
+        state = 0
+        for ch in phrase:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((len(phrase), prefix))
+
+    def _link(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+                queue.append(nxt)
+
+    def _scan(self, text: str):
+        norm = normalize(text)
+        end = len(norm)
+        state = 0
+        for i, ch in enumerate(norm):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for length, prefix in self._out[state]:
+                start = i - length + 1
+                if start > 0 and norm[start - 1] != " ":
+                    continue
+                if not prefix and i + 1 < end and norm[i + 1] != " ":
+                    continue
+                yield norm[start:i + 1]
+
+    def matches(self, text: str) -> bool:
+        return next(self._scan(text), None) is not None
+
+    def find(self, text: str) -> list[str]:
+        """Every lexicon phrase in text, as normalized substrings."""
+        return list(self._scan(text))
+
+    @classmethod
+    def from_file(cls, path: str) -> "EmergencyMatcher":
+        with open(path, encoding="utf-8") as f:
+            lexicon = json.load(f)
+        phrases = [p for group in lexicon["phrases"].values() for p in group]
+        return cls(phrases, version=lexicon.get("version"))
+
+    @classmethod
+    def default(cls, path: str | None = None) -> "EmergencyMatcher":
+        """Process-wide matcher for the lexicon at path, compiled once."""
+        path = path or DEFAULT_LEXICON_PATH
+        with cls._lock:
+            if cls._default is None or cls._default_path != path:
+                cls._default = cls.from_file(path)
+                cls._default_path = path
+            return cls._default
@@ -0,0 +1,179 @@
+"""
+Prometheus metrics, served at GET /metrics.
+
+Under gunicorn every worker is a separate process, so collection uses
+prometheus_client's multiprocess mode when PROMETHEUS_MULTIPROC_DIR is set:
+each process writes its samples to mmap files in that directory and
+/metrics aggregates them. The directory must exist and be empty before
+the master starts (gunicorn.conf.py clears it and marks exited workers
+dead), and must be set before prometheus_client is first imported. Celery
+workers on the same host may share the directory; elsewhere their
+ingestion metrics stay in their own process.
+
+Exposed series:
+- legalai_http_request_duration_seconds{blueprint, endpoint, method, status}
+- legalai_chat_stage_duration_seconds{stage}         route / retrieve / generate / persist / metrics
+- legalai_provider_request_duration_seconds{provider, operation}   classify / embed / embed_batch / answer / summarize
+- legalai_provider_errors_total{provider, operation, reason}
+- legalai_cache_requests_total{cache, result}         chat_history, single_flight: hit / miss
+- legalai_db_pool_connections / legalai_db_pool_checked_out
+- legalai_ingestion_sources_total{status}, legalai_ingestion_chunks_total,
+  legalai_ingestion_duration_seconds
+- legalai_celery_queue_length{queue}, legalai_rag_eval_buffer_length
+  (read from Redis at scrape time)
+
+/metrics requires "Authorization: Bearer <METRICS_TOKEN>". Without a
+token it is only served in development (FLASK_ENV=development); elsewhere
+it answers 401 until METRICS_TOKEN is set.
+"""
+import hmac
+import os
+import time
+
+from flask import Response, current_app, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+
+from ..extensions import limiter
+from .redis_client import get_redis
+
+_LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 60)
+CELERY_QUEUES = ("celery", "chat")
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "legalai_http_request_duration_seconds", "HTTP request latency",
+    ["blueprint", "endpoint", "method", "status"], buckets=_LATENCY_BUCKETS,
+)
+CHAT_STAGE_SECONDS = Histogram(
+    "legalai_chat_stage_duration_seconds", "Chat pipeline stage latency",
+    ["stage"], buckets=_LATENCY_BUCKETS,
+)
+PROVIDER_REQUEST_SECONDS = Histogram(
+    "legalai_provider_request_duration_seconds", "LLM / embedding provider call latency",
+    ["provider", "operation"], buckets=_LATENCY_BUCKETS,
+)
+PROVIDER_ERRORS = Counter(
+    "legalai_provider_errors_total", "Failed LLM / embedding provider calls",
+    ["provider", "operation", "reason"],
+)
+CACHE_REQUESTS = Counter(
+    "legalai_cache_requests_total", "Cache lookups by result",
+    ["cache", "result"],
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "legalai_db_pool_connections", "Open DB connections held by pools",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "legalai_db_pool_checked_out", "DB connections currently checked out of pools",
+    multiprocess_mode="livesum",
+)
+INGESTION_SOURCES = Counter(
+    "legalai_ingestion_sources_total", "Knowledge sources processed by ingestion, by final status",
+    ["status"],
+)
+INGESTION_CHUNKS = Counter(
+    "legalai_ingestion_chunks_total", "Knowledge chunks embedded and stored",
+)
+INGESTION_SECONDS = Histogram(
+    "legalai_ingestion_duration_seconds", "Wall time to ingest one knowledge source",
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800),
+)
+
+_pool_listening = False
+
+
+def count_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def count_provider_error(provider: str, operation: str, reason: str | int) -> None:
+    """reason: a failure kind ("timeout", "connection", "circuit_open") or an HTTP status."""
+    if isinstance(reason, int):
+        reason = "http_429" if reason == 429 else "http_5xx" if reason >= 500 else "http_4xx"
+    PROVIDER_ERRORS.labels(provider, operation, reason).inc()
+
+
+class _RedisBacklogCollector:
+    """Queue depths read from Redis on each scrape."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def collect(self):
+        queues = GaugeMetricFamily("legalai_celery_queue_length", "Messages waiting in a Celery queue", labels=["queue"])
+        buffer = GaugeMetricFamily("legalai_rag_eval_buffer_length", "Evaluation records waiting in the Redis stream")
+        r = get_redis()
+        if r is not None:
+            try:
+                for name in CELERY_QUEUES:
+                    queues.add_metric([name], r.llen(name))
+                buffer.add_metric([], r.xlen(self.app.config.get("RAG_EVAL_BUFFER_STREAM", "rag:eval:buffer")))
+            except Exception as e:
+                self.app.logger.warning("Metrics backlog read failed: %s", str(e))
+        yield queues
+        yield buffer
+
+
+def _listen_to_pools() -> None:
+    global _pool_listening
+    if _pool_listening:
+        return
+    event.listen(Pool, "connect", lambda *a: DB_POOL_CONNECTIONS.inc())
+    event.listen(Pool, "close", lambda *a: DB_POOL_CONNECTIONS.dec())
+    event.listen(Pool, "close_detached", lambda *a: DB_POOL_CONNECTIONS.dec())
+    event.listen(Pool, "checkout", lambda *a: DB_POOL_CHECKED_OUT.inc())
+    event.listen(Pool, "checkin", lambda *a: DB_POOL_CHECKED_OUT.dec())
+    _pool_listening = True
+
+
+def _authorized() -> bool:
+    token = current_app.config.get("METRICS_TOKEN")
+    if not token:
+        return bool(current_app.config.get("DEBUG"))
+    supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    return hmac.compare_digest(supplied, token)
+
+
+def init_metrics(app) -> None:
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+    if not app.config.get("METRICS_TOKEN") and not app.config.get("DEBUG"):
+        app.logger.warning("METRICS_TOKEN is not set; /metrics will refuse every scrape")
+    _listen_to_pools()
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_t0 = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        t0 = g.pop("metrics_t0", None)
+        if t0 is not None and request.endpoint != "metrics":
+            HTTP_REQUEST_SECONDS.labels(
+                request.blueprint or "app",
+                request.url_rule.endpoint if request.url_rule else "unmatched",
+                request.method,
+                str(response.status_code),
+            ).observe(time.perf_counter() - t0)
+        return response
+
+    backlog = CollectorRegistry(auto_describe=False)
+    backlog.register(_RedisBacklogCollector(app))
+
+    @app.get("/metrics", endpoint="metrics")
+    def metrics():
+        if not _authorized():
+            return Response("Unauthorized\n", status=401, mimetype="text/plain")
+        if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return Response(generate_latest(registry) + generate_latest(backlog), content_type=CONTENT_TYPE_LATEST)
+
+    limiter.exempt(metrics)
@@ -1,3 +1,5 @@
+import base64
+from datetime import datetime
 from math import ceil
 from flask import request
 from sqlalchemy.orm.query import Query
@@ -55,3 +57,23 @@ def paginate(query: Query, serializer_fn=lambda x: x):
             "hasPrev": page > 1
         }
     }
+
+
+def encode_cursor(ts: datetime, row_id: int) -> str:
+    """
+    Opaque keyset cursor for (timestamp, id) ordered listings.
+    """
+    raw = f"{ts.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Inverse of encode_cursor. Raises ValueError on malformed cursors.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, row_id = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8").split("|", 1)
+        return datetime.fromisoformat(ts), int(row_id)
+    except (UnicodeError, ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
@@ -0,0 +1,137 @@
+"""
+Per-request SQL profiler.
+
+Counts the statements executed on any engine while a request is handled,
+with their DB time, and per request:
+- adds a Server-Timing entry (db;dur=<ms>;desc="<n> queries") so browser
+  dev tools and proxies can show DB time (SQL_PROFILER_ENABLED, which
+  defaults to on only in development since the header is sent to clients)
+- adds X-DB-Query-Count when DB_QUERY_COUNT_HEADER is on; the load-test
+  suite (benchmarks/load_test.py) reads it
+- logs a warning when the request runs more than SQL_QUERY_BUDGET
+  statements or spends more than SQL_TIME_BUDGET_MS in the DB
+- logs a possible N+1 when one statement text runs SQL_N_PLUS_ONE_THRESHOLD
+  or more times: per-row lookups reuse the same parametrized SQL
+
+capture_profiles() collects the profiles of requests finished inside it;
+the query_budget test fixture uses it to enforce per-endpoint budgets.
+"""
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+HEADER = "X-DB-Query-Count"
+_listening = False
+_captures: list[list] = []
+_captures_lock = threading.Lock()
+
+
+class RequestProfile:
+    __slots__ = ("endpoint", "count", "seconds", "statements")
+
+    def __init__(self):
+        self.endpoint = None
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Counter = Counter()
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Statements executed at least threshold times, most frequent first."""
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+    def summary(self) -> str:
+        return "\n".join(f"{n:>4} x {' '.join(sql.split())[:200]}" for sql, n in self.statements.most_common())
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and "sql_profile" in g:
+        context._profile_t0 = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    t0 = getattr(context, "_profile_t0", None)
+    if t0 is None or not has_request_context():
+        return
+    profile = g.get("sql_profile")
+    if profile is not None:
+        profile.count += 1
+        profile.seconds += time.perf_counter() - t0
+        profile.statements[statement] += 1
+
+
+def current_profile() -> RequestProfile | None:
+    return g.get("sql_profile") if has_request_context() else None
+
+
+def query_count() -> int | None:
+    """Statements executed so far in this request, or None when not profiling."""
+    profile = current_profile()
+    return profile.count if profile is not None else None
+
+
+@contextmanager
+def capture_profiles():
+    """Yield a list that receives the RequestProfile of every request finished inside the block."""
+    profiles = []
+    with _captures_lock:
+        _captures.append(profiles)
+    try:
+        yield profiles
+    finally:
+        with _captures_lock:
+            _captures.remove(profiles)
+
+
+def _report(profile: RequestProfile, response) -> None:
+    config = current_app.config
+    db_ms = profile.seconds * 1000
+
+    if config.get("SQL_PROFILER_ENABLED"):
+        timing = f'db;dur={db_ms:.1f};desc="{profile.count} queries"'
+        existing = response.headers.get("Server-Timing")
+        response.headers["Server-Timing"] = f"{existing}, {timing}" if existing else timing
+    if config.get("DB_QUERY_COUNT_HEADER"):
+        response.headers[HEADER] = str(profile.count)
+
+    query_budget = int(config.get("SQL_QUERY_BUDGET", 30))
+    time_budget_ms = float(config.get("SQL_TIME_BUDGET_MS", 200))
+    if profile.count > query_budget or db_ms > time_budget_ms:
+        current_app.logger.warning(
+            "SQL budget exceeded endpoint=%s queries=%s/%s db_ms=%.1f/%.0f",
+            profile.endpoint, profile.count, query_budget, db_ms, time_budget_ms,
+        )
+    for statement, n in profile.repeated(int(config.get("SQL_N_PLUS_ONE_THRESHOLD", 5))):
+        current_app.logger.warning(
+            "Possible N+1 endpoint=%s repeated=%s statement=%s",
+            profile.endpoint, n, " ".join(statement.split())[:300],
+        )
+
+
+def init_query_counter(app) -> None:
+    global _listening
+    if not _listening:
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        _listening = True
+
+    @app.before_request
+    def _start_profile():
+        if app.config.get("SQL_PROFILER_ENABLED") or app.config.get("DB_QUERY_COUNT_HEADER") or _captures:
+            g.sql_profile = RequestProfile()
+
+    @app.after_request
+    def _finish_profile(response):
+        profile = current_profile()
+        if profile is None:
+            return response
+        profile.endpoint = request.endpoint or request.path
+        _report(profile, response)
+        with _captures_lock:
+            for profiles in _captures:
+                profiles.append(profile)
+        return response
@@ -0,0 +1,28 @@
+"""
+Shared Redis client for app-level caches and cross-worker coordination.
+
+get_redis() returns None when REDIS_URL is not configured, so callers can
+fall back to their single-process behaviour. Connection pools are per
+process (redis-py resets them after fork).
+"""
+import redis
+from flask import current_app
+
+_clients: dict[str, redis.Redis] = {}
+
+
+def get_redis() -> redis.Redis | None:
+    url = current_app.config.get("REDIS_URL")
+    if not url:
+        return None
+
+    client = _clients.get(url)
+    if client is None:
+        client = redis.Redis.from_url(
+            url,
+            socket_timeout=float(current_app.config.get("REDIS_SOCKET_TIMEOUT", 5)),
+            socket_connect_timeout=float(current_app.config.get("REDIS_CONNECT_TIMEOUT", 2)),
+            health_check_interval=30,
+        )
+        _clients[url] = client
+    return client
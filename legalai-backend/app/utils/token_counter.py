@@ -15,6 +15,19 @@ class TokenCounter:
     
     _encoders = {}  
     
+    @staticmethod
+    def _encoder(model: str):
+        if model not in TokenCounter._encoders:
+            try:
+                TokenCounter._encoders[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                current_app.logger.warning(
+                    "Model %s not found in tiktoken, using cl100k_base encoding", 
+                    model
+                )
+                TokenCounter._encoders[model] = tiktoken.get_encoding("cl100k_base")
+        return TokenCounter._encoders[model]
+    
     @staticmethod
     def count_tokens(text: str, model: str = "gpt-4") -> int:
         """
@@ -31,18 +44,7 @@ class TokenCounter:
             return 0
             
         try:
-            if model not in TokenCounter._encoders:
-                try:
-                    TokenCounter._encoders[model] = tiktoken.encoding_for_model(model)
-                except KeyError:
-                    current_app.logger.warning(
-                        "Model %s not found in tiktoken, using cl100k_base encoding", 
-                        model
-                    )
-                    TokenCounter._encoders[model] = tiktoken.get_encoding("cl100k_base")
-            
-            encoder = TokenCounter._encoders[model]
-            return len(encoder.encode(text))
+            return len(TokenCounter._encoder(model).encode(text))
             
         except Exception as e:
             current_app.logger.warning(
@@ -71,15 +73,21 @@ class TokenCounter:
             tokens_per_message = 3  
             tokens_per_name = 1
             
+            values = []
             total = 0
             for msg in messages:
                 total += tokens_per_message
                 for key, value in msg.items():
                     if value:
-                        total += TokenCounter.count_tokens(str(value), model)
+                        values.append(str(value))
                     if key == "name":
                         total += tokens_per_name
             
+            # One batched encode (tiktoken releases the GIL across threads)
+            # instead of one encode call per message field.
+            if values:
+                total += sum(len(t) for t in TokenCounter._encoder(model).encode_batch(values))
+            
             total += 3 
             return total
             
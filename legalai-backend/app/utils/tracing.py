@@ -0,0 +1,135 @@
+"""
+OpenTelemetry tracing across web requests and Celery tasks.
+
+Enabled with TRACING_ENABLED=true. Each process (gunicorn worker, Celery
+worker) then records:
+- one server span per Flask request (health and /metrics excluded)
+- one span per chat pipeline stage and per provider call (llm.<operation>)
+- one span per SQL statement (db.<verb>)
+- outgoing requests client spans
+- Celery publish and run spans; the trace context travels in the task
+  message headers, so log_rag_evaluation_async or ingest_source show up
+  under the request that queued them
+
+TRACING_EXPORTER selects where spans go:
+  otlp     OTLP/HTTP collector (OTEL_EXPORTER_OTLP_ENDPOINT, default localhost:4318)
+  file     JSON lines appended to TRACING_FILE_PATH
+  console  stdout
+  memory   kept in memory_exporter() (tests)
+
+start_span() is safe to call whether or not tracing is enabled: without a
+configured provider the OpenTelemetry API hands out no-op spans.
+"""
+import threading
+from contextlib import contextmanager
+
+from opentelemetry import trace
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_TRACER_NAME = "legalai"
+_lock = threading.Lock()
+_process_ready = False
+_memory_exporter = None
+
+
+def tracer():
+    return trace.get_tracer(_TRACER_NAME)
+
+
+@contextmanager
+def start_span(name: str, attributes: dict | None = None):
+    with tracer().start_as_current_span(name, attributes=attributes or {}) as span:
+        yield span
+
+
+def memory_exporter():
+    return _memory_exporter
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not trace.get_current_span().get_span_context().is_valid:
+        # Outside any request or task (startup, CLI): no orphan root spans.
+        return
+    verb = (statement.lstrip().split(None, 1) or ["SQL"])[0].upper()
+    span = tracer().start_span(f"db.{verb.lower()}", attributes={
+        "db.system": conn.engine.dialect.name,
+        "db.statement": statement[:2000],
+        "db.executemany": bool(executemany),
+    })
+    context._otel_span = span
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    span = getattr(context, "_otel_span", None)
+    if span is not None:
+        span.set_attribute("db.rowcount", cursor.rowcount)
+        span.end()
+        context._otel_span = None
+
+
+def _handle_error(exception_context):
+    context = exception_context.execution_context
+    span = getattr(context, "_otel_span", None) if context is not None else None
+    if span is not None:
+        span.record_exception(exception_context.original_exception)
+        span.set_status(trace.Status(trace.StatusCode.ERROR))
+        span.end()
+        context._otel_span = None
+
+
+def _exporter(app):
+    kind = (app.config.get("TRACING_EXPORTER") or "otlp").lower()
+    if kind == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter(), True
+    if kind == "file":
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+        out = open(app.config.get("TRACING_FILE_PATH") or "logs/traces.jsonl", "a", encoding="utf-8")
+        return ConsoleSpanExporter(out=out, formatter=lambda span: span.to_json(indent=None) + "\n"), True
+    if kind == "console":
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+        return ConsoleSpanExporter(), True
+    if kind == "memory":
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+        global _memory_exporter
+        _memory_exporter = InMemorySpanExporter()
+        return _memory_exporter, False
+    raise RuntimeError(f"Unsupported TRACING_EXPORTER: {kind}")
+
+
+def _init_process(app) -> None:
+    """Tracer provider and process-wide instrumentation, once per process."""
+    global _process_ready
+    from opentelemetry.instrumentation.celery import CeleryInstrumentor
+    from opentelemetry.instrumentation.requests import RequestsInstrumentor
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, SimpleSpanProcessor
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+    exporter, batched = _exporter(app)
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": app.config.get("TRACING_SERVICE_NAME") or "legalai-backend"}),
+        sampler=ParentBased(TraceIdRatioBased(float(app.config.get("TRACING_SAMPLE_RATIO", 1.0)))),
+    )
+    provider.add_span_processor(BatchSpanProcessor(exporter) if batched else SimpleSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+    RequestsInstrumentor().instrument()
+    CeleryInstrumentor().instrument()
+    _process_ready = True
+
+
+def init_tracing(app) -> None:
+    if not app.config.get("TRACING_ENABLED"):
+        return
+    with _lock:
+        if not _process_ready:
+            _init_process(app)
+
+    from opentelemetry.instrumentation.flask import FlaskInstrumentor
+    FlaskInstrumentor().instrument_app(app, excluded_urls="api/v1/health,metrics")
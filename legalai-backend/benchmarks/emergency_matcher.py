@@ -0,0 +1,106 @@
+"""
+Emergency detection cost vs lexicon size: EmergencyMatcher vs a naive scan.
+
+Builds synthetic lexicons of increasing size (the shipped phrases plus
+generated filler phrases) and times detection over a fixed set of chat
+questions, most of them non-emergency as in production traffic:
+  - naive:   the previous approach, any(phrase in question) per phrase
+  - matcher: the compiled Aho-Corasick automaton, one pass per question
+
+The naive scan grows linearly with the lexicon; the matcher stays flat.
+
+Usage:
+    python benchmarks/emergency_matcher.py --sizes 20,200,2000,5000 --rounds 200
+"""
+import argparse
+import json
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.utils.emergency_matcher import DEFAULT_LEXICON_PATH, EmergencyMatcher, normalize  # noqa: E402
+
+QUESTIONS = [
+    "My employer has not paid my salary for three months, what can I do?",
+    "How do I file for khula in Punjab and how long does it take?",
+    "Mera shohar mujhe kharcha nahi deta, kya main court ja sakti hoon?",
+    "کام کی جگہ پر ہراسانی کی شکایت کہاں درج کروں؟",
+    "Someone is sharing my pictures online without permission.",
+    "What documents are needed to register a nikah?",
+    "He will kill me tonight, please help",
+    "وہ کہتا ہے کہ مجھے جان سے مار دے گا",
+]
+
+
+def _shipped_phrases() -> list[str]:
+    with open(DEFAULT_LEXICON_PATH, encoding="utf-8") as f:
+        return [p for group in json.load(f)["phrases"].values() for p in group]
+
+
+def _lexicon(size: int, rng: random.Random) -> list[str]:
+    phrases = _shipped_phrases()
+    while len(phrases) < size:
+        words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))) for _ in range(rng.randint(1, 3))]
+        phrases.append(" ".join(words))
+    return phrases
+
+
+def run_naive(phrases: list[str], rounds: int) -> float:
+    hints = [p.rstrip("*").lower() for p in phrases]
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for q in QUESTIONS:
+            ql = q.lower()
+            any(h in ql for h in hints)
+    return time.perf_counter() - t0
+
+
+def run_matcher(matcher: EmergencyMatcher, rounds: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for q in QUESTIONS:
+            matcher.matches(q)
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="20,200,2000,5000")
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    calls = args.rounds * len(QUESTIONS)
+    results = []
+    for size in [int(s) for s in args.sizes.split(",")]:
+        phrases = _lexicon(size, rng)
+
+        t0 = time.perf_counter()
+        matcher = EmergencyMatcher(phrases)
+        build_s = time.perf_counter() - t0
+
+        naive_s = run_naive(phrases, args.rounds)
+        matcher_s = run_matcher(matcher, args.rounds)
+        results.append({
+            "phrases": len(phrases),
+            "buildMs": round(build_s * 1000, 1),
+            "naiveUsPerQuestion": round(naive_s / calls * 1e6, 1),
+            "matcherUsPerQuestion": round(matcher_s / calls * 1e6, 1),
+        })
+
+    report = {
+        "questions": len(QUESTIONS),
+        "avgQuestionChars": round(sum(len(normalize(q)) for q in QUESTIONS) / len(QUESTIONS)),
+        "rounds": args.rounds,
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+"""
+HTTP load test for the API with stubbed LLM providers.
+
+Two steps, both against the database in DATABASE_URL (Postgres + pgvector,
+migrated with `flask db upgrade`):
+
+  seed   idempotently inserts load-test users (+ one admin), knowledge
+         sources/chunks embedded with the local stub provider, and rights /
+         templates / pathways for the content listings
+  run    drives an open-loop request mix at a target RPS and reports
+         throughput, latency percentiles, error rates and per-endpoint DB
+         query counts (from the X-DB-Query-Count header)
+
+With --start, `run` launches gunicorn itself with the stub providers
+(EMBEDDING_PROVIDER=local, CHAT_PROVIDER=local), rate limiting off and the
+query count header on; --workers / --threads / --worker-class size it
+(gevent serves many in-flight chats per worker). Otherwise point
+--base-url at a server started with the same settings.
+
+Requests are scheduled at fixed intervals whether or not earlier ones have
+finished, and latency is measured from the scheduled start, so a saturated
+server shows up as growing latency rather than as a lower request rate.
+
+Usage:
+    python benchmarks/load_test.py seed --users 50
+    python benchmarks/load_test.py run --start --workers 4 --threads 8 \\
+        --rps 40 --duration 60 --mix login=1,ask=3,conversations=3,rights=2,templates=1,pathways=1,admin_metrics=0.5
+
+Mix names: login, ask, conversations, rights, templates, pathways,
+admin_metrics.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import requests  # noqa: E402
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+STUB_ENV = {
+    "EMBEDDING_PROVIDER": "local",
+    "CHAT_PROVIDER": "local",
+    "RATELIMIT_ENABLED": "False",
+    "DB_QUERY_COUNT_HEADER": "True",
+}
+QUERY_COUNT_HEADER = "X-DB-Query-Count"
+DEFAULT_MIX = "login=1,ask=3,conversations=3,rights=2,templates=1,pathways=1,admin_metrics=0.5"
+QUESTIONS = [
+    "My boss keeps calling me late at night. What can I do legally?",
+    "How do I file for khula?",
+    "My husband stopped giving me money for food and medicine. Can court order maintenance?",
+    "Can I get a protection order if my in-laws threaten me?",
+    "Is nikah registration compulsory?",
+    "Who gets custody of young children after divorce?",
+    "My coworker shares inappropriate memes in the office group chat. Can I complain?",
+    "What documents do I need to file a harassment complaint?",
+]
+ADMIN_EMAIL = "loadtest-admin@example.com"
+
+
+def _user_email(i: int) -> str:
+    return f"loadtest{i}@example.com"
+
+
+# --- seed -------------------------------------------------------------------
+
+def seed(args) -> None:
+    os.environ.update({k: v for k, v in STUB_ENV.items() if k.endswith("_PROVIDER")})
+    from app import create_app
+    from app.extensions import db
+    from app.models.content import Pathway, Right, Template
+    from app.models.rag import KnowledgeChunk, KnowledgeSource
+    from app.models.user import User
+    from app.services.local_llm_provider import LocalLLMProvider
+    from app.utils.security import hash_password
+
+    app = create_app()
+    rng = random.Random(args.seed)
+    words = " ".join(QUESTIONS).lower().replace("?", "").replace(".", "").split()
+
+    def filler(n: int) -> str:
+        return " ".join(rng.choice(words) for _ in range(n))
+
+    with app.app_context():
+        password_hash = hash_password(args.password)
+        existing = {e for (e,) in db.session.query(User.email).filter(User.email.like("loadtest%@example.com"))}
+        for i, email in [(i, _user_email(i)) for i in range(args.users)] + [(-1, ADMIN_EMAIL)]:
+            if email in existing:
+                continue
+            db.session.add(User(
+                name=f"Load Test {i}", email=email, phone="03000000000",
+                cnic=f"90000-{i + 1000000:07d}-1",
+                province="Punjab", password_hash=password_hash,
+                is_admin=i < 0, is_email_verified=True,
+            ))
+
+        model = app.config["EMBEDDING_MODEL"]
+        dim = app.config["EMBEDDING_DIMENSION"]
+        have_sources = db.session.query(KnowledgeSource).filter(KnowledgeSource.title.like("Load test source %")).count()
+        for s in range(have_sources, args.sources):
+            source = KnowledgeSource(
+                title=f"Load test source {s}", source_type="text", language="en",
+                embedding_model=model, embedding_dimension=dim, status="done",
+            )
+            db.session.add(source)
+            db.session.flush()
+            for _ in range(args.chunks_per_source):
+                chunk_text = filler(120)
+                db.session.add(KnowledgeChunk(
+                    source_id=source.id, chunk_text=chunk_text,
+                    embedding=LocalLLMProvider.embedding(model, chunk_text, dim),
+                    embedding_model=model, embedding_dimension=dim,
+                ))
+
+        for model_cls, make in (
+            (Right, lambda n: Right(topic=f"Load test right {n}", body=filler(200), category="general", language="en")),
+            (Template, lambda n: Template(title=f"Load test template {n}", body=filler(200), category="general", language="en")),
+            (Pathway, lambda n: Pathway(title=f"Load test pathway {n}", summary=filler(30),
+                                        steps=[{"title": f"Step {k}", "body": filler(30)} for k in range(5)],
+                                        category="general", language="en")),
+        ):
+            title_col = model_cls.topic if model_cls is Right else model_cls.title
+            have = db.session.query(model_cls).filter(title_col.like("Load test %")).count()
+            db.session.add_all(make(n) for n in range(have, args.content))
+
+        db.session.commit()
+    print(json.dumps({"users": args.users, "sources": args.sources,
+                      "chunksPerSource": args.chunks_per_source, "content": args.content}))
+
+
+# --- run --------------------------------------------------------------------
+
+class Client:
+    def __init__(self, base_url: str, password: str, n_users: int):
+        self.base_url = base_url.rstrip("/")
+        self.password = password
+        self.n_users = n_users
+        self.tokens: list[str] = []
+        self.admin_token = None
+        self.conversations: dict[int, int] = {}
+        self._local = threading.local()
+
+    def session(self) -> requests.Session:
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def login(self, email: str) -> requests.Response:
+        return self.session().post(f"{self.base_url}/api/v1/auth/login",
+                                   json={"email": email, "password": self.password}, timeout=30)
+
+    def prepare(self) -> None:
+        for i in range(self.n_users):
+            r = self.login(_user_email(i))
+            r.raise_for_status()
+            self.tokens.append(r.json()["accessToken"])
+        r = self.login(ADMIN_EMAIL)
+        r.raise_for_status()
+        self.admin_token = r.json()["accessToken"]
+
+    def _get(self, path: str, token: str) -> requests.Response:
+        return self.session().get(f"{self.base_url}{path}", headers={"Authorization": f"Bearer {token}"}, timeout=60)
+
+    def call(self, name: str, rng: random.Random) -> requests.Response:
+        u = rng.randrange(self.n_users)
+        token = self.tokens[u]
+        if name == "login":
+            return self.login(_user_email(u))
+        if name == "ask":
+            body = {"question": rng.choice(QUESTIONS)}
+            # Three in four asks continue the user's latest conversation.
+            if u in self.conversations and rng.random() < 0.75:
+                body["conversationId"] = self.conversations[u]
+            r = self.session().post(f"{self.base_url}/api/v1/chat/ask", json=body,
+                                    headers={"Authorization": f"Bearer {token}"}, timeout=60)
+            if r.ok:
+                self.conversations[u] = r.json().get("conversationId")
+            return r
+        if name == "conversations":
+            return self._get("/api/v1/chat/conversations", token)
+        if name in ("rights", "templates", "pathways"):
+            return self._get(f"/api/v1/{name}", token)
+        if name == "admin_metrics":
+            return self._get("/api/v1/admin/rag/metrics/summary", self.admin_token)
+        raise ValueError(f"Unknown endpoint {name!r}")
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(samples: list[dict], seconds: float) -> dict:
+    latencies = [s["ms"] for s in samples]
+    errors = sum(1 for s in samples if s["error"])
+    queries = [s["queries"] for s in samples if s["queries"] is not None]
+    return {
+        "requests": len(samples),
+        "rps": round(len(samples) / seconds, 1) if seconds else 0.0,
+        "errorRate": round(errors / len(samples), 4) if samples else 0.0,
+        "p50Ms": round(percentile(latencies, 50), 1),
+        "p95Ms": round(percentile(latencies, 95), 1),
+        "p99Ms": round(percentile(latencies, 99), 1),
+        "maxMs": round(max(latencies, default=0.0), 1),
+        "dbQueriesAvg": round(sum(queries) / len(queries), 1) if queries else None,
+        "dbQueriesMax": max(queries, default=None),
+    }
+
+
+def drive(client: Client, mix: dict[str, float], rps: float, duration: float, concurrency: int, seed: int) -> tuple[list, float]:
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    samples, lock = [], threading.Lock()
+
+    def one(name: str, scheduled: float, call_seed: int):
+        error, queries = False, None
+        try:
+            r = client.call(name, random.Random(call_seed))
+            error = r.status_code >= 400
+            if QUERY_COUNT_HEADER in r.headers:
+                queries = int(r.headers[QUERY_COUNT_HEADER])
+        except requests.RequestException:
+            error = True
+        with lock:
+            samples.append({"endpoint": name, "ms": (time.perf_counter() - scheduled) * 1000,
+                            "error": error, "queries": queries})
+
+    total = int(rps * duration)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for k in range(total):
+            scheduled = start + k / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(one, rng.choices(names, weights)[0], scheduled, rng.getrandbits(32))
+    return samples, time.perf_counter() - start
+
+
+def server_worker_class(args) -> str:
+    return getattr(args, "worker_class", None) or ("gthread" if args.threads > 1 else "sync")
+
+
+def start_server(args, extra_env: dict | None = None) -> subprocess.Popen:
+    env = dict(os.environ, **STUB_ENV, **(extra_env or {}),
+               GUNICORN_BIND=args.base_url.split("://", 1)[-1].rstrip("/"),
+               GUNICORN_WORKERS=str(args.workers), GUNICORN_THREADS=str(args.threads),
+               GUNICORN_WORKER_CLASS=server_worker_class(args))
+    proc = subprocess.Popen(["gunicorn", "-c", "gunicorn.conf.py", "run:app"], cwd=BACKEND_DIR, env=env)
+    give_up_at = time.monotonic() + 60
+    while time.monotonic() < give_up_at:
+        try:
+            if requests.get(f"{args.base_url}/api/v1/health", timeout=1).ok:
+                return proc
+        except requests.RequestException:
+            pass
+        if proc.poll() is not None:
+            raise SystemExit("gunicorn exited during startup")
+        time.sleep(0.5)
+    proc.terminate()
+    raise SystemExit("gunicorn did not become healthy within 60s")
+
+
+def to_markdown(report: dict) -> str:
+    lines = [
+        f"# Load test: {report['targetRps']} rps target for {report['durationSeconds']}s",
+        "",
+        f"- server: {report['server']}",
+        f"- achieved: {report['overall']['rps']} rps, error rate {report['overall']['errorRate']:.2%}",
+        "",
+        "| endpoint | requests | rps | errors | p50 ms | p95 ms | p99 ms | max ms | DB queries avg / max |",
+        "|---|---|---|---|---|---|---|---|---|",
+    ]
+    for name, s in list(report["endpoints"].items()) + [("overall", report["overall"])]:
+        lines.append(
+            f"| {name} | {s['requests']} | {s['rps']} | {s['errorRate']:.2%} | {s['p50Ms']} | {s['p95Ms']}"
+            f" | {s['p99Ms']} | {s['maxMs']} | {s['dbQueriesAvg']} / {s['dbQueriesMax']} |"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def run(args) -> None:
+    mix = parse_mix(args.mix)
+    proc = start_server(args) if args.start else None
+    try:
+        client = Client(args.base_url, args.password, args.users)
+        client.prepare()
+        if args.warmup:
+            drive(client, mix, args.rps, args.warmup, args.concurrency, args.seed + 1)
+        samples, seconds = drive(client, mix, args.rps, args.duration, args.concurrency, args.seed)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    report = {
+        "server": (f"gunicorn {server_worker_class(args)} workers={args.workers} threads={args.threads}"
+                   if args.start else args.base_url),
+        "targetRps": args.rps,
+        "durationSeconds": args.duration,
+        "mix": mix,
+        "overall": summarize(samples, seconds),
+        "endpoints": {name: summarize([s for s in samples if s["endpoint"] == name], seconds) for name in mix},
+    }
+    markdown = to_markdown(report)
+    if args.out:
+        with open(f"{args.out}.json", "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        with open(f"{args.out}.md", "w", encoding="utf-8") as f:
+            f.write(markdown)
+    else:
+        print(json.dumps(report, indent=2))
+        print(markdown)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_seed = sub.add_parser("seed", help="insert load-test data")
+    p_seed.add_argument("--sources", type=int, default=20)
+    p_seed.add_argument("--chunks-per-source", type=int, default=50)
+    p_seed.add_argument("--content", type=int, default=50, help="rights, templates and pathways each")
+    p_seed.set_defaults(func=seed)
+
+    p_run = sub.add_parser("run", help="drive the request mix")
+    p_run.add_argument("--base-url", default="http://127.0.0.1:8000")
+    p_run.add_argument("--start", action="store_true", help="start gunicorn with stub providers")
+    p_run.add_argument("--workers", type=int, default=4)
+    p_run.add_argument("--threads", type=int, default=8)
+    p_run.add_argument("--worker-class", choices=["sync", "gthread", "gevent"],
+                       help="default: gthread with --threads > 1, else sync")
+    p_run.add_argument("--rps", type=float, default=20)
+    p_run.add_argument("--duration", type=float, default=60)
+    p_run.add_argument("--warmup", type=float, default=5)
+    p_run.add_argument("--concurrency", type=int, default=256, help="max requests in flight")
+    p_run.add_argument("--mix", default=DEFAULT_MIX)
+    p_run.add_argument("--out", help="write <out>.json and <out>.md instead of printing")
+    p_run.set_defaults(func=run)
+
+    for p in (p_seed, p_run):
+        p.add_argument("--users", type=int, default=50)
+        p.add_argument("--password", default="LoadTest@123")
+        p.add_argument("--seed", type=int, default=7)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Offline retrieval benchmark: recall@k, MRR, threshold accept rate, latency.
+
+Runs a labelled question set through the /chat/ask retrieval path
+(LLMService.embed + RAGService.search_similar_with_scores) against the
+configured database, once per variant, and reports per variant:
+  - recall@k        share of each question's expected sources found in the top k
+  - mrr             mean reciprocal rank of the first expected source
+  - acceptRate      share of questions whose best distance is within
+                    RAGService.get_distance_threshold() (answered with sources)
+  - p50/p95/p99 ms  search latency (embedding latency is reported separately)
+
+Variants are the cartesian product of --top-k values and --setting values.
+Settings are Postgres session parameters applied with SET LOCAL around each
+search, e.g. pgvector index knobs (hnsw.ef_search, ivfflat.probes) or
+planner switches (enable_indexscan=off for an exact scan).
+
+Question set (JSONL, one object per line):
+    {"question": "...", "language": "en", "expected_sources": ["Harassment of Women at the Workplace"]}
+expected_sources entries match a knowledge source by id or by
+case-insensitive substring of its title.
+
+Embeddings:
+  - live   call the configured embedding provider for every question
+  - cache  reuse --embedding-cache, calling the provider only for misses
+           (keyed by provider, model and question)
+  - stub   EMBEDDING_PROVIDER=local, no network; only meaningful when the
+           knowledge base was ingested with the local provider
+
+Needs DATABASE_URL (and provider keys for live / cache misses), like the app.
+
+Usage:
+    python benchmarks/rag_retrieval.py --questions benchmarks/data/rag_questions.sample.jsonl \\
+        --top-k 5,10 --setting hnsw.ef_search=40,100 --out /tmp/rag-bench
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from flask import current_app  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models.rag import KnowledgeChunk, KnowledgeSource  # noqa: E402
+from app.services.llm_service import LLMService  # noqa: E402
+from app.services.rag_service import RAGService  # noqa: E402
+from app.services.rate_limiter import BATCH  # noqa: E402
+
+_SETTING_NAME = re.compile(r"^[a-z_][a-z0-9_.]*$")
+_EMBED_BATCH = 64
+
+
+def load_questions(path: str) -> list[dict]:
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if not item.get("question") or not item.get("expected_sources"):
+                raise SystemExit(f"{path}:{line_no}: question and expected_sources are required")
+            item.setdefault("language", "en")
+            questions.append(item)
+    return questions
+
+
+def _cache_key(question: str) -> str:
+    raw = "\0".join([current_app.config["EMBEDDING_PROVIDER"], current_app.config["EMBEDDING_MODEL"], question])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def embed_questions(questions: list[dict], mode: str, cache_path: str) -> tuple[list, list[float]]:
+    """Embeddings in question order plus per-question embedding latency (ms)."""
+    cache = {}
+    if mode == "cache" and os.path.exists(cache_path):
+        with open(cache_path, encoding="utf-8") as f:
+            cache = json.load(f)
+
+    embeddings = [cache.get(_cache_key(q["question"])) for q in questions]
+    missing = [i for i, e in enumerate(embeddings) if e is None]
+    latencies = []
+    for start in range(0, len(missing), _EMBED_BATCH):
+        batch = missing[start:start + _EMBED_BATCH]
+        t0 = time.perf_counter()
+        vectors = LLMService.embed([questions[i]["question"] for i in batch], lane=BATCH)
+        per_question_ms = (time.perf_counter() - t0) * 1000 / len(batch)
+        for i, vector in zip(batch, vectors):
+            embeddings[i] = list(vector)
+            cache[_cache_key(questions[i]["question"])] = embeddings[i]
+            latencies.append(per_question_ms)
+
+    if mode == "cache" and missing:
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        with open(cache_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+    return embeddings, latencies
+
+
+def parse_settings(specs: list[str]) -> list[dict]:
+    """["hnsw.ef_search=40,100", "enable_seqscan=off"] -> cartesian list of dicts."""
+    axes = []
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        name = name.strip()
+        if not _SETTING_NAME.match(name) or not values:
+            raise SystemExit(f"Invalid --setting {spec!r}; expected name=value[,value...]")
+        axes.append([(name, v.strip()) for v in values.split(",")])
+    return [dict(combo) for combo in itertools.product(*axes)]
+
+
+def _search(embedding, top_k: int, language: str, settings: dict) -> list[dict]:
+    for name, value in settings.items():
+        db.session.execute(text("SELECT set_config(:name, :value, true)"), {"name": name, "value": value})
+    try:
+        return RAGService.search_similar_with_scores(embedding, top_k=top_k, language=language)
+    finally:
+        db.session.rollback()
+
+
+def _source_of_chunk(chunk_ids: set[int]) -> dict[int, tuple[int, str]]:
+    if not chunk_ids:
+        return {}
+    rows = (
+        db.session.query(KnowledgeChunk.id, KnowledgeSource.id, KnowledgeSource.title)
+        .join(KnowledgeSource, KnowledgeChunk.source_id == KnowledgeSource.id)
+        .filter(KnowledgeChunk.id.in_(chunk_ids))
+        .all()
+    )
+    db.session.rollback()
+    return {chunk_id: (source_id, title or "") for chunk_id, source_id, title in rows}
+
+
+def _matches(expected: str, source: tuple[int, str]) -> bool:
+    expected = str(expected).strip()
+    return expected == str(source[0]) or expected.casefold() in source[1].casefold()
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def score(questions: list[dict], results: list[list[dict]], sources: dict, threshold: float, top_k: int) -> dict:
+    recall_sum = rr_sum = accepted = 0.0
+    for item, hits in zip(questions, results):
+        ranked = [sources.get(h["chunk_id"]) for h in hits[:top_k]]
+        expected = item["expected_sources"]
+        found = {e for e in expected for src in ranked if src and _matches(e, src)}
+        recall_sum += len(found) / len(expected)
+        first = next((rank for rank, src in enumerate(ranked, 1)
+                      if src and any(_matches(e, src) for e in expected)), None)
+        rr_sum += 1.0 / first if first else 0.0
+        accepted += 1 if hits and hits[0]["distance"] <= threshold else 0
+    n = len(questions) or 1
+    return {
+        "recallAtK": round(recall_sum / n, 4),
+        "mrr": round(rr_sum / n, 4),
+        "acceptRate": round(accepted / n, 4),
+    }
+
+
+def run_variant(questions, embeddings, top_k: int, settings: dict, threshold: float) -> dict:
+    results, latencies = [], []
+    for item, embedding in zip(questions, embeddings):
+        t0 = time.perf_counter()
+        results.append(_search(embedding, top_k, item["language"], settings))
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    sources = _source_of_chunk({h["chunk_id"] for hits in results for h in hits})
+    report = {"topK": top_k, "settings": settings}
+    report.update(score(questions, results, sources, threshold, top_k))
+    report.update({f"p{p}Ms": round(percentile(latencies, p), 2) for p in (50, 95, 99)})
+    return report
+
+
+def to_markdown(report: dict) -> str:
+    lines = [
+        f"# RAG retrieval benchmark ({report['questions']} questions)",
+        "",
+        f"- embeddings: {report['embeddings']['mode']} ({report['embeddings']['provider']} / {report['embeddings']['model']}),"
+        f" p50 {report['embeddings']['p50Ms']} ms per question",
+        f"- distance threshold: {report['distanceThreshold']}",
+        "",
+        "| top k | settings | recall@k | MRR | accept rate | p50 ms | p95 ms | p99 ms |",
+        "|---|---|---|---|---|---|---|---|",
+    ]
+    for v in report["variants"]:
+        settings = ", ".join(f"{k}={val}" for k, val in v["settings"].items()) or "default"
+        lines.append(
+            f"| {v['topK']} | {settings} | {v['recallAtK']:.3f} | {v['mrr']:.3f} | {v['acceptRate']:.3f}"
+            f" | {v['p50Ms']} | {v['p95Ms']} | {v['p99Ms']} |"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", required=True, help="JSONL question set")
+    parser.add_argument("--top-k", default="5", help="comma-separated k values")
+    parser.add_argument("--setting", action="append", default=[], help="name=value[,value...]; repeatable")
+    parser.add_argument("--embeddings", choices=("live", "cache", "stub"), default="cache")
+    parser.add_argument("--embedding-cache", default=os.path.join(tempfile.gettempdir(), "legalai_rag_embeddings.json"))
+    parser.add_argument("--out", help="write <out>.json and <out>.md instead of printing")
+    args = parser.parse_args()
+
+    questions = load_questions(args.questions)
+    top_ks = [int(k) for k in args.top_k.split(",")]
+    variants = parse_settings(args.setting)
+
+    app = create_app()
+    if args.embeddings == "stub":
+        app.config["EMBEDDING_PROVIDER"] = "local"
+
+    with app.app_context():
+        embeddings, embed_ms = embed_questions(questions, args.embeddings, args.embedding_cache)
+        threshold = RAGService.get_distance_threshold()
+        report = {
+            "questions": len(questions),
+            "embeddings": {
+                "mode": args.embeddings,
+                "provider": app.config["EMBEDDING_PROVIDER"],
+                "model": app.config["EMBEDDING_MODEL"],
+                "computed": len(embed_ms),
+                "p50Ms": round(percentile(embed_ms, 50), 2),
+                "p95Ms": round(percentile(embed_ms, 95), 2),
+            },
+            "distanceThreshold": round(threshold, 4),
+            "variants": [
+                run_variant(questions, embeddings, k, settings, threshold)
+                for k in top_ks
+                for settings in variants
+            ],
+        }
+
+    markdown = to_markdown(report)
+    if args.out:
+        with open(f"{args.out}.json", "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        with open(f"{args.out}.md", "w", encoding="utf-8") as f:
+            f.write(markdown)
+    else:
+        print(json.dumps(report, indent=2))
+        print(markdown)
+
+
+if __name__ == "__main__":
+    main()
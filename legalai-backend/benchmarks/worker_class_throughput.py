@@ -0,0 +1,111 @@
+"""
+Throughput comparison over HTTP: POST /chat/ask on sync vs gevent workers.
+
+A sync worker holds one process (and a gthread worker one thread) for the
+whole provider call, so in-flight chats per server are capped at
+workers x threads. A gevent worker yields on every socket wait (provider
+HTTP, Redis, and Postgres through psycogreen), so one process keeps up to
+GUNICORN_WORKER_CONNECTIONS chats waiting on providers at once.
+
+For each worker class, gunicorn is started with the stub providers from
+load_test.py (LOCAL_LLM_CHAT_LATENCY_MS / LOCAL_LLM_EMBED_LATENCY_MS of
+simulated provider latency), then --concurrency closed-loop clients post
+questions for --duration seconds. Seed the database first:
+
+    python benchmarks/load_test.py seed --users 50
+
+Usage:
+    python benchmarks/worker_class_throughput.py --workers 4 \\
+        --concurrency 256 --chat-latency-ms 500 --duration 30
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import requests  # noqa: E402
+
+from load_test import Client, start_server, summarize  # noqa: E402
+
+WORKER_CLASSES = ("sync", "gevent")
+
+
+def drive_closed_loop(client: Client, concurrency: int, duration: float, seed: int) -> tuple[list, float]:
+    """concurrency clients, each sending its next ask as soon as the previous one answers."""
+    samples, lock = [], threading.Lock()
+    start = time.perf_counter()
+    stop_at = start + duration
+
+    def loop(k: int):
+        rng = random.Random(seed + k)
+        while time.perf_counter() < stop_at:
+            t0 = time.perf_counter()
+            try:
+                error = client.call("ask", rng).status_code >= 400
+            except requests.RequestException:
+                error = True
+            with lock:
+                samples.append({"endpoint": "ask", "ms": (time.perf_counter() - t0) * 1000,
+                                "error": error, "queries": None})
+
+    threads = [threading.Thread(target=loop, args=(k,)) for k in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return samples, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--worker-connections", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=256, help="closed-loop clients")
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--chat-latency-ms", type=int, default=500)
+    parser.add_argument("--embed-latency-ms", type=int, default=100)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--password", default="LoadTest@123")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    args.threads = 1
+
+    provider_env = {
+        "LOCAL_LLM_CHAT_LATENCY_MS": str(args.chat_latency_ms),
+        "LOCAL_LLM_EMBED_LATENCY_MS": str(args.embed_latency_ms),
+        "GUNICORN_WORKER_CONNECTIONS": str(args.worker_connections),
+        "DB_QUERY_COUNT_HEADER": "False",
+    }
+    results = {}
+    for worker_class in WORKER_CLASSES:
+        args.worker_class = worker_class
+        proc = start_server(args, provider_env)
+        try:
+            client = Client(args.base_url, args.password, args.users)
+            client.prepare()
+            samples, seconds = drive_closed_loop(client, args.concurrency, args.duration, args.seed)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+        results[worker_class] = summarize(samples, seconds)
+
+    report = {
+        "workers": args.workers,
+        "workerConnections": args.worker_connections,
+        "concurrency": args.concurrency,
+        "chatLatencyMs": args.chat_latency_ms,
+        "embedLatencyMs": args.embed_latency_ms,
+        "durationSeconds": args.duration,
+        "workerClasses": results,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Gunicorn settings, overridable via environment.
+
+Defaults match the previous command line (4 sync workers). A sync worker
+holds its process for the whole provider call, so it serves one chat at a
+time (GUNICORN_THREADS with gthread).
+
+GUNICORN_WORKER_CLASS=gevent serves many in-flight chats per process with
+the same sync code: gunicorn monkey-patches sockets, post_fork makes
+psycopg2 cooperative through psycogreen, and each worker accepts up to
+GUNICORN_WORKER_CONNECTIONS requests. The chat pipeline closes its DB
+session before each provider call, so waiting chats do not pin pooled
+connections, but size the DB pool and provider rate limits for the extra
+concurrency. benchmarks/worker_class_throughput.py compares sync and gevent
+workers on /chat/ask over HTTP.
+
+With PROMETHEUS_MULTIPROC_DIR set, /metrics aggregates all workers: the
+directory is emptied when the master starts and exited workers are marked
+dead so their live gauges drop out.
+"""
+import glob
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", "4"))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "sync")
+threads = int(os.getenv("GUNICORN_THREADS", "1"))
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+
+def on_starting(server):
+    metrics_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if metrics_dir:
+        os.makedirs(metrics_dir, exist_ok=True)
+        for path in glob.glob(os.path.join(metrics_dir, "*.db")):
+            os.remove(path)
+
+
+def post_fork(server, worker):
+    if worker_class == "gevent":
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
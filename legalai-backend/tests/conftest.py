@@ -1,25 +1,29 @@
 import pytest
 import os
 import tempfile
+from contextlib import contextmanager
+
+# Config reads the environment when app.config is first imported, so the
+# test settings must be in place before importing the app.
+DB_FD, DB_PATH = tempfile.mkstemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ["TESTING"] = "1"
+os.environ["SECRET_KEY"] = "test-secret-key"
+os.environ["JWT_ACCESS_MIN"] = "60"
+os.environ["JWT_REFRESH_DAYS"] = "7"
+os.environ["RATELIMIT_ENABLED"] = "False"
+
 from app import create_app
 from app.extensions import db
 from app.models.user import User
+from app.utils.query_counter import capture_profiles
 from app.utils.security import hash_password
 
 @pytest.fixture(scope="session")
 def app():
     """Create application for testing"""
-    db_fd, db_path = tempfile.mkstemp()
-    
-    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
-    os.environ["TESTING"] = "1"
-    os.environ["SECRET_KEY"] = "test-secret-key"
-    os.environ["JWT_ACCESS_MIN"] = "60"
-    os.environ["JWT_REFRESH_DAYS"] = "7"
-    
     app = create_app()
     app.config["TESTING"] = True
-    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{db_path}"
     
     with app.app_context():
         db.create_all()
@@ -27,8 +31,8 @@ def app():
         db.session.remove()
         db.drop_all()
     
-    os.close(db_fd)
-    os.unlink(db_path)
+    os.close(DB_FD)
+    os.unlink(DB_PATH)
 
 @pytest.fixture
 def client(app):
@@ -40,6 +44,15 @@ def runner(app):
     """CLI runner"""
     return app.test_cli_runner()
 
+@pytest.fixture(autouse=True)
+def _empty_tables(app):
+    """The database lives for the session; rows committed by a test are removed after it"""
+    yield
+    db.session.rollback()
+    for table in reversed(db.metadata.sorted_tables):
+        db.session.execute(table.delete())
+    db.session.commit()
+
 @pytest.fixture
 def db_session(app):
     """Database session for tests"""
@@ -55,6 +68,7 @@ def user(app, db_session):
         email="test@example.com",
         phone="03001234567",
         cnic="12345-1234567-1",
+        province="Punjab",
         password_hash=hash_password("TestPass@123"),
         is_email_verified=True,
     )
@@ -70,6 +84,7 @@ def admin_user(app, db_session):
         email="admin@example.com",
         phone="03009999999",
         cnic="99999-9999999-9",
+        province="Punjab",
         password_hash=hash_password("AdminPass@123"),
         is_admin=True,
         is_email_verified=True,
@@ -104,4 +119,27 @@ def auth_headers(auth_token):
 @pytest.fixture
 def admin_headers(admin_token):
     """Auth headers for admin"""
-    return {"Authorization": f"Bearer {admin_token}"}
\ No newline at end of file
+    return {"Authorization": f"Bearer {admin_token}"}
+
+@pytest.fixture
+def query_budget():
+    """Assert the SQL statements run by each request inside the block stay within budget.
+
+    with query_budget(3):                 # at most 3 statements per request
+    with query_budget(5, max_repeats=1):  # and no statement text run twice (N+1)
+    """
+    @contextmanager
+    def budget(max_queries, max_repeats=None):
+        with capture_profiles() as profiles:
+            yield profiles
+        assert profiles, "no request finished inside query_budget()"
+        for profile in profiles:
+            assert profile.count <= max_queries, (
+                f"{profile.endpoint} ran {profile.count} queries (budget {max_queries}):\n{profile.summary()}"
+            )
+            if max_repeats is not None:
+                worst = max(profile.statements.values(), default=0)
+                assert worst <= max_repeats, (
+                    f"{profile.endpoint} repeated a statement {worst} times (max {max_repeats}):\n{profile.summary()}"
+                )
+    return budget
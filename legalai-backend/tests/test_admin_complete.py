@@ -1,6 +1,8 @@
 import pytest
 import io
+from datetime import datetime, timedelta
 from app.models.rag import KnowledgeSource, KnowledgeChunk
+from app.models.rag_evaluation import RAGEvaluationLog, RAGMetricsHourly
 from app.models.user import User
 from app.utils.security import hash_password
 
@@ -323,6 +325,7 @@ class TestAdmin:
             email="exists@example.com",
             phone="03001110000",
             cnic="55555-5555555-5",
+            province="Punjab",
             password_hash=hash_password("TestPass@123"),
             is_email_verified=True,
         )
@@ -357,6 +360,7 @@ class TestAdmin:
             email="target@example.com",
             phone="03000000001",
             cnic="77777-7777777-7",
+            province="Punjab",
             password_hash=hash_password("TestPass@123"),
             is_email_verified=True,
             is_admin=False,
@@ -383,6 +387,7 @@ class TestAdmin:
             email="deleted_target@example.com",
             phone="03000000003",
             cnic="88888-8888888-8",
+            province="Punjab",
             password_hash=hash_password("TestPass@123"),
             is_email_verified=True,
         )
@@ -405,6 +410,7 @@ class TestAdmin:
             email="logout_target@example.com",
             phone="03000000004",
             cnic="44444-4444444-4",
+            province="Punjab",
             password_hash=hash_password("TestPass@123"),
             is_email_verified=True,
             token_version=0,
@@ -467,6 +473,7 @@ class TestAdmin:
             email="exists@example.com",
             phone="03001110000",
             cnic="55555-5555555-5",
+            province="Punjab",
             password_hash=hash_password("TestPass@123"),
             is_email_verified=True,
         )
@@ -499,6 +506,7 @@ class TestAdmin:
             email="deleted_target@example.com",
             phone="03000000003",
             cnic="88888-8888888-8",
+            province="Punjab",
             password_hash=hash_password("TestPass@123"),
             is_email_verified=True,
         )
@@ -517,6 +525,7 @@ class TestAdmin:
             email="todelete@example.com",
             phone="03000000010",
             cnic="12121-1212121-1",
+            province="Punjab",
             password_hash=hash_password("TestPass@123"),
             is_email_verified=True,
         )
@@ -537,4 +546,68 @@ class TestAdmin:
             "isAdmin": False,
         })
         assert r.status_code == 201
-        assert "id" in r.json
\ No newline at end of file
+        assert "id" in r.json
+
+    @staticmethod
+    def _rag_log(created_at, **overrides):
+        fields = dict(
+            language="en", safe_mode=False,
+            question_text="q", question_length=1, answer_text="a", answer_length=1,
+            threshold_used=0.5, best_distance=0.2, contexts_found=3, contexts_used=2,
+            in_domain=True, decision="ANSWER_WITH_SOURCES",
+            embedding_time_ms=10, llm_time_ms=100, total_time_ms=200, total_tokens=50,
+            embedding_model="m", used_fallback=False, disclaimer_added=False,
+            error_occurred=False, created_at=created_at,
+        )
+        fields.update(overrides)
+        return RAGEvaluationLog(**fields)
+
+    def test_rag_metrics_summary_single_scan(self, client, admin_headers, db_session, query_budget):
+        """Test the summary aggregates raw logs in one scan"""
+        RAGEvaluationLog.query.delete()
+        RAGMetricsHourly.query.delete()
+        now = datetime.utcnow()
+        db_session.add_all([
+            self._rag_log(now - timedelta(hours=1)),
+            self._rag_log(now - timedelta(hours=2), decision="REFUSE_OUT_OF_DOMAIN", in_domain=False,
+                          best_distance=0.9, llm_time_ms=None, total_tokens=None, total_time_ms=400),
+            self._rag_log(now - timedelta(days=10)),
+        ])
+        db_session.commit()
+
+        # Auth lookup, rollup sum, one raw scan.
+        with query_budget(3):
+            response = client.get("/api/v1/admin/rag/metrics/summary?days=7", headers=admin_headers)
+
+        assert response.status_code == 200
+        body = response.json
+        assert body["totalQueries"] == 2
+        assert body["decisions"] == {
+            "answerWithSources": 1, "answerNoSources": 0, "degraded": 0, "emergency": 0, "outOfDomain": 1,
+        }
+        assert body["quality"]["inDomainRate"] == 50.0
+        assert body["quality"]["avgDistance"] == 0.2
+        assert body["performance"]["avgTotalTimeMs"] == 300
+        assert body["performance"]["avgLlmTimeMs"] == 100
+        assert body["tokens"] == {"totalUsed": 50, "avgPerQuery": 50}
+
+    def test_rag_metrics_summary_merges_hourly_rollups(self, client, admin_headers, db_session):
+        """Test completed hours are read from rag_metrics_hourly, not rescanned"""
+        RAGEvaluationLog.query.delete()
+        RAGMetricsHourly.query.delete()
+        hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(hours=3)
+        db_session.add(RAGMetricsHourly(
+            bucket_start=hour, total_queries=10, answer_with_sources_count=10, in_domain_count=10,
+            total_time_ms_sum=1000, embedding_time_ms_sum=100, contexts_used_sum=20,
+        ))
+        # Inside the rolled-up hour: already counted by the rollup row.
+        db_session.add(self._rag_log(hour + timedelta(minutes=5)))
+        # After the rollup watermark: read from the raw logs.
+        db_session.add(self._rag_log(hour + timedelta(hours=2), total_time_ms=1200))
+        db_session.commit()
+
+        response = client.get("/api/v1/admin/rag/metrics/summary?days=1", headers=admin_headers)
+
+        assert response.status_code == 200
+        assert response.json["totalQueries"] == 11
+        assert response.json["performance"]["avgTotalTimeMs"] == 200
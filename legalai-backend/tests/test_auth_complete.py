@@ -14,6 +14,7 @@ class TestAuth:
             "email": "new@example.com",
             "phone": "03001111111",
             "cnic": "11111-1111111-1",
+            "province": "Punjab",
             "password": "NewPass@123",
             "fatherName": "Father",
             "fatherCnic": "11111-1111111-2",
@@ -45,6 +46,7 @@ class TestAuth:
             "email": "test@example.com",
             "phone": "03002222222",
             "cnic": "22222-2222222-2",
+            "province": "Punjab",
             "password": "DupPass@123"
         })
         
@@ -58,6 +60,7 @@ class TestAuth:
             "email": "weak@example.com",
             "phone": "03003333333",
             "cnic": "33333-3333333-3",
+            "province": "Punjab",
             "password": "weak"
         })
         
@@ -71,6 +74,7 @@ class TestAuth:
             "email": "cnic@example.com",
             "phone": "03004444444",
             "cnic": "44444-4444444-4",
+            "province": "Punjab",
             "password": "TestPass@123",
             "fatherCnic": "44444-4444444-4"  # Same as user CNIC
         })
@@ -104,7 +108,8 @@ class TestAuth:
             email="unverified@example.com",
             phone="03005555555",
             cnic="55555-5555555-5",
-            password_hash=hash_password("TestPass@123")
+            province="Punjab",
+            password_hash=hash_password("TestPass@123"),
             is_email_verified=False
         )
         db_session.add(u)
@@ -208,6 +213,7 @@ class TestAuth:
             email="unverified@example.com",
             phone="03001112222",
             cnic="11111-1111111-1",
+            province="Punjab",
             password_hash=hash_password("TempPass@123"),
             is_email_verified=False,
         )
@@ -113,6 +113,44 @@ class TestChat:
         
         assert response.status_code == 400
     
+    def test_chat_job_missing_question(self, client, auth_headers):
+        """Test chat job is validated before anything is queued"""
+        response = client.post("/api/v1/chat/jobs",
+            headers=auth_headers,
+            json={
+                "language": "en"
+            }
+        )
+        
+        assert response.status_code == 400
+    
+    def test_chat_job_requires_redis(self, app, client, auth_headers, monkeypatch):
+        """Test chat jobs are unavailable without Redis"""
+        monkeypatch.setitem(app.config, "REDIS_URL", None)
+        headers = {**auth_headers, "X-Safe-Mode": "1"}
+        response = client.post("/api/v1/chat/jobs",
+            headers=headers,
+            json={
+                "question": "What are my rights?",
+                "language": "en"
+            }
+        )
+        
+        assert response.status_code == 503
+    
+    def test_chat_job_without_redis_creates_no_conversation(self, app, client, auth_headers, user, monkeypatch):
+        """Test a 503 for missing Redis happens before a conversation is committed"""
+        monkeypatch.setitem(app.config, "REDIS_URL", None)
+        before = ChatConversation.query.filter_by(user_id=user.id).count()
+
+        response = client.post("/api/v1/chat/jobs",
+            headers=auth_headers,
+            json={"question": "What are my rights?"}
+        )
+
+        assert response.status_code == 503
+        assert ChatConversation.query.filter_by(user_id=user.id).count() == before
+
     def test_list_conversations(self, client, auth_headers, user, db_session):
         """Test list conversations"""
         c1 = ChatConversation(user_id=user.id, title="Chat 1")
@@ -127,6 +165,18 @@ class TestChat:
         assert "page" in response.json
         assert "limit" in response.json
     
+    def test_list_conversations_query_budget(self, client, auth_headers, user, db_session, query_budget):
+        """Test list conversations stays one query however many rows it returns"""
+        db_session.add_all([ChatConversation(user_id=user.id, title=f"Chat {i}") for i in range(15)])
+        db_session.commit()
+
+        # require_auth's user lookup plus the keyset query; no per-row lookups.
+        with query_budget(2, max_repeats=1):
+            response = client.get("/api/v1/chat/conversations?limit=10", headers=auth_headers)
+
+        assert response.status_code == 200
+        assert len(response.json["items"]) == 10
+
     def test_list_conversations_paginated(self, client, auth_headers, user, db_session):
         """Test list conversations with pagination"""
         for i in range(25):
@@ -143,6 +193,29 @@ class TestChat:
         assert response.json["limit"] == 10
         assert len(response.json["items"]) == 10
     
+    def test_list_conversations_cursor_and_snippet(self, client, auth_headers, user, db_session):
+        """Test conversation list pages by cursor and shows the denormalized last message"""
+        for i in range(5):
+            conv = ChatConversation(user_id=user.id, title=f"Chat {i}")
+            db_session.add(conv)
+            db_session.commit()
+            ChatMessage.add_turn(
+                user_id=user.id, conversation_id=conv.id,
+                question=f"q{i}", answer=f"answer {i}", commit=True,
+            )
+
+        first = client.get("/api/v1/chat/conversations?limit=3", headers=auth_headers)
+        assert first.status_code == 200
+        assert [c["title"] for c in first.json["items"]] == ["Chat 4", "Chat 3", "Chat 2"]
+        assert first.json["items"][0]["lastMessageSnippet"].startswith("answer 4")
+
+        second = client.get(
+            f"/api/v1/chat/conversations?limit=3&before={first.json['nextCursor']}",
+            headers=auth_headers,
+        )
+        assert [c["title"] for c in second.json["items"]] == ["Chat 1", "Chat 0"]
+        assert second.json["nextCursor"] is None
+
     def test_get_conversation_messages(self, client, auth_headers, user, db_session):
         """Test get messages from conversation"""
         conv = ChatConversation(user_id=user.id, title="Test Chat")
@@ -167,6 +240,45 @@ class TestChat:
         assert len(response.json["items"]) == 5
         assert response.json["conversationId"] == conv.id
     
+    def test_get_conversation_messages_before_cursor(self, client, auth_headers, user, db_session):
+        """Test keyset pagination walks back through history with nextCursor"""
+        conv = ChatConversation(user_id=user.id, title="Long Chat")
+        db_session.add(conv)
+        db_session.commit()
+
+        for i in range(6):
+            ChatMessage.add_turn(
+                user_id=user.id, conversation_id=conv.id,
+                question=f"q{i}", answer=f"a{i}", commit=True,
+            )
+
+        seen = []
+        cursor = None
+        while True:
+            url = f"/api/v1/chat/conversations/{conv.id}/messages?limit=5"
+            if cursor:
+                url += f"&before={cursor}"
+            response = client.get(url, headers=auth_headers)
+            assert response.status_code == 200
+            seen = [m["content"] for m in response.json["items"]] + seen
+            cursor = response.json["nextCursor"]
+            if not cursor:
+                break
+
+        assert seen == [f"{p}{i}" for i in range(6) for p in ("q", "a")]
+
+    def test_get_conversation_messages_invalid_cursor(self, client, auth_headers, user, db_session):
+        """Test malformed before cursor is rejected"""
+        conv = ChatConversation(user_id=user.id, title="Test Chat")
+        db_session.add(conv)
+        db_session.commit()
+
+        response = client.get(f"/api/v1/chat/conversations/{conv.id}/messages?before=not-a-cursor",
+            headers=auth_headers
+        )
+
+        assert response.status_code == 400
+
     def test_get_conversation_messages_not_owner(self, client, auth_headers, db_session):
         """Test get messages from another user's conversation"""
         other_user_id = 99999
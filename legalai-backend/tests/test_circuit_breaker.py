@@ -0,0 +1,108 @@
+import pytest
+import requests
+
+from app.services.llm_service import LLMService
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class TestCircuitBreaker:
+
+    def _breaker(self, **kwargs):
+        opts = dict(window_seconds=60, min_calls=4, error_rate=0.5, open_seconds=30)
+        opts.update(kwargs)
+        return CircuitBreaker("openai", "answer", **opts)
+
+    def test_opens_after_error_rate_exceeded(self, app):
+        """Test circuit opens once failures cross the error rate"""
+        with app.app_context():
+            b = self._breaker()
+            b.record_success(0.2)
+            b.record_success(0.2)
+            b.record_failure(1.0)
+            b.before_call()
+            b.record_failure(1.0)
+
+            assert b.state == CircuitBreaker.OPEN
+            with pytest.raises(CircuitOpenError):
+                b.before_call()
+
+    def test_half_open_probe_closes_on_success(self, app):
+        """Test a successful probe after cool-down closes the circuit"""
+        with app.app_context():
+            b = self._breaker(min_calls=1, open_seconds=0)
+            b.record_failure(1.0)
+            assert b.state == CircuitBreaker.OPEN
+
+            b.before_call()
+            assert b.state == CircuitBreaker.HALF_OPEN
+            with pytest.raises(CircuitOpenError):
+                b.before_call()
+
+            b.record_success(0.1)
+            assert b.state == CircuitBreaker.CLOSED
+
+    def test_half_open_probe_aborted_without_outcome(self, app):
+        """Test a probe released without success or failure lets the next call probe"""
+        with app.app_context():
+            b = self._breaker(min_calls=1, open_seconds=0)
+            b.record_failure(1.0)
+
+            assert b.before_call() is True
+            b.release_probe()
+
+            assert b.state == CircuitBreaker.HALF_OPEN
+            assert b.before_call() is True
+
+    def test_post_json_releases_probe_on_client_error(self, app, monkeypatch):
+        """Test a 4xx answer to the half-open probe does not wedge the circuit"""
+        class Response:
+            status_code = 400
+
+            def raise_for_status(self):
+                raise requests.HTTPError(response=self)
+
+        monkeypatch.setattr(requests, "post", lambda *a, **k: Response())
+        with app.app_context():
+            CircuitBreaker.reset_all()
+            b = CircuitBreaker.for_provider("openai", "answer")
+            b.min_calls, b.open_seconds = 1, 0
+            b.record_failure(1.0)
+
+            for _ in range(2):
+                with pytest.raises(requests.HTTPError):
+                    LLMService._post_json(
+                        provider="openai", operation="answer", url="http://provider.invalid",
+                        headers={}, payload={"model": "m"}, timeout=5,
+                    )
+
+            assert b.state == CircuitBreaker.HALF_OPEN
+            assert b.before_call() is True
+            CircuitBreaker.reset_all()
+
+    def test_embed_batches_have_their_own_breaker(self, app, monkeypatch):
+        """Test an open embed_batch circuit leaves single-query embeds running"""
+        monkeypatch.setitem(app.config, "EMBEDDING_PROVIDER", "local")
+        monkeypatch.setitem(app.config, "EMBEDDING_DIMENSION", 8)
+        monkeypatch.setitem(app.config, "LOCAL_LLM_EMBED_LATENCY_MS", 0)
+        with app.app_context():
+            CircuitBreaker.reset_all()
+            b = CircuitBreaker.for_provider("local", "embed_batch")
+            b.min_calls, b.open_seconds = 1, 60
+            b.record_failure(1.0)
+
+            with pytest.raises(CircuitOpenError) as exc:
+                LLMService.embed(["khula", "maintenance"])
+            assert exc.value.operation == "embed_batch"
+            assert len(LLMService.embed("khula")) == 8
+            CircuitBreaker.reset_all()
+
+    def test_adaptive_timeout_tracks_p99(self, app):
+        """Test timeout follows observed latency and is capped by the default"""
+        with app.app_context():
+            b = self._breaker(timeout_multiplier=2.0, min_timeout=1.0)
+            assert b.timeout(60) == 60
+
+            for _ in range(10):
+                b.record_success(2.0)
+            assert b.timeout(60) == 4.0
+            assert b.timeout(3) == 3.0
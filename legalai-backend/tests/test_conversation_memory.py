@@ -0,0 +1,122 @@
+import pytest
+
+from app.models.chat import ChatConversation, ChatMessage
+from app.services.chat_history_cache import ChatHistoryCache
+from app.services.conversation_memory_service import ConversationMemoryService
+from app.services.llm_service import LLMService
+
+
+class TestConversationMemory:
+
+    def _conversation_with_turns(self, db_session, user, turns):
+        conv = ChatConversation(user_id=user.id, title="Memory test")
+        db_session.add(conv)
+        db_session.commit()
+        for i in range(turns):
+            db_session.add(ChatMessage(user_id=user.id, conversation_id=conv.id, role="user", content=f"q{i}"))
+            db_session.add(ChatMessage(user_id=user.id, conversation_id=conv.id, role="assistant", content=f"a{i}"))
+        db_session.commit()
+        return conv
+
+    def test_refresh_folds_turns_outside_raw_window(self, app, db_session, user, monkeypatch):
+        """Test older turns are summarized and dropped from the replayed history"""
+        folded = []
+
+        def fake_summarize(*, previous_summary, messages, max_tokens=300):
+            folded.extend(m["content"] for m in messages)
+            return "User asked q0 and q1."
+
+        monkeypatch.setattr(LLMService, "summarize_conversation", staticmethod(fake_summarize))
+        monkeypatch.setitem(app.config, "CHAT_MEMORY_RAW_TURNS", 2)
+        conv = self._conversation_with_turns(db_session, user, 4)
+
+        assert ConversationMemoryService.refresh_summary(conv.id) is True
+        assert folded == ["q0", "a0", "q1", "a1"]
+
+        db_session.expire_all()
+        memory = ConversationMemoryService.load(conv.id, user.id)
+        assert memory["summary"] == "User asked q0 and q1."
+        assert [m["content"] for m in memory["messages"]] == ["q2", "a2", "q3", "a3"]
+
+    def test_load_without_summary_replays_raw_history(self, app, db_session, user):
+        """Test conversations without a summary keep the raw message window"""
+        conv = self._conversation_with_turns(db_session, user, 3)
+
+        memory = ConversationMemoryService.load(conv.id, user.id)
+        assert memory["summary"] is None
+        assert len(memory["messages"]) == 6
+
+
+class TestChatHistoryTrim:
+
+    def test_add_turn_trims_only_past_slack(self, app, db_session, user):
+        """Test history is trimmed back to max_messages once max + slack is exceeded"""
+        conv = ChatConversation(user_id=user.id, title="Trim test")
+        db_session.add(conv)
+        db_session.commit()
+
+        for i in range(7):
+            ChatMessage.add_turn(
+                user_id=user.id,
+                conversation_id=conv.id,
+                question=f"q{i}",
+                answer=f"a{i}",
+                max_messages=10,
+                trim_slack=4,
+                commit=True,
+            )
+
+        db_session.expire_all()
+        assert db_session.get(ChatConversation, conv.id).message_count == 14
+        assert ChatMessage.query.filter_by(conversation_id=conv.id).count() == 14
+
+        ChatMessage.add_turn(
+            user_id=user.id, conversation_id=conv.id, question="q7", answer="a7",
+            max_messages=10, trim_slack=4, commit=True,
+        )
+        db_session.expire_all()
+        remaining = ChatMessage.query.filter_by(conversation_id=conv.id).order_by(ChatMessage.id).all()
+        assert db_session.get(ChatConversation, conv.id).message_count == 10
+        assert [m.content for m in remaining][:2] == ["q2", "a2"]
+        assert remaining[-1].content == "a7"
+
+
+class TestChatHistoryCache:
+
+    def test_appends_only_after_commit(self, app, db_session, user, monkeypatch):
+        """Test the write-through append runs on commit and is dropped on rollback"""
+        appended = []
+        monkeypatch.setattr(
+            ChatHistoryCache, "append",
+            staticmethod(lambda cid, msgs: appended.append([m["content"] for m in msgs])),
+        )
+        conv = ChatConversation(user_id=user.id, title="Cache test")
+        db_session.add(conv)
+        db_session.commit()
+
+        ChatMessage.add_turn(user_id=user.id, conversation_id=conv.id, question="q0", answer="a0")
+        db_session.rollback()
+        assert appended == []
+
+        ChatMessage.add_turn(user_id=user.id, conversation_id=conv.id, question="q1", answer="a1", commit=True)
+        assert appended == [["q1", "a1"]]
+
+    def test_fill_skips_window_read_before_a_committed_turn(self, app, db_session, user):
+        """Test a turn committed between the DB read and the fill is not hidden by a stale window"""
+        if ChatHistoryCache._client() is None:
+            pytest.skip("Redis not configured")
+        conv = ChatConversation(user_id=user.id, title="Cache race")
+        db_session.add(conv)
+        db_session.commit()
+        ChatMessage.add_turn(user_id=user.id, conversation_id=conv.id, question="q0", answer="a0", commit=True)
+
+        generation = ChatHistoryCache.generation(conv.id)
+        stale = [{"id": m.id, "role": m.role, "content": m.content}
+                 for m in ChatMessage.query.filter_by(conversation_id=conv.id).order_by(ChatMessage.id)]
+        ChatMessage.add_turn(user_id=user.id, conversation_id=conv.id, question="q1", answer="a1", commit=True)
+
+        assert ChatHistoryCache.fill(conv.id, stale, generation) is False
+        assert ChatHistoryCache.get(conv.id, 10) is None
+        memory = ConversationMemoryService.load(conv.id, user.id)
+        assert [m["content"] for m in memory["messages"]] == ["q0", "a0", "q1", "a1"]
+        assert [m["content"] for m in ChatHistoryCache.get(conv.id, 10)] == ["q0", "a0", "q1", "a1"]
@@ -0,0 +1,149 @@
+import json
+import threading
+
+import pytest
+import redis
+from flask import g
+
+from app.services import embedding_batcher
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.llm_service import LLMService
+from app.utils.deadline import Deadline, DeadlineExceeded, current_deadline
+
+
+class TestEmbeddingBatcher:
+
+    def test_local_mode_batches_concurrent_queries(self, app, monkeypatch):
+        """Test concurrent queries within the window share one provider call"""
+        calls = []
+
+        def fake_embed(texts):
+            calls.append(list(texts))
+            return [[float(len(t))] for t in texts]
+
+        monkeypatch.setattr(LLMService, "embed", staticmethod(fake_embed))
+        monkeypatch.setitem(app.config, "EMBED_BATCH_MODE", "local")
+        monkeypatch.setitem(app.config, "EMBED_BATCH_WINDOW_MS", 200)
+        monkeypatch.setitem(app.config, "EMBED_BATCH_MAX", 8)
+
+        questions = ["a", "bb", "ccc", "bb"]
+        results = {}
+
+        def worker(q, i):
+            with app.app_context():
+                results[i] = EmbeddingBatcher.embed_query(q)
+
+        threads = [threading.Thread(target=worker, args=(q, i)) for i, q in enumerate(questions)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(calls) == 1
+        assert sorted(calls[0]) == ["a", "bb", "ccc"]
+        assert [results[i] for i in range(4)] == [[1.0], [2.0], [3.0], [2.0]]
+
+    def test_off_mode_calls_provider_directly(self, app, monkeypatch):
+        """Test batching disabled passes the single query straight through"""
+        monkeypatch.setattr(LLMService, "embed", staticmethod(lambda text: [0.5]))
+        monkeypatch.setitem(app.config, "EMBED_BATCH_MODE", "off")
+
+        with app.app_context():
+            assert EmbeddingBatcher.embed_query("hello") == [0.5]
+
+    def test_redis_errors_fall_back_to_direct_call(self, app, monkeypatch):
+        """Test a Redis failure mid-request embeds directly instead of raising"""
+        class BrokenRedis:
+            def rpush(self, *args):
+                return 1
+
+            def set(self, *args, **kwargs):
+                raise redis.ConnectionError("connection reset")
+
+        monkeypatch.setattr(embedding_batcher, "get_redis", lambda: BrokenRedis())
+        monkeypatch.setattr(LLMService, "embed", staticmethod(lambda text: [0.25]))
+        monkeypatch.setitem(app.config, "EMBED_BATCH_MODE", "redis")
+        monkeypatch.setitem(app.config, "EMBEDDING_MODEL", "m")
+
+        with app.app_context():
+            assert EmbeddingBatcher.embed_query("hello") == [0.25]
+
+    def _run_concurrently(self, app, questions, deadlines):
+        results = {}
+
+        def worker(q, i):
+            with app.app_context():
+                if deadlines[i] is not None:
+                    g.deadline = Deadline(deadlines[i])
+                try:
+                    results[i] = EmbeddingBatcher.embed_query(q)
+                except Exception as e:
+                    results[i] = e
+
+        threads = [threading.Thread(target=worker, args=(q, i)) for i, q in enumerate(questions)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return [results[i] for i in range(len(questions))]
+
+    def test_batch_runs_under_latest_member_deadline(self, app, monkeypatch):
+        """Test one member's short deadline does not bound the batched call"""
+        seen = []
+
+        def fake_embed(texts):
+            deadline = current_deadline()
+            seen.append(None if deadline is None else deadline.remaining())
+            return [[1.0] for _ in texts]
+
+        monkeypatch.setattr(LLMService, "embed", staticmethod(fake_embed))
+        monkeypatch.setitem(app.config, "EMBED_BATCH_MODE", "local")
+        monkeypatch.setitem(app.config, "EMBED_BATCH_WINDOW_MS", 200)
+
+        assert self._run_concurrently(app, ["a", "b"], [0.05, 30]) == [[1.0], [1.0]]
+        assert len(seen) == 1 and seen[0] > 20
+
+    def test_failed_batch_falls_back_to_direct_embeds(self, app, monkeypatch):
+        """Test members embed on their own when the batched call fails"""
+        def fake_embed(text_or_texts):
+            if isinstance(text_or_texts, list):
+                raise RuntimeError("provider timeout")
+            return [float(len(text_or_texts))]
+
+        monkeypatch.setattr(LLMService, "embed", staticmethod(fake_embed))
+        monkeypatch.setitem(app.config, "EMBED_BATCH_MODE", "local")
+        monkeypatch.setitem(app.config, "EMBED_BATCH_WINDOW_MS", 200)
+
+        assert self._run_concurrently(app, ["a", "bb", "ccc"], [None, None, None]) == [[1.0], [2.0], [3.0]]
+
+    def test_open_batch_circuit_falls_back_to_single_query_circuit(self, app, monkeypatch):
+        """Test an open embed_batch circuit sends members to embed, whose own open circuit is raised"""
+        calls = []
+
+        def fake_embed(text_or_texts):
+            calls.append(text_or_texts)
+            if isinstance(text_or_texts, list):
+                raise CircuitOpenError("openai", "embed_batch", 5.0)
+            if text_or_texts == "b":
+                raise CircuitOpenError("openai", "embed", 5.0)
+            return [1.0]
+
+        monkeypatch.setattr(LLMService, "embed", staticmethod(fake_embed))
+        monkeypatch.setitem(app.config, "EMBED_BATCH_MODE", "local")
+        monkeypatch.setitem(app.config, "EMBED_BATCH_WINDOW_MS", 200)
+
+        results = self._run_concurrently(app, ["a", "b"], [None, None])
+        assert results[0] == [1.0]
+        assert isinstance(results[1], CircuitOpenError) and results[1].operation == "embed"
+        assert sum(isinstance(c, list) for c in calls) == 1
+
+    def test_redis_payload_keeps_error_types(self):
+        """Test circuit-open and deadline failures survive the Redis result payload"""
+        encode, decode = EmbeddingBatcher._encode_error, EmbeddingBatcher._decode_result
+        with pytest.raises(CircuitOpenError) as circuit:
+            decode(json.dumps(encode(CircuitOpenError("openai", "embed", 3.0))))
+        assert circuit.value.retry_after == 3.0
+        with pytest.raises(DeadlineExceeded) as deadline:
+            decode(json.dumps(encode(DeadlineExceeded("embed", 0.2))))
+        assert deadline.value.operation == "embed"
@@ -0,0 +1,71 @@
+import json
+
+from app.utils.emergency_matcher import EmergencyMatcher, normalize
+
+
+class TestEmergencyMatcher:
+
+    def test_default_lexicon_detects_all_languages(self):
+        """Test the shipped lexicon covers English, Urdu and Roman Urdu"""
+        matcher = EmergencyMatcher.default()
+        assert matcher.version is not None
+        assert matcher.matches("He will kill me tonight")
+        assert matcher.matches("She keeps threatening: I am going to KILL you!")
+        assert matcher.matches("وہ کہتا ہے کہ مجھے جان سے مار دے گا")
+        assert matcher.matches("mera shohar kehta hai jaan se maar dunga")
+        assert matcher.matches("usne khud kushi ki dhamki di")
+        assert not matcher.matches("How do I file for khula in Punjab?")
+        assert not matcher.matches("کام کی جگہ پر ہراسانی کی شکایت کہاں درج کروں؟")
+
+    def test_word_boundaries_and_prefix_phrases(self):
+        """Test phrases match whole words unless marked as a prefix with *"""
+        matcher = EmergencyMatcher(["kill*", "rape", "self harm"])
+        assert matcher.matches("they were killing")
+        assert not matcher.matches("improve my job skills")
+        assert matcher.matches("Rape case")
+        assert not matcher.matches("grapes and drapes")
+        assert matcher.matches("self-harm")
+
+    def test_urdu_variants_and_diacritics_are_normalized(self):
+        """Test Arabic-script letter variants, diacritics and tatweel still match"""
+        matcher = EmergencyMatcher(["خودکشی", "قتل"])
+        assert matcher.matches("وہ خودکُشی کی بات کرتا ہے")
+        assert matcher.matches("خودكشي")
+        assert matcher.matches("قـــتل کی دھمکی")
+        assert normalize("يہ ہے") == normalize("یہ ہے")
+
+    def test_find_returns_overlapping_matches(self):
+        """Test find reports every phrase, including ones sharing a suffix"""
+        matcher = EmergencyMatcher(["he will kill me", "kill me", "will"])
+        assert sorted(matcher.find("He will kill me")) == ["he will kill me", "kill me", "will"]
+
+    def test_from_file_reads_versioned_lexicon(self, tmp_path):
+        """Test a custom lexicon file is loaded with its version"""
+        path = tmp_path / "lexicon.json"
+        path.write_text(json.dumps({"version": 9, "phrases": {"en": ["acid attack"]}}), encoding="utf-8")
+        matcher = EmergencyMatcher.from_file(str(path))
+        assert matcher.version == 9
+        assert matcher.matches("threatened an acid attack")
+        assert not matcher.matches("kill")
+
+    def test_inflected_forms_of_previous_hints_still_match(self):
+        """Test every hint of the old substring check still matches in inflected forms"""
+        matcher = EmergencyMatcher.default()
+        questions = [
+            "he tried to kill me", "my husband is killing me slowly", "he murdered my sister",
+            "I am thinking about suicide", "she is suicidal", "self harm", "I keep self-harming",
+            "I will die if I stay", "I'm going to die", "he threatens to kill me", "a threat to kill",
+            "he will kill me", "she will kill me", "I was raped", "they kidnapped my daughter",
+            "he abducted my child",
+            "اس نے قتل کی دھمکی دی",
+            "وہ خودکشی کرنا چاہتی ہے",
+            "وہ مجھے جان سے مارنا چاہتا ہے",
+            "کہتا ہے مار دوں گا",
+            "کہتی ہے مار دوں گی",
+            "وہ مجھے ماردےگا",
+            "میں مر جاؤں گی",
+            "میرے ساتھ زیادتیاں ہوئی",
+            "اس نے مجھے اغواء کیا",
+        ]
+        missed = [q for q in questions if not matcher.matches(q)]
+        assert missed == []
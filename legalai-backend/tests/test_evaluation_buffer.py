@@ -0,0 +1,41 @@
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app.services.evaluation_buffer import EvaluationBuffer
+from app.services.rag_evaluation_service import RAGEvaluationService
+
+
+class TestEvaluationBuffer:
+
+    def _entries(self, n):
+        return [(f"{i}-0", {"question": f"q{i}"}) for i in range(n)]
+
+    def test_database_outage_keeps_batch_pending(self, app, monkeypatch):
+        """Test no record is acknowledged while the database is unreachable"""
+        def unavailable(records):
+            raise OperationalError("INSERT", {}, Exception("connection refused"))
+
+        monkeypatch.setattr(RAGEvaluationService, "log_evaluations_bulk", staticmethod(unavailable))
+        with app.app_context():
+            written, settled, outage = EvaluationBuffer._insert(self._entries(3))
+
+        assert (written, settled, outage) == (0, [], True)
+
+    def test_only_written_or_rejected_records_are_acknowledged(self, app, monkeypatch):
+        """Test a bad record is dropped while rows with unexpected errors stay pending"""
+        def insert(records):
+            if len(records) > 1:
+                raise RuntimeError("batch failed")
+            question = records[0]["question"]
+            if question == "q1":
+                raise IntegrityError("INSERT", {}, Exception("duplicate"))
+            if question == "q2":
+                raise RuntimeError("unexpected")
+            return 1
+
+        monkeypatch.setattr(RAGEvaluationService, "log_evaluations_bulk", staticmethod(insert))
+        with app.app_context():
+            written, settled, outage = EvaluationBuffer._insert(self._entries(3))
+
+        assert written == 1
+        assert settled == ["0-0", "1-0"]
+        assert outage is False
@@ -0,0 +1,171 @@
+import hashlib
+import json
+from types import SimpleNamespace
+
+import pytest
+from flask import g, jsonify
+
+from app.api import _idempotency
+from app.api._idempotency import idempotent
+from app.exceptions import AppError
+
+
+class MemoryRedis:
+    """The slice of the Redis client _idempotency uses, kept in a dict."""
+
+    def __init__(self, on_get=None):
+        self.data = {}
+        self.on_get = on_get
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def get(self, key):
+        if self.on_get is not None:
+            self.on_get(self)
+        return self.data.get(key)
+
+    def delete(self, key):
+        return int(self.data.pop(key, None) is not None)
+
+
+class TestIdempotency:
+
+    def _setup(self, app, monkeypatch, store):
+        monkeypatch.setattr(_idempotency, "get_redis", lambda: store)
+        monkeypatch.setitem(app.config, "IDEMPOTENCY_WAIT_SECONDS", 0.2)
+        monkeypatch.setitem(app.config, "IDEMPOTENCY_RETRY_AFTER_SECONDS", 3)
+        calls = []
+
+        @idempotent("test")
+        def view():
+            calls.append(1)
+            return jsonify({"answer": len(calls)})
+
+        return view, calls
+
+    def _call(self, app, view, key="key-1", body=None):
+        with app.test_request_context(
+            "/api/v1/chat/ask", method="POST",
+            headers={"Idempotency-Key": key}, json=body or {"question": "What is khula?"},
+        ):
+            g.user = SimpleNamespace(id=1)
+            return app.make_response(view())
+
+    def _entry(self, store):
+        (raw,) = store.data.values()
+        return json.loads(raw)
+
+    def _claim_pending(self, app, store):
+        """Hold key-1 as an original request that has not finished yet."""
+        with app.test_request_context(
+            "/api/v1/chat/ask", method="POST",
+            headers={"Idempotency-Key": "key-1"}, json={"question": "What is khula?"},
+        ):
+            fingerprint = _idempotency._fingerprint()
+        key = f"idem:test:1:{hashlib.sha256(b'key-1').hexdigest()}"
+        store.set(key, json.dumps({"state": "pending", "fp": fingerprint}), nx=True)
+
+    def test_completed_response_is_replayed(self, app, monkeypatch):
+        """Test a retry gets the stored response without running the view again"""
+        store = MemoryRedis()
+        view, calls = self._setup(app, monkeypatch, store)
+
+        first = self._call(app, view)
+        retry = self._call(app, view)
+
+        assert len(calls) == 1
+        assert retry.get_json() == first.get_json() == {"answer": 1}
+        assert retry.headers["Idempotent-Replayed"] == "true"
+        assert "Idempotent-Replayed" not in first.headers
+
+    def test_retry_waits_for_in_progress_original(self, app, monkeypatch):
+        """Test a retry that arrives mid-request replays the original once it finishes"""
+        polls = []
+
+        def finish_on_second_poll(store):
+            polls.append(1)
+            if len(polls) == 2:
+                key = next(iter(store.data))
+                entry = {**json.loads(store.data[key]), "state": "done", "status": 200, "body": {"answer": 7}}
+                store.data[key] = json.dumps(entry)
+
+        store = MemoryRedis(on_get=finish_on_second_poll)
+        view, calls = self._setup(app, monkeypatch, store)
+        self._claim_pending(app, store)
+
+        resp = self._call(app, view)
+
+        assert calls == []
+        assert resp.status_code == 200
+        assert resp.get_json() == {"answer": 7}
+        assert resp.headers["Idempotent-Replayed"] == "true"
+
+    def test_still_in_progress_returns_409_with_retry_after(self, app, monkeypatch):
+        """Test a retry gives up after the short wait with 409 and Retry-After"""
+        store = MemoryRedis()
+        view, calls = self._setup(app, monkeypatch, store)
+        self._claim_pending(app, store)
+
+        resp = self._call(app, view)
+
+        assert calls == []
+        assert resp.status_code == 409
+        assert resp.headers["Retry-After"] == "3"
+        assert resp.get_json()["details"] == {"header": "Idempotency-Key"}
+        assert self._entry(store)["state"] == "pending"
+
+    def test_same_key_with_different_body_is_rejected(self, app, monkeypatch):
+        """Test reusing a key for a different payload is a 422"""
+        store = MemoryRedis()
+        view, calls = self._setup(app, monkeypatch, store)
+        self._call(app, view)
+
+        with pytest.raises(AppError) as exc:
+            self._call(app, view, body={"question": "Something else"})
+
+        assert exc.value.code == 422
+        assert len(calls) == 1
+
+    def test_server_error_releases_key(self, app, monkeypatch):
+        """Test a 5xx response is not stored, so the retry runs the view again"""
+        store = MemoryRedis()
+        monkeypatch.setattr(_idempotency, "get_redis", lambda: store)
+        statuses = [503, 200]
+
+        @idempotent("test")
+        def view():
+            return jsonify({"status": statuses[0]}), statuses.pop(0)
+
+        assert self._call(app, view).status_code == 503
+        assert store.data == {}
+        assert self._call(app, view).status_code == 200
+        assert self._entry(store)["state"] == "done"
+
+    def test_exception_releases_key(self, app, monkeypatch):
+        """Test a view that raises releases the key and re-raises"""
+        store = MemoryRedis()
+        monkeypatch.setattr(_idempotency, "get_redis", lambda: store)
+
+        @idempotent("test")
+        def view():
+            raise RuntimeError("provider exploded")
+
+        with pytest.raises(RuntimeError):
+            self._call(app, view)
+        assert store.data == {}
+
+    def test_oversized_key_is_rejected(self, app, monkeypatch):
+        """Test keys longer than 255 characters are a 400 before anything is claimed"""
+        store = MemoryRedis()
+        view, calls = self._setup(app, monkeypatch, store)
+
+        with pytest.raises(AppError) as exc:
+            self._call(app, view, key="k" * 256)
+
+        assert exc.value.code == 400
+        assert calls == []
+        assert store.data == {}
@@ -0,0 +1,77 @@
+import pytest
+from app.services.llm_service import LLMService
+from app.utils.deadline import DeadlineExceeded, start_request_deadline
+
+
+class TestPromptCaching:
+
+    def test_static_system_prefix_is_request_independent(self, app):
+        """Test the system prompt does not change with question, sources or province"""
+        with app.app_context():
+            a = LLMService._legal_awareness_messages(
+                question="Can my husband divorce me verbally?", contexts=["Source A"], language="en", province="Punjab"
+            )
+            b = LLMService._legal_awareness_messages(
+                question="How do I file for khula?", contexts=[], language="en", province=None
+            )
+        assert a[0] == b[0]
+        assert a[0]["role"] == "system"
+        assert "khula" in b[-1]["content"]
+
+    def test_anthropic_request_marks_cache_breakpoint(self, app, monkeypatch):
+        """Test the static system block carries cache_control for Anthropic"""
+        monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+        monkeypatch.setitem(app.config, "ANTHROPIC_PROMPT_CACHE", True)
+        messages = [
+            {"role": "system", "content": "static"},
+            {"role": "system", "content": "Summary of the earlier conversation:\n..."},
+            {"role": "user", "content": "question"},
+        ]
+        with app.app_context():
+            _, _, payload = LLMService._chat_request("anthropic", "claude", messages, 0.2, 900)
+        assert payload["system"][0]["cache_control"] == {"type": "ephemeral"}
+        assert "cache_control" not in payload["system"][1]
+        assert payload["messages"] == [{"role": "user", "content": "question"}]
+
+    def test_usage_normalization(self):
+        """Test cached token counts are read from each provider's usage block"""
+        openai = LLMService._chat_usage("openai", {
+            "usage": {"prompt_tokens": 1200, "completion_tokens": 80, "total_tokens": 1280,
+                      "prompt_tokens_details": {"cached_tokens": 1024}},
+        })
+        assert openai == {"prompt_tokens": 1200, "completion_tokens": 80, "total_tokens": 1280, "cached_tokens": 1024}
+
+        anthropic = LLMService._chat_usage("anthropic", {
+            "usage": {"input_tokens": 150, "output_tokens": 60, "cache_read_input_tokens": 1100,
+                      "cache_creation_input_tokens": 0},
+        })
+        assert anthropic == {"prompt_tokens": 1250, "completion_tokens": 60, "total_tokens": 1310, "cached_tokens": 1100}
+
+        assert LLMService._chat_usage("groq", {})["prompt_tokens"] is None
+
+
+class TestRequestDeadline:
+
+    def test_client_header_can_only_shorten_budget(self, app, monkeypatch):
+        """Test X-Request-Timeout caps the configured deadline"""
+        monkeypatch.setitem(app.config, "CHAT_REQUEST_TIMEOUT_SECONDS", 25)
+        monkeypatch.setitem(app.config, "CHAT_DEADLINE_RESERVE_SECONDS", 0)
+        with app.test_request_context(headers={"X-Request-Timeout": "8"}):
+            assert start_request_deadline().remaining() <= 8
+        with app.test_request_context(headers={"X-Request-Timeout": "600"}):
+            assert 20 < start_request_deadline().remaining() <= 25
+
+    def test_low_budget_skips_llm_stages(self, app, monkeypatch):
+        """Test classify falls back and answering is refused when the budget is nearly spent"""
+        def fail(**kwargs):
+            raise AssertionError("provider must not be called")
+
+        monkeypatch.setattr(LLMService, "_chat_complete", staticmethod(fail))
+        monkeypatch.setitem(app.config, "CHAT_DEADLINE_RESERVE_SECONDS", 0)
+        with app.test_request_context(headers={"X-Request-Timeout": "2"}):
+            start_request_deadline()
+            route = LLMService.classify_query(question="What is khula?")
+            assert route["category"] == "IN_DOMAIN_LEGAL"
+            assert route["confidence"] == 0.0
+            with pytest.raises(DeadlineExceeded):
+                LLMService.chat_legal_awareness(question="What is khula?", contexts=[])
@@ -0,0 +1,45 @@
+import pytest
+from app.services.llm_service import LLMService
+from app.services.local_llm_provider import LocalLLMProvider
+
+
+class TestLocalProvider:
+
+    def _configure(self, app, monkeypatch):
+        monkeypatch.setitem(app.config, "EMBEDDING_PROVIDER", "local")
+        monkeypatch.setitem(app.config, "CHAT_PROVIDER", "local")
+        monkeypatch.setitem(app.config, "EMBEDDING_DIMENSION", 16)
+        monkeypatch.setitem(app.config, "LOCAL_LLM_EMBED_LATENCY_MS", 0)
+        monkeypatch.setitem(app.config, "LOCAL_LLM_CHAT_LATENCY_MS", 0)
+        monkeypatch.setitem(app.config, "LOCAL_LLM_TOKEN_LATENCY_MS", 0)
+
+    def test_embeddings_are_deterministic(self, app, monkeypatch):
+        """Test local embeddings are stable per text and sized to EMBEDDING_DIMENSION"""
+        self._configure(app, monkeypatch)
+        with app.app_context():
+            a, b, a2 = LLMService.embed(["khula", "maintenance", "khula"])
+            single = LLMService.embed("khula")
+
+        assert len(a) == 16
+        assert a == a2 == single
+        assert a != b
+
+    def test_chat_classify_and_answer(self, app, monkeypatch):
+        """Test local chat returns parseable classifier JSON and an answer with usage"""
+        self._configure(app, monkeypatch)
+        monkeypatch.setitem(app.config, "LOCAL_LLM_COMPLETION_TOKENS", 20)
+        with app.app_context():
+            route = LLMService.classify_query(question="How do I apply for khula?")
+            answer, _, _, usage = LLMService.chat_legal_awareness(question="How do I apply for khula?", contexts=[])
+
+        assert route["category"] == "IN_DOMAIN_LEGAL"
+        assert "awareness only" in answer
+        assert usage["completion_tokens"] > 0
+
+    def test_latency_over_timeout_raises(self, app, monkeypatch):
+        """Test simulated latency beyond the call timeout surfaces as a timeout"""
+        self._configure(app, monkeypatch)
+        monkeypatch.setitem(app.config, "LOCAL_LLM_CHAT_LATENCY_MS", 5000)
+        with app.app_context():
+            with pytest.raises(TimeoutError):
+                LocalLLMProvider.post("answer", {"messages": []}, timeout=0.01)
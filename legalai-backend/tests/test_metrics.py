@@ -0,0 +1,31 @@
+class TestMetrics:
+
+    def test_metrics_exposes_request_latency(self, app, client, monkeypatch):
+        """Test /metrics reports latency for requests already served"""
+        monkeypatch.setitem(app.config, "METRICS_TOKEN", "scrape-secret")
+        client.get("/api/v1/health")
+        response = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+
+        assert response.status_code == 200
+        assert response.mimetype == "text/plain"
+        body = response.get_data(as_text=True)
+        assert 'legalai_http_request_duration_seconds_count{blueprint="app",endpoint="health",method="GET",status="200"}' in body
+        assert "legalai_db_pool_checked_out" in body
+
+    def test_metrics_token_required_when_configured(self, app, client, monkeypatch):
+        """Test METRICS_TOKEN protects the endpoint"""
+        monkeypatch.setitem(app.config, "METRICS_TOKEN", "scrape-secret")
+
+        assert client.get("/metrics").status_code == 401
+        assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+        assert client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"}).status_code == 200
+
+    def test_metrics_closed_without_token_outside_development(self, app, client, monkeypatch):
+        """Test an unset METRICS_TOKEN only leaves /metrics open in development"""
+        monkeypatch.setitem(app.config, "METRICS_TOKEN", None)
+
+        monkeypatch.setitem(app.config, "DEBUG", False)
+        assert client.get("/metrics").status_code == 401
+
+        monkeypatch.setitem(app.config, "DEBUG", True)
+        assert client.get("/metrics").status_code == 200
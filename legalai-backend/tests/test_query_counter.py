@@ -0,0 +1,53 @@
+import logging
+
+from flask import Flask, jsonify
+from sqlalchemy import text
+
+from app.extensions import db
+from app.utils.query_counter import HEADER, capture_profiles, init_query_counter
+
+
+class TestQueryCounter:
+
+    def test_header_absent_by_default(self, client):
+        """Test responses carry no query count unless enabled"""
+        response = client.get("/api/v1/health")
+        assert HEADER not in response.headers
+
+    def test_header_counts_request_queries(self, app, client, monkeypatch, auth_headers):
+        """Test the header reports the statements run by the request"""
+        monkeypatch.setitem(app.config, "DB_QUERY_COUNT_HEADER", True)
+        assert client.get("/api/v1/health").headers[HEADER] == "0"
+
+        response = client.get("/api/v1/chat/conversations", headers=auth_headers)
+        assert response.status_code == 200
+        assert int(response.headers[HEADER]) >= 1
+
+    def test_server_timing_reports_db_time(self, app, client, auth_headers, monkeypatch):
+        """Test Server-Timing carries a db entry only when the profiler is enabled"""
+        monkeypatch.setitem(app.config, "SQL_PROFILER_ENABLED", False)
+        response = client.get("/api/v1/chat/conversations", headers=auth_headers)
+        assert "Server-Timing" not in response.headers
+
+        monkeypatch.setitem(app.config, "SQL_PROFILER_ENABLED", True)
+        response = client.get("/api/v1/chat/conversations", headers=auth_headers)
+        timing = response.headers["Server-Timing"]
+        assert timing.startswith("db;dur=")
+        assert 'queries"' in timing
+
+    def test_repeated_statement_logged_as_n_plus_one(self, caplog):
+        """Test a statement repeated past the threshold is logged and captured"""
+        app = Flask("profiler-test")
+        app.config.update(SQLALCHEMY_DATABASE_URI="sqlite://", SQL_N_PLUS_ONE_THRESHOLD=3)
+        db.init_app(app)
+        init_query_counter(app)
+
+        @app.get("/rows")
+        def rows():
+            return jsonify([db.session.execute(text("SELECT :i"), {"i": i}).scalar() for i in range(4)])
+
+        with capture_profiles() as profiles, caplog.at_level(logging.WARNING):
+            assert app.test_client().get("/rows").json == [0, 1, 2, 3]
+
+        assert [(p.endpoint, p.count) for p in profiles] == [("rows", 4)]
+        assert "Possible N+1 endpoint=rows repeated=4" in caplog.text
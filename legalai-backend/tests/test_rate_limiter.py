@@ -0,0 +1,35 @@
+from app.services.rate_limiter import ProviderRateLimiter, INTERACTIVE, BATCH
+
+
+class TestProviderRateLimiter:
+
+    def _configure(self, app, monkeypatch, rpm):
+        monkeypatch.setitem(app.config, "REDIS_URL", None)
+        monkeypatch.setitem(app.config, "LLM_RATE_LIMIT_RPM", rpm)
+        monkeypatch.setitem(app.config, "LLM_RATE_LIMIT_TPM", 0)
+        monkeypatch.setitem(app.config, "LLM_RATE_LIMIT_BATCH_RESERVE", 0.5)
+        monkeypatch.setattr(ProviderRateLimiter, "_local", {})
+
+    def test_batch_lane_yields_reserve_to_interactive(self, app, monkeypatch):
+        """Test batch calls stop at the reserve while interactive calls may use it"""
+        self._configure(app, monkeypatch, rpm=4)
+        with app.app_context():
+            assert ProviderRateLimiter._try_take("openai", "m", 10, BATCH) == 0
+            assert ProviderRateLimiter._try_take("openai", "m", 10, BATCH) == 0
+            assert ProviderRateLimiter._try_take("openai", "m", 10, BATCH) > 0
+            assert ProviderRateLimiter._try_take("openai", "m", 10, INTERACTIVE) == 0
+            assert ProviderRateLimiter._try_take("openai", "m", 10, INTERACTIVE) == 0
+            assert ProviderRateLimiter._try_take("openai", "m", 10, INTERACTIVE) > 0
+
+    def test_drain_blocks_all_lanes(self, app, monkeypatch):
+        """Test a provider 429 empties the bucket for every caller"""
+        self._configure(app, monkeypatch, rpm=600)
+        with app.app_context():
+            ProviderRateLimiter.drain("openai", "m")
+            assert ProviderRateLimiter._try_take("openai", "m", 10, INTERACTIVE) > 0
+
+    def test_disabled_by_default(self, app, monkeypatch):
+        """Test no limits configured means calls are never delayed"""
+        self._configure(app, monkeypatch, rpm=0)
+        with app.app_context():
+            assert ProviderRateLimiter.acquire("openai", "m", 10_000, BATCH) == 0
@@ -0,0 +1,41 @@
+from flask import Flask, jsonify
+from sqlalchemy import text
+
+from app.extensions import db
+from app.utils.tracing import init_tracing, memory_exporter, start_span
+
+
+def _traced_app():
+    app = Flask("tracing-test")
+    app.config.update(
+        TRACING_ENABLED=True,
+        TRACING_EXPORTER="memory",
+        SQLALCHEMY_DATABASE_URI="sqlite://",
+    )
+    db.init_app(app)
+    init_tracing(app)
+    memory_exporter().clear()
+    return app
+
+
+class TestTracing:
+
+    def test_request_span_contains_stage_and_sql_spans(self):
+        """Test a request produces one trace with nested stage and SQL spans"""
+        app = _traced_app()
+
+        @app.get("/traced")
+        def traced():
+            with start_span("chat.retrieve"):
+                db.session.execute(text("SELECT 1"))
+            return jsonify({"ok": True})
+
+        assert app.test_client().get("/traced").status_code == 200
+
+        spans = {s.name: s for s in memory_exporter().get_finished_spans()}
+        request_span = spans["GET /traced"]
+        stage, sql = spans["chat.retrieve"], spans["db.select"]
+        assert stage.parent.span_id == request_span.context.span_id
+        assert sql.parent.span_id == stage.context.span_id
+        assert sql.attributes["db.statement"] == "SELECT 1"
+        assert len({s.context.trace_id for s in spans.values()}) == 1